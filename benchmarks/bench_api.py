@@ -0,0 +1,127 @@
+"""
+Gjennomstrømning for HTTP-API-et (energitiltak.api) med lokal klient.
+
+Starter API-et i en egen prosess (én kjerne) og kjører en asyncio-klient med mange
+samtidige keep-alive-forbindelser som sender én beregning per forespørsel, slik at
+serveren må mikrobatche. Sjekker også at svarene er identiske med de skalare
+funksjonene. Feiler hvis gjennomstrømningen er under --min-per-s.
+
+    python benchmarks/bench_api.py
+    python benchmarks/bench_api.py --forbindelser 128 --sekunder 5 --min-per-s 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import energitiltak as et  # noqa: E402
+from energitiltak.api import Klient  # noqa: E402
+
+EKSEMPLER = [
+    ({"tiltak": "iso", "input": {"A_m2": 1800.0, "U_old": 0.30, "U_new": 0.18}},
+     lambda: et.etterisolering(1800.0, 0.30, 0.18)),
+    ({"tiltak": "hrv", "input": {"qv_m3_h": 60_000, "eta_old": 0.80, "eta_new": 0.88, "driftstimer": 3000}},
+     lambda: et.besparelse_varmegjenvinner(60_000, 0.80, 0.88, 3000)),
+    ({"tiltak": "vp", "input": {"Q_netto_kWh_year": 600_000, "eta_old": 0.95, "COP_new": 3.2, "dekningsgrad": 0.85}},
+     lambda: et.besparelse_varmepumpe(600_000, 0.95, 3.2, 0.85)),
+    ({"tiltak": "led", "input": {"ant_armatur": 200, "W_gammel": 116, "W_led": 46, "timer_per_aar": 3000}},
+     lambda: et.besparelse_belysning(200, 116, 46, 3000)),
+]
+
+def start_server(ventetid_ms: float):
+    p = subprocess.Popen([sys.executable, "-m", "energitiltak.api", "--port", "0", "--ventetid-ms", str(ventetid_ms)],
+                         cwd=ROOT, stderr=subprocess.PIPE, text=True)
+    linje = p.stderr.readline()
+    if "http://" not in linje:
+        p.kill()
+        raise RuntimeError(f"API-et startet ikke: {linje}")
+    return p, int(linje.rsplit(":", 1)[1])
+
+def cpu_sekunder(pid: int) -> float:
+    """Prosessorbruk (bruker + system) for en prosess, eller NaN der /proc mangler."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            felt = f.read().rsplit(")", 1)[1].split()
+        return (int(felt[11]) + int(felt[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return float("nan")
+
+def sjekk_svar(port: int):
+    k = Klient(port=port)
+    try:
+        for forespørsel, fasit in EKSEMPLER:
+            res = k.beregn(forespørsel["tiltak"], forespørsel["input"], pris=1.25, utslipp_g=20.0)
+            if res["kWh"] != fasit():
+                raise AssertionError(f"{forespørsel['tiltak']}: {res['kWh']} != {fasit()}")
+        ov = k.oversikt([{"ID": "iso", "Tiltak": "Etterisolering", "kWh": 24883.2, "Invest": 5_040_000.0}])
+        if ov["summer"]["kr"] != et.nok_og_co2(24883.2, 1.25, 20.0)[0]:
+            raise AssertionError("oversikt")
+    finally:
+        k.lukk()
+
+async def last(port: int, forbindelser: int, sekunder: float, per_forespørsel: int) -> tuple:
+    if per_forespørsel == 1:
+        kropper = [json.dumps({**e[0], "pris": 1.25, "utslipp_g": 20.0}).encode() for e in EKSEMPLER]
+    else:
+        kropper = [json.dumps({"beregninger": [EKSEMPLER[i % len(EKSEMPLER)][0] for i in range(per_forespørsel)]}).encode()]
+    forespørsler = [b"POST /beregn HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\nContent-Length: "
+                    + str(len(k)).encode() + b"\r\n\r\n" + k for k in kropper]
+    slutt = time.perf_counter() + sekunder
+    antall = 0
+
+    async def arbeider(i: int):
+        nonlocal antall
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        j = i
+        while time.perf_counter() < slutt:
+            writer.write(forespørsler[j % len(forespørsler)])
+            j += 1
+            hode = await reader.readuntil(b"\r\n\r\n")
+            lengde = int(hode[hode.index(b"Content-Length:") + 15:].split(b"\r\n", 1)[0])
+            await reader.readexactly(lengde)
+            antall += 1
+        writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(arbeider(i) for i in range(forbindelser)))
+    sek = time.perf_counter() - t0
+    return antall * per_forespørsel / sek, antall / sek
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--forbindelser", type=int, default=64)
+    ap.add_argument("--sekunder", type=float, default=3.0)
+    ap.add_argument("--ventetid-ms", type=float, default=2.0)
+    ap.add_argument("--min-per-s", type=float, default=10_000.0,
+                    help="Minste antall beregninger/s med én beregning per forespørsel")
+    args = ap.parse_args(argv)
+
+    p, port = start_server(args.ventetid_ms)
+    try:
+        sjekk_svar(port)
+        cpu0 = cpu_sekunder(p.pid)
+        t0 = time.perf_counter()
+        enkelt, _ = asyncio.run(last(port, args.forbindelser, args.sekunder, 1))
+        andel = (cpu_sekunder(p.pid) - cpu0) / (time.perf_counter() - t0)
+        liste, req = asyncio.run(last(port, max(args.forbindelser // 8, 1), args.sekunder, 100))
+    finally:
+        p.terminate()
+        p.wait()
+
+    print(f"Én beregning per forespørsel ({args.forbindelser} forbindelser): {enkelt:,.0f} beregninger/s".replace(",", " "))
+    if andel == andel and andel > 0:
+        print(f"  serveren brukte {andel:.0%} av én kjerne: {enkelt / andel:,.0f} beregninger per CPU-sekund".replace(",", " "))
+    print(f"100 beregninger per forespørsel: {liste:,.0f} beregninger/s ({req:,.0f} forespørsler/s)".replace(",", " "))
+    if enkelt < args.min_per_s:
+        print(f"FEIL: under {args.min_per_s:,.0f} beregninger/s".replace(",", " "), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
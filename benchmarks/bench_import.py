@@ -0,0 +1,61 @@
+"""
+Måler kald import av beregningskjernen i en ny Python-prosess (slik en worker starter),
+og sammenligner med kald import av Streamlit.
+
+Kjør fra repo-roten:  python benchmarks/bench_import.py [--runs 5] [--max-ms 50]
+Avslutter med kode 1 hvis kjernen er tregere enn grensen eller drar inn UI-/tunge pakker.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import sys, time, json
+t0 = time.perf_counter()
+import {modul}
+ms = (time.perf_counter() - t0) * 1000.0
+print(json.dumps({{"ms": ms, "moduler": sorted(m for m in ("streamlit", "pandas", "numpy") if m in sys.modules)}}))
+"""
+
+def cold_import(modul: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(modul=modul)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--max-ms", type=float, default=50.0, help="Grense for median kald import av energitiltak")
+    ap.add_argument("--uten-streamlit", action="store_true", help="Hopp over referansemålingen av Streamlit")
+    args = ap.parse_args(argv)
+
+    kjerne = [cold_import("energitiltak") for _ in range(args.runs)]
+    median_ms = statistics.median(r["ms"] for r in kjerne)
+    lastet = sorted({m for r in kjerne for m in r["moduler"]})
+    print(f"energitiltak: median {median_ms:.1f} ms over {args.runs} kjøringer")
+
+    if not args.uten_streamlit:
+        try:
+            st_ms = statistics.median(cold_import("streamlit")["ms"] for _ in range(args.runs))
+            print(f"streamlit:    median {st_ms:.1f} ms (referanse)")
+        except subprocess.CalledProcessError:
+            print("streamlit:    ikke installert – hopper over referansen")
+
+    ok = True
+    if lastet:
+        print(f"FEIL: import av energitiltak lastet {', '.join(lastet)}")
+        ok = False
+    if median_ms > args.max_ms:
+        print(f"FEIL: {median_ms:.1f} ms > grensen på {args.max_ms:.1f} ms")
+        ok = False
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""
+Benchmark- og regresjonssuite for beregningskjernen.
+
+Sjekker først fasitverdier (golden values) for standardtilfellene i fanene, slik at
+ytelsesarbeid ikke endrer tallene i det stille, og tar deretter tiden på alle
+tiltaksfunksjoner, driftstid-hjelperen, oversiktsaggregeringen og Styler-formateringen
+i skalar-, batch- og porteføljemodus. Resultatet skrives som JSON.
+
+Kjør fra repo-roten:
+    python benchmarks/run.py --ut bench.json
+    python benchmarks/run.py --ut ny.json --sammenlign bench.json --maks-treghet 1.3
+    python benchmarks/run.py --bare-golden
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time as _time
+import timeit
+from datetime import datetime, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import energitiltak as et  # noqa: E402
+from energitiltak import batch, belysning, bygningsmodell, pakke as pk, rapport  # noqa: E402
+from energitiltak.portefolje import Portefolje  # noqa: E402
+from energitiltak.oversikt import oversikt_rad, stil_oversikt  # noqa: E402
+from bench_import import cold_import  # noqa: E402
+
+# ===============================
+# Fasitverdier (standardverdiene i fanene)
+# ===============================
+GOLDEN = [
+    ("etterisolering 1800 m², U 0,30→0,18", lambda: et.etterisolering(1800.0, 0.30, 0.18), 24883.2),
+    ("varmegjenvinner 60 000 m³/h, 80→88 %, 3000 h",
+     lambda: et.besparelse_varmegjenvinner(60_000, 0.80, 0.88, 3000), 63502.027397260244),
+    ("SFP 60 000 m³/h, 1,8→1,2, 3000 h", lambda: et.besparelse_sfp(60_000, 1.8, 1.2, 3000), 30000.000000000004),
+    ("varmepumpe 600 MWh, η 0,95, COP 3,2, 85 %",
+     lambda: et.besparelse_varmepumpe(600_000, 0.95, 3.2, 0.85), 377467.10526315786),
+    ("temperaturreduksjon 600 MWh, 1 °C", lambda: et.besparelse_tempreduksjon(600_000, 1.0), 30000.0),
+    ("nattsenking 600 MWh, 2 °C, 8 h", lambda: et.besparelse_nattsenking(600_000, 2.0, 8), 20000.0),
+    ("LED 200 × T8 2×58 W → 46 W, 3000 h", lambda: et.besparelse_belysning(200, 116, 46, 3000), 42000.0),
+    ("solceller 1000 m², 80 %, 0,20 kWp/m², 750 kWh/kWp",
+     lambda: et.areal_til_kwp(1000.0, 0.80, 0.20) * 750, 120000.0),
+    ("driftstimer 07–17, man–fre, 52 uker",
+     lambda: et.annual_hours_from_schedule(time(7, 0), time(17, 0), 5, 52), 2600.0),
+    ("driftstimer 22–06 per døgn", lambda: et.daily_hours(time(22, 0), time(6, 0)), 8.0),
+    ("kr/år for etterisolering ved 1,25 kr/kWh", lambda: et.nok_og_co2(24883.2, 1.25, 20.0)[0], 31104.0),
+    ("kg CO₂/år for etterisolering ved 20 g/kWh", lambda: et.nok_og_co2(24883.2, 1.25, 20.0)[1], 497.66400000000004),
+    ("tilbakebetaling etterisolering 2800 kr/m²", lambda: et.payback_years(2800.0 * 1800.0, 31104.0), 162.03703703703704),
+]
+
+def _standardpakke() -> dict:
+    """Alle tiltakene med standardverdier og standardinvestering, som i oversikten."""
+    liste = {}
+    for tid, kwh, inv in [
+        ("iso", et.etterisolering(1800.0, 0.30, 0.18), 2800.0 * 1800.0),
+        ("hrv", et.besparelse_varmegjenvinner(60_000, 0.80, 0.88, 3000), 35.0 * 60_000),
+        ("sfp", et.besparelse_sfp(60_000, 1.8, 1.2, 3000), 400_000.0),
+        ("vp", et.besparelse_varmepumpe(600_000, 0.95, 3.2, 0.85), 600_000 * 0.85 / 2000 * 16_000.0),
+        ("temp", et.besparelse_tempreduksjon(600_000, 1.0), 50_000.0),
+        ("night", et.besparelse_nattsenking(600_000, 2.0, 8), 75_000.0),
+        ("led", et.besparelse_belysning(200, 116, 46, 3000), 3000.0 * 200),
+        ("pv", et.areal_til_kwp(1000.0, 0.80, 0.20) * 750, 10_500.0 * et.areal_til_kwp(1000.0, 0.80, 0.20)),
+    ]:
+        et.upsert_tiltak(liste, tid, tid, kwh, inv)
+    return liste
+
+GOLDEN_PAKKE = {"kWh": 707852.3326604181, "kr": 884815.4158255226, "invest": 14025000.0}
+
+def _lik(a, b) -> bool:
+    return math.isclose(a, b, rel_tol=1e-12, abs_tol=1e-9)
+
+def sjekk_golden() -> list:
+    """Gir liste med avvik (tom liste = alt stemmer)."""
+    feil = []
+    for navn, fn, fasit in GOLDEN:
+        verdi = fn()
+        if not _lik(verdi, fasit):
+            feil.append(f"{navn}: {verdi!r} != {fasit!r}")
+
+    summer = et.oversikt_summer(et.oversikt_rader(_standardpakke(), 1.25, 20.0))
+    for k, fasit in GOLDEN_PAKKE.items():
+        if not _lik(summer[k], fasit):
+            feil.append(f"oversikt, sum {k}: {summer[k]!r} != {fasit!r}")
+
+    # Samspill: samlet besparelse skal være uavhengig av rekkefølgen, og snittbidragene skal
+    # summere seg til pakken
+    rader = [dict(r) for r in _standardpakke().values()]
+    for r in rader:
+        r["Input"] = {"vp": {"Q_netto_kWh_year": 600_000.0, "eta_old": 0.95, "COP_new": 3.2, "dekningsgrad": 0.85},
+                      "temp": {"Q_space_kWh_year": 600_000.0, "delta_T_C": 1.0},
+                      "night": {"Q_space_kWh_year": 600_000.0, "setback_C": 2.0, "timer_per_dogn": 8.0}}.get(r["ID"])
+    samlet = pk.Pakke(rader).kWh
+    alle = pk.rekkefolger_for(rader)
+    for navn, verdi in (("laveste over rekkefølger", alle["kWh_min"][-1]), ("høyeste over rekkefølger", alle["kWh_maks"][-1]),
+                        ("sum av snittbidrag", sum(alle["shapley"].values()))):
+        if not math.isclose(verdi, samlet, rel_tol=1e-9):
+            feil.append(f"samspill, {navn}: {verdi!r} != Pakke.kWh {samlet!r}")
+
+    # Batch skal gi nøyaktig samme tall som de skalare funksjonene
+    rng = np.random.default_rng(42)
+    n = 2000
+    skalar = {
+        "iso": et.etterisolering, "hrv": et.besparelse_varmegjenvinner, "sfp": et.besparelse_sfp,
+        "vp": et.besparelse_varmepumpe, "temp": et.besparelse_tempreduksjon,
+        "night": et.besparelse_nattsenking, "led": et.besparelse_belysning,
+    }
+    for tid, fn in skalar.items():
+        kolonner = batch.TILTAK_BATCH[tid][1]
+        args = [rng.uniform(0.0, 2.0, n) * _skala(k) for k in kolonner]
+        b = batch.TILTAK_BATCH[tid][0](*args)
+        s = np.array([fn(*r) for r in zip(*args)])
+        if not np.array_equal(b, s):
+            feil.append(f"batch {tid}: {int((b != s).sum())} av {n} rader avviker fra skalar beregning")
+    return feil
+
+# Typisk størrelsesorden per inputkolonne, brukt for tilfeldige testdata
+_SKALA = {
+    "A_m2": 1800.0, "U_old": 0.3, "U_new": 0.18, "qv_m3_h": 60_000.0, "eta_old": 0.8, "eta_new": 0.88,
+    "driftstimer": 3000.0, "SFP_old": 1.8, "SFP_new": 1.2, "Q_netto_kWh_year": 600_000.0, "COP_new": 3.2,
+    "dekningsgrad": 0.85, "Q_space_kWh_year": 600_000.0, "delta_T_C": 1.0, "setback_C": 2.0,
+    "timer_per_dogn": 8.0, "ant_armatur": 200.0, "W_gammel": 116.0, "W_led": 46.0, "timer_per_aar": 3000.0,
+    "areal_m2": 1000.0, "utnyttelse": 0.8, "kwp_per_m2": 0.2, "spes_prod": 750.0,
+}
+
+def _skala(kolonne: str) -> float:
+    return _SKALA.get(kolonne, 1.0)
+
+# ===============================
+# Tidtaking
+# ===============================
+def _tid(fn, min_tid: float = 0.2) -> float:
+    """Median sekunder per kall (timeit, automatisk antall gjentakelser)."""
+    t = timeit.Timer(fn)
+    antall, _ = t.autorange()
+    antall = max(1, int(antall * min_tid / 0.2))
+    return sorted(x / antall for x in t.repeat(repeat=5, number=antall))[2]
+
+def _portefolje(n: int, rng) -> pd.DataFrame:
+    df = pd.DataFrame({"bygg_id": np.arange(n) // 8,
+                       "tiltak": rng.choice(list(batch.TILTAK_BATCH), n)})
+    for k, v in _SKALA.items():
+        df[k] = rng.uniform(0.5, 1.5, n) * v
+    return df
+
+def kjor_benchmarks(n_batch: int, n_portefolje: int, min_tid: float) -> list:
+    rng = np.random.default_rng(0)
+    res = []
+
+    def legg_til(navn: str, modus: str, n: int, sek: float):
+        res.append({"navn": navn, "modus": modus, "n": n, "sekunder": sek,
+                    "rader_per_s": n / sek if sek > 0 else None})
+
+    # Kald import av kjernen i ny prosess (se bench_import.py)
+    legg_til("import energitiltak", "kald", 1, sorted(cold_import("energitiltak")["ms"] for _ in range(5))[2] / 1000.0)
+
+    # Skalar: ett kall per funksjon med standardverdier
+    skalarkall = {
+        "etterisolering": lambda: et.etterisolering(1800.0, 0.30, 0.18),
+        "besparelse_varmegjenvinner": lambda: et.besparelse_varmegjenvinner(60_000, 0.80, 0.88, 3000),
+        "besparelse_sfp": lambda: et.besparelse_sfp(60_000, 1.8, 1.2, 3000),
+        "besparelse_varmepumpe": lambda: et.besparelse_varmepumpe(600_000, 0.95, 3.2, 0.85),
+        "besparelse_tempreduksjon": lambda: et.besparelse_tempreduksjon(600_000, 1.0),
+        "besparelse_nattsenking": lambda: et.besparelse_nattsenking(600_000, 2.0, 8),
+        "besparelse_belysning": lambda: et.besparelse_belysning(200, 116, 46, 3000),
+        "annual_hours_from_schedule": lambda: et.annual_hours_from_schedule(time(7, 0), time(17, 0), 5, 52),
+        "nok_og_co2": lambda: et.nok_og_co2(24883.2, 1.25, 20.0),
+        "payback_years": lambda: et.payback_years(5_040_000.0, 31104.0),
+    }
+    for navn, fn in skalarkall.items():
+        legg_til(navn, "skalar", 1, _tid(fn, min_tid))
+
+    # Batch: hver tiltaksfunksjon over n_batch rader
+    for tid, (fn, kolonner) in batch.TILTAK_BATCH.items():
+        args = [rng.uniform(0.5, 1.5, n_batch) * _skala(k) for k in kolonner]
+        legg_til(fn.__name__, "batch", n_batch, _tid(lambda: fn(*args), min_tid))
+    kwh = rng.uniform(0, 1e6, n_batch)
+    legg_til("nok_og_co2_batch", "batch", n_batch, _tid(lambda: batch.nok_og_co2_batch(kwh, 1.25, 20.0), min_tid))
+    inv = rng.uniform(0, 1e7, n_batch)
+    legg_til("payback_years_batch", "batch", n_batch, _tid(lambda: batch.payback_years_batch(inv, kwh), min_tid))
+
+    # Oversikt: standardpakken (8 tiltak) og en stor liste. Radcachen tømmes før hvert kall,
+    # ellers måles bare cache-oppslag etter første runde
+    def oversikt(liste, pris):
+        oversikt_rad.cache_clear()
+        return et.oversikt_summer(et.oversikt_rader(liste, pris, 20.0))
+
+    pakke = _standardpakke()
+    legg_til("oversikt_rader+summer", "skalar", len(pakke), _tid(lambda: oversikt(pakke, 1.25), min_tid))
+    rader = et.oversikt_rader(pakke, 1.25, 20.0)
+    legg_til("stil_oversikt (Styler.to_html)", "skalar", len(rader),
+             _tid(lambda: stil_oversikt(rader).to_html(), min_tid))
+    data = rapport.rapportdata(pakke, 1.25, 20.0, "Prosjekt", "Bygg", {"rente": 0.04, "horisont": 30, "prisvekst": 0.02})
+    legg_til("rapport.pdf", "skalar", len(rader), _tid(lambda: rapport.pdf(data), min_tid))
+    legg_til("rapport.excel", "skalar", len(rader), _tid(lambda: rapport.excel(data), min_tid))
+
+    # Samspill: av/på for ett tiltak midt i pakken, og alle rekkefølger og delmengder av 8 tiltak
+    samspill = pk.Pakke(pakke, Q_varme=600_000.0)
+    legg_til("Pakke.sett_aktiv (av+på)", "skalar", len(pakke),
+             _tid(lambda: (samspill.sett_aktiv("night", False), samspill.sett_aktiv("night", True)), min_tid))
+    ider = list(pakke)
+    legg_til("alle_rekkefolger (8 tiltak)", "skalar", 109_600,
+             _tid(lambda: pk.alle_rekkefolger(ider, [pakke[t]["kWh"] for t in ider], 600_000.0), min_tid))
+
+    stor = {}
+    for i in range(5000):
+        et.upsert_tiltak(stor, f"t{i}", f"Tiltak {i}", float(rng.uniform(0, 1e5)), float(rng.uniform(0, 1e6)))
+    legg_til("oversikt_rader+summer", "portefølje", len(stor), _tid(lambda: oversikt(stor, 1.37), min_tid))
+    store_rader = et.oversikt_rader(stor, 1.25, 20.0)
+    legg_til("stil_oversikt (Styler.to_html)", "portefølje", len(store_rader),
+             _tid(lambda: stil_oversikt(store_rader).to_html(), min_tid))
+
+    # Portefølje: blandet tabell gjennom beregn_portefolje (som CLI-en bruker)
+    df = _portefolje(n_portefolje, rng)
+    legg_til("beregn_portefolje", "portefølje", n_portefolje,
+             _tid(lambda: batch.beregn_portefolje(df, 1.25, 20.0), min_tid))
+
+    # LED-inventar: romliste med blandede armaturtyper og styring
+    typer = [t for t in belysning.STANDARD_KATALOG.navn if t != "Egendefinert"]
+    inventar = pd.DataFrame({
+        "rom": rng.integers(0, n_portefolje // 5 + 1, n_portefolje).astype(str),
+        "etasje": rng.integers(1, 8, n_portefolje),
+        "armatur": rng.choice(typer, n_portefolje),
+        "antall": rng.integers(1, 10, n_portefolje),
+        "timer": rng.uniform(1000, 5000, n_portefolje),
+        "sensor": rng.random(n_portefolje) < 0.3,
+    })
+    legg_til("beregn_inventar+grupper", "portefølje", n_portefolje,
+             _tid(lambda: belysning.grupper(belysning.beregn_inventar(inventar), "rom"), min_tid))
+
+    # Porteføljeoversikt: 5 000 bygg × 8 tiltak, løpende oppdatering, filter, gruppering og én side
+    ider = list(batch.TILTAK_BATCH)
+    pf_rader = [(f"B{b}", {"ID": t, "Tiltak": t, "kWh": float(rng.uniform(0, 1e5)), "Invest": float(rng.uniform(0, 1e6))})
+                for b in range(5000) for t in ider]
+    pf = Portefolje(1.25, 20.0)
+    for b in range(5000):
+        pf.sett_region(f"B{b}", f"R{b % 12}")
+    pf.last_rader(pf_rader)
+    legg_til("Portefolje.oppdater (ett tiltak)", "portefølje", 1,
+             _tid(lambda: pf.oppdater("B17", {"ID": "iso", "Tiltak": "iso", "kWh": 1e4, "Invest": 1e5}), min_tid))
+    legg_til("Portefolje filter+grupper+side", "portefølje", len(pf_rader),
+             _tid(lambda: (pf.grupper("region", m := pf.maske(["iso", "vp"], payback_maks=10.0)),
+                           pf.side(m, "co2", True, 3, 50)), min_tid))
+
+    # Bygningsmodell: varmebehov for en bestand fra energimerkedata, uten og med cache per bygg-ID
+    bestand = pd.DataFrame({"bygg_id": np.arange(n_portefolje),
+                            "BRA": rng.uniform(300, 20_000, n_portefolje),
+                            "byggeaar": rng.integers(1950, 2020, n_portefolje),
+                            "etasjer": rng.integers(1, 8, n_portefolje),
+                            "kategori": rng.choice(list(bygningsmodell.KATEGORIER), n_portefolje)})
+
+    def kald_bestand():
+        bygningsmodell._BESTAND.clear()
+        return bygningsmodell.varmebehov_bestand(bestand)
+
+    legg_til("varmebehov_bestand (kald)", "portefølje", n_portefolje, _tid(kald_bestand, min_tid))
+    legg_til("varmebehov_bestand (cachet)", "portefølje", n_portefolje,
+             _tid(lambda: bygningsmodell.varmebehov_bestand(bestand), min_tid))
+    return res
+
+def _meta() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "tidspunkt": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "plattform": platform.platform(),
+        "cpu_antall": os.cpu_count(),
+    }
+
+def sammenlign(nye: list, gamle: list, maks_treghet: float) -> list:
+    """Gir liste med målinger som er tregere enn `maks_treghet` × forrige kjøring."""
+    forrige = {(r["navn"], r["modus"], r["n"]): r["sekunder"] for r in gamle}
+    tregere = []
+    for r in nye:
+        f = forrige.get((r["navn"], r["modus"], r["n"]))
+        if f:
+            faktor = r["sekunder"] / f
+            r["mot_forrige"] = faktor
+            if faktor > maks_treghet:
+                tregere.append(f"{r['navn']} ({r['modus']}, n={r['n']}): {faktor:.2f}× tregere")
+    return tregere
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--ut", help="Skriv resultat som JSON til denne filen (standard: stdout)")
+    ap.add_argument("--sammenlign", help="JSON fra en tidligere kjøring å sammenligne med")
+    ap.add_argument("--maks-treghet", type=float, default=1.5,
+                    help="Feil hvis en måling er mer enn denne faktoren tregere enn forrige (standard 1.5)")
+    ap.add_argument("--n-batch", type=int, default=100_000)
+    ap.add_argument("--n-portefolje", type=int, default=1_000_000)
+    ap.add_argument("--min-tid", type=float, default=0.2, help="Omtrentlig måletid per gjentakelse (s)")
+    ap.add_argument("--bare-golden", action="store_true", help="Bare sjekk fasitverdiene")
+    args = ap.parse_args(argv)
+
+    feil = sjekk_golden()
+    for f in feil:
+        print(f"FASITAVVIK: {f}", file=sys.stderr)
+    if args.bare_golden:
+        print("Fasitverdier OK" if not feil else f"{len(feil)} fasitavvik", file=sys.stderr)
+        return 1 if feil else 0
+
+    t0 = _time.perf_counter()
+    resultater = kjor_benchmarks(args.n_batch, args.n_portefolje, args.min_tid)
+    tregere = []
+    if args.sammenlign:
+        with open(args.sammenlign, encoding="utf-8") as f:
+            tregere = sammenlign(resultater, json.load(f)["resultater"], args.maks_treghet)
+        for t in tregere:
+            print(f"TREGERE: {t}", file=sys.stderr)
+
+    ut = {"meta": _meta(), "golden": {"ok": not feil, "avvik": feil},
+          "resultater": resultater, "total_sekunder": _time.perf_counter() - t0}
+    tekst = json.dumps(ut, ensure_ascii=False, indent=2)
+    if args.ut:
+        with open(args.ut, "w", encoding="utf-8") as f:
+            f.write(tekst + "\n")
+    else:
+        print(tekst)
+
+    for r in resultater:
+        rate = f"{r['rader_per_s']:>14,.0f} rader/s".replace(",", " ") if r["n"] > 1 else f"{r['sekunder'] * 1e6:>10.2f} µs/kall"
+        print(f"{r['navn']:<34} {r['modus']:<10} n={r['n']:<9} {rate}", file=sys.stderr)
+    return 1 if (feil or tregere) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+"""
+Energitiltak – beregningskjerne for Energisparekalkulator.
+
+Pakken har ingen UI-avhengigheter og importerer verken Streamlit, pandas eller NumPy,
+slik at den starter raskt i batchjobber og workere. De vektoriserte funksjonene
+ligger i `energitiltak.batch` og lastes bare når de brukes.
+"""
+from .beregning import (
+    RHO, CP_J, HDD, Kh, HOURS_YEAR,
+    fmt_int, fmt_1, nok_og_co2, payback_years,
+    daily_hours, annual_hours_from_schedule, areal_til_kwp,
+    etterisolering, besparelse_varmegjenvinner, besparelse_sfp, besparelse_varmepumpe,
+    besparelse_tempreduksjon, besparelse_nattsenking,
+    LUMINAIRE_MAP, LUMINAIRE_INDEKS, besparelse_belysning, LEVETID,
+)
+from .cache import memo, memo_beregn
+from .oversikt import upsert_tiltak, oversikt_rader, oversikt_summer, legg_til_livslop
@@ -0,0 +1,409 @@
+"""
+Lokalt HTTP/JSON-API for tiltaksberegningene og oversikten (bare standardbiblioteket, ingen nett).
+
+    python -m energitiltak.api --port 8765
+
+Endepunkter:
+
+    GET  /helse               {"ok": true}
+    GET  /tiltak              tiltak-ID -> inputkolonner og standard investeringssatser
+    POST /beregn              {"tiltak": "iso", "input": {...}, "pris": 1.25, "utslipp_g": 20, "invest": valgfri}
+                              eller {"beregninger": [...]} for mange på én gang
+    POST /oversikt            {"tiltak": [{"ID", "Tiltak", "kWh", "Invest"}, ...], "pris": ..., "utslipp_g": ...}
+
+Samtidige /beregn-forespørsler samles i mikrobatcher på event-løkka: den første
+beregningen i en batch venter høyst VENTETID sekunder på flere, og hele batchen
+beregnes gruppert per tiltak med de vektoriserte funksjonene i batch.py. Svaret for
+hver beregning er det samme som fanene gir (kWh, kr/år, kg CO₂/år, invest, tilbakebetaling).
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+from collections import deque
+from http import HTTPStatus
+
+import numpy as np
+
+from .batch import STANDARD_SATSER, TILTAK_BATCH, nok_og_co2_batch, payback_years_batch, standard_invest_batch
+from .oversikt import oversikt_rader, oversikt_summer
+
+VENTETID = 0.002          # maks ventetid (s) før en batch beregnes
+MAKS_BATCH = 8192         # beregninger per batch
+MAKS_KROPP = 16 * 2**20   # maks størrelse på forespørsel (byte)
+STANDARD_PRIS = 1.25
+STANDARD_UTSLIPP = 20.0
+
+class Foresporselsfeil(ValueError):
+    """Ugyldig input fra klienten (gir 400)."""
+
+# ===============================
+# Validering
+# ===============================
+def _tall(verdi, navn: str) -> float:
+    if isinstance(verdi, bool) or not isinstance(verdi, (int, float)):
+        raise Foresporselsfeil(f"'{navn}' må være et tall")
+    try:
+        verdi = float(verdi)
+    except OverflowError:
+        verdi = math.inf
+    if not math.isfinite(verdi):
+        raise Foresporselsfeil(f"'{navn}' må være et endelig tall")
+    return verdi
+
+def valider(b: dict) -> tuple:
+    """Beregningsobjekt -> (tiltak-ID, inputverdier, satser, pris, utslipp, invest eller NaN)."""
+    if not isinstance(b, dict):
+        raise Foresporselsfeil("Hver beregning må være et JSON-objekt")
+    tiltak_id = b.get("tiltak")
+    if not isinstance(tiltak_id, str) or tiltak_id not in TILTAK_BATCH:
+        raise Foresporselsfeil(f"Ukjent tiltak: {tiltak_id!r}")
+    inp = b.get("input") or {}
+    if not isinstance(inp, dict):
+        raise Foresporselsfeil("'input' må være et objekt")
+    kolonner = TILTAK_BATCH[tiltak_id][1]
+    mangler = [k for k in kolonner if k not in inp]
+    if mangler:
+        raise Foresporselsfeil(f"Mangler input for {tiltak_id!r}: {', '.join(mangler)}")
+    verdier = tuple(_tall(inp[k], k) for k in kolonner)
+    satser = tuple(_tall(inp.get(k, v), k) for k, v in STANDARD_SATSER[tiltak_id].items())
+    invest = b.get("invest")
+    return (tiltak_id, verdier, satser,
+            _tall(b.get("pris", STANDARD_PRIS), "pris"),
+            _tall(b.get("utslipp_g", STANDARD_UTSLIPP), "utslipp_g"),
+            float("nan") if invest is None else _tall(invest, "invest"))
+
+def _endelig(data):
+    """Erstatter NaN/±inf med None (null), også inni lister og objekter; JSON har ikke slike tall."""
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if isinstance(data, dict):
+        return {k: _endelig(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_endelig(v) for v in data]
+    return data
+
+def beregn_mange(beregninger: list) -> list:
+    """
+    Validerte beregninger (fra valider) -> resultatdicts, vektorisert per tiltak. Endelige
+    input kan likevel gi overflyt (f.eks. A_m2=1e308); slike resultater blir None.
+    """
+    ut = [None] * len(beregninger)
+    grupper = {}
+    for i, b in enumerate(beregninger):
+        grupper.setdefault(b[0], []).append(i)
+    for tiltak_id, idx in grupper.items():
+        fn, kolonner = TILTAK_BATCH[tiltak_id]
+        verdier = np.array([beregninger[i][1] for i in idx], dtype=float)
+        satser = np.array([beregninger[i][2] for i in idx], dtype=float)
+        rest = np.array([beregninger[i][3:] for i in idx], dtype=float)
+        inputs = {k: verdier[:, j] for j, k in enumerate(kolonner)}
+        inputs.update({k: satser[:, j] for j, k in enumerate(STANDARD_SATSER[tiltak_id])})
+
+        kWh = fn(*(inputs[k] for k in kolonner))
+        kr_aar, co2_kg = nok_og_co2_batch(kWh, rest[:, 0], rest[:, 1])
+        standard = np.broadcast_to(standard_invest_batch(tiltak_id, inputs), kWh.shape)
+        invest = np.where(np.isnan(rest[:, 2]), standard, rest[:, 2])
+        pb = payback_years_batch(invest, kr_aar)
+        for j, i in enumerate(idx):
+            ut[i] = {"tiltak": tiltak_id, **_endelig({"kWh": float(kWh[j]), "kr_aar": float(kr_aar[j]),
+                                                      "co2_kg": float(co2_kg[j]), "invest": float(invest[j]),
+                                                      "payback": float(pb[j])})}
+    return ut
+
+# ===============================
+# Mikrobatching
+# ===============================
+class Mikrobatcher:
+    """
+    Samler beregninger fra samtidige forespørsler og beregner dem samlet. Den første
+    beregningen starter en frist på `ventetid` sekunder; alt som kommer inn før fristen
+    (eller til batchen har `maks` beregninger) går i samme kall til beregn_mange.
+    """
+
+    def __init__(self, ventetid: float = VENTETID, maks: int = MAKS_BATCH):
+        self.ventetid = ventetid
+        self.maks = maks
+        self._ventende = []
+        self._antall = 0
+        self._frist = None
+        self.batcher = 0
+        self.beregninger = 0
+
+    def legg_til(self, beregninger: list, ferdig):
+        """Legger validerte beregninger i neste batch; `ferdig(resultater, feil)` kalles etterpå."""
+        self._ventende.append((beregninger, ferdig))
+        self._antall += len(beregninger)
+        if self._antall >= self.maks:
+            self._kjor()
+        elif self._frist is None:
+            loop = asyncio.get_running_loop()
+            self._frist = (loop.call_later(self.ventetid, self._kjor) if self.ventetid > 0
+                           else loop.call_soon(self._kjor))
+
+    async def beregn(self, beregninger: list) -> list:
+        """Som legg_til, men venter på og gir resultatet."""
+        fut = asyncio.get_running_loop().create_future()
+
+        def ferdig(res, feil):
+            if not fut.done():
+                fut.set_result(res) if feil is None else fut.set_exception(feil)
+        self.legg_til(beregninger, ferdig)
+        return await fut
+
+    def stopp(self):
+        if self._frist is not None:
+            self._frist.cancel()
+            self._frist = None
+        self._kjor()
+
+    def _kjor(self):
+        if self._frist is not None:
+            self._frist.cancel()
+            self._frist = None
+        ventende, self._ventende, self._antall = self._ventende, [], 0
+        if not ventende:
+            return
+        alle = [b for beregninger, _ in ventende for b in beregninger]
+        try:
+            res = beregn_mange(alle)
+        except Exception as e:  # noqa: BLE001 – feilen sendes til hver venter
+            for _, ferdig in ventende:
+                ferdig(None, e)
+            return
+        self.batcher += 1
+        self.beregninger += len(alle)
+        start = 0
+        for beregninger, ferdig in ventende:
+            ferdig(res[start:start + len(beregninger)], None)
+            start += len(beregninger)
+
+# ===============================
+# HTTP
+# ===============================
+MAKS_HODE = 64 * 2**10
+
+def _http_svar(status: HTTPStatus, data, hold: bool) -> bytes:
+    kropp = json.dumps(_endelig(data), ensure_ascii=False, allow_nan=False).encode("utf-8")
+    return (f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(kropp)}\r\nConnection: {'keep-alive' if hold else 'close'}\r\n\r\n"
+            ).encode("latin-1") + kropp
+
+class _Forbindelse(asyncio.Protocol):
+    """
+    Én klientforbindelse (HTTP/1.1 med keep-alive og pipelining). Svarene sendes i samme
+    rekkefølge som forespørslene, også når noen venter på en mikrobatch.
+    """
+
+    def __init__(self, server: "Server"):
+        self.server = server
+        self.transport = None
+        self._buf = bytearray()
+        self._svar = deque()      # [svar-bytes eller None, hold forbindelsen]
+        self._lukket = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self._lukket = True
+
+    def data_received(self, data: bytes):
+        self._buf += data
+        while not self._lukket:
+            slutt = self._buf.find(b"\r\n\r\n")
+            if slutt < 0:
+                if len(self._buf) > MAKS_HODE:
+                    self._feil(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "For store hoder")
+                return
+            linjer = self._buf[:slutt].decode("latin-1").split("\r\n")
+            try:
+                metode, sti, versjon = linjer[0].split()
+            except ValueError:
+                return self._feil(HTTPStatus.BAD_REQUEST, "Ugyldig forespørsel")
+            lengde = 0
+            hold = versjon == "HTTP/1.1"
+            for h in linjer[1:]:
+                navn, _, verdi = h.partition(":")
+                navn = navn.strip().lower()
+                if navn == "content-length":
+                    try:
+                        lengde = int(verdi)
+                        if lengde < 0:
+                            raise ValueError(verdi)
+                    except ValueError:
+                        return self._feil(HTTPStatus.BAD_REQUEST, "Ugyldig Content-Length")
+                elif navn == "connection":
+                    hold = verdi.strip().lower() != "close" if hold else verdi.strip().lower() == "keep-alive"
+            if lengde > MAKS_KROPP:
+                return self._feil(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "For stor forespørsel")
+            start = slutt + 4
+            if len(self._buf) < start + lengde:
+                return
+            kropp = bytes(self._buf[start:start + lengde])
+            del self._buf[:start + lengde]
+            self._behandle(metode, sti.split("?", 1)[0], kropp, hold)
+            if not hold:
+                self._lukket = True
+
+    def _feil(self, status: HTTPStatus, melding: str):
+        self._lukket = True
+        self._svar.append([_http_svar(status, {"feil": melding}, False), False])
+        self._send()
+
+    def _behandle(self, metode: str, sti: str, kropp: bytes, hold: bool):
+        plass = [None, hold]
+        self._svar.append(plass)
+
+        def ferdig(status, data):
+            plass[0] = _http_svar(status, data, hold)
+            self._send()
+        self.server.ruter(metode, sti, kropp, ferdig)
+
+    def _send(self):
+        if self.transport.is_closing():
+            return
+        while self._svar and self._svar[0][0] is not None:
+            svar, hold = self._svar.popleft()
+            self.transport.write(svar)
+            if not hold:
+                self.transport.close()
+                return
+
+class Server:
+    """Minimal HTTP/1.1-server (keep-alive, JSON) over asyncio med mikrobatching av /beregn."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, ventetid: float = VENTETID):
+        self.host = host
+        self.port = port
+        self.batcher = Mikrobatcher(ventetid)
+        self._server = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(lambda: _Forbindelse(self), self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stopp(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self.batcher.stopp()
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    def ruter(self, metode: str, sti: str, kropp: bytes, ferdig):
+        """Behandler én forespørsel; `ferdig(status, data)` kalles straks eller når batchen er beregnet."""
+        try:
+            if metode == "GET" and sti == "/helse":
+                return ferdig(HTTPStatus.OK, {"ok": True, "batcher": self.batcher.batcher,
+                                              "beregninger": self.batcher.beregninger})
+            if metode == "GET" and sti == "/tiltak":
+                return ferdig(HTTPStatus.OK, {t: {"input": list(k), "satser": STANDARD_SATSER[t]}
+                                              for t, (_, k) in TILTAK_BATCH.items()})
+            if metode == "POST" and sti in ("/beregn", "/oversikt"):
+                try:
+                    data = json.loads(kropp or b"{}")
+                except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                    raise Foresporselsfeil(f"Ugyldig JSON: {e}") from None
+                except RecursionError:
+                    raise Foresporselsfeil("Ugyldig JSON: for dyp nøsting") from None
+                if not isinstance(data, dict):
+                    raise Foresporselsfeil("Forventet et JSON-objekt")
+                if sti == "/oversikt":
+                    return ferdig(HTTPStatus.OK, oversikt(data))
+                if "beregninger" in data:
+                    if not isinstance(data["beregninger"], list):
+                        raise Foresporselsfeil("'beregninger' må være en liste")
+                    beregninger, liste = [valider(b) for b in data["beregninger"]], True
+                else:
+                    beregninger, liste = [valider(data)], False
+                if not beregninger:
+                    return ferdig(HTTPStatus.OK, {"resultater": []})
+
+                def svar(res, feil):
+                    if feil is not None:
+                        ferdig(HTTPStatus.INTERNAL_SERVER_ERROR, {"feil": str(feil)})
+                    else:
+                        ferdig(HTTPStatus.OK, {"resultater": res} if liste else res[0])
+                return self.batcher.legg_til(beregninger, svar)
+            return ferdig(HTTPStatus.NOT_FOUND, {"feil": f"Ukjent endepunkt: {metode} {sti}"})
+        except Foresporselsfeil as e:
+            return ferdig(HTTPStatus.BAD_REQUEST, {"feil": str(e)})
+        except Exception as e:  # noqa: BLE001 – forbindelsen må alltid få et svar
+            return ferdig(HTTPStatus.INTERNAL_SERVER_ERROR, {"feil": f"{type(e).__name__}: {e}"})
+
+def oversikt(data: dict) -> dict:
+    """Oversiktsrader og summer for en tiltaksliste (samme tall som Oversikt-fanen)."""
+    rader = data.get("tiltak")
+    if not isinstance(rader, list):
+        raise Foresporselsfeil("'tiltak' må være en liste")
+    try:
+        liste = [{"ID": r.get("ID", ""), "Tiltak": r.get("Tiltak", r.get("ID", "")), "kWh": _tall(r["kWh"], "kWh"),
+                  "Invest": _tall(r.get("Invest", 0.0), "Invest"), "Tillegg": _tall(r.get("Tillegg", 0.0), "Tillegg"),
+                  "Eksport": _tall(r.get("Eksport", 0.0), "Eksport"),
+                  "Eksportpris": _tall(r.get("Eksportpris", 0.0), "Eksportpris")}
+                 for r in rader]
+    except (KeyError, AttributeError):
+        raise Foresporselsfeil("Hver rad må være et objekt med minst 'kWh'") from None
+    rows = oversikt_rader(liste, _tall(data.get("pris", STANDARD_PRIS), "pris"),
+                          _tall(data.get("utslipp_g", STANDARD_UTSLIPP), "utslipp_g"))
+    return {"rader": rows, "summer": oversikt_summer(rows)}
+
+# ===============================
+# Klient (for andre verktøy og tester)
+# ===============================
+class Klient:
+    """Enkel synkron klient med vedvarende forbindelse (http.client)."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, timeout: float = 30.0):
+        import http.client
+
+        self._con = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _kall(self, metode: str, sti: str, data=None) -> dict:
+        kropp = None if data is None else json.dumps(data).encode("utf-8")
+        self._con.request(metode, sti, body=kropp, headers={"Content-Type": "application/json"})
+        svar = self._con.getresponse()
+        res = json.loads(svar.read())
+        if svar.status != 200:
+            raise RuntimeError(f"{svar.status}: {res.get('feil', res)}")
+        return res
+
+    def beregn(self, tiltak: str, input: dict, **kwargs) -> dict:
+        return self._kall("POST", "/beregn", {"tiltak": tiltak, "input": input, **kwargs})
+
+    def beregn_mange(self, beregninger: list) -> list:
+        return self._kall("POST", "/beregn", {"beregninger": beregninger})["resultater"]
+
+    def oversikt(self, tiltak: list, pris: float = STANDARD_PRIS, utslipp_g: float = STANDARD_UTSLIPP) -> dict:
+        return self._kall("POST", "/oversikt", {"tiltak": tiltak, "pris": pris, "utslipp_g": utslipp_g})
+
+    def lukk(self):
+        self._con.close()
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m energitiltak.api", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1", help="Adresse (standard 127.0.0.1, bare lokalt)")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--ventetid-ms", type=float, default=VENTETID * 1000.0,
+                    help="Maks ventetid før en mikrobatch beregnes (standard 2 ms)")
+    args = ap.parse_args(argv)
+
+    async def kjor():
+        server = await Server(args.host, args.port, args.ventetid_ms / 1000.0).start()
+        print(f"Lytter på http://{server.host}:{server.port}", file=sys.stderr)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(kjor())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Vektoriserte (NumPy/pandas) versjoner av tiltaksberegningene for mange bygg.
+"""
+import numpy as np
+import pandas as pd
+
+from .beregning import RHO, CP_J, Kh, HOURS_YEAR
+
+# ===============================
+# Batch (vektorisert over mange bygg)
+# ===============================
+# Samme formler som de skalare funksjonene i beregning.py, men på arrays – én rad per bygg.
+# Rekkefølgen på regneoperasjonene er den samme, slik at tallene blir identiske.
+def _arr(x) -> np.ndarray:
+    return np.asarray(x, dtype=float)
+
+def nok_og_co2_batch(kWh, pris_kr_per_kWh, utslipp_g_per_kWh):
+    kWh = _arr(kWh)
+    kr_aar = kWh * _arr(pris_kr_per_kWh)
+    kg_co2_aar = kWh * (_arr(utslipp_g_per_kWh) / 1000.0)
+    return kr_aar, kg_co2_aar
+
+def payback_years_batch(invest_kr, saving_kr_per_year) -> np.ndarray:
+    """Som payback_years, men NaN der payback_years gir None."""
+    invest_kr, saving = np.broadcast_arrays(_arr(invest_kr), _arr(saving_kr_per_year))
+    ok = saving > 0
+    pb = np.full(saving.shape, np.nan)
+    np.divide(invest_kr, saving, out=pb, where=ok)
+    return pb
+
+def etterisolering_batch(A_m2, U_old, U_new) -> np.ndarray:
+    dU = np.maximum(_arr(U_old) - _arr(U_new), 0.0)
+    return dU * _arr(A_m2) * Kh / 1000.0
+
+def besparelse_varmegjenvinner_batch(qv_m3_h, eta_old, eta_new, driftstimer) -> np.ndarray:
+    d_eta = np.maximum(_arr(eta_new) - _arr(eta_old), 0.0)
+    qv_m3_s = _arr(qv_m3_h) / 3600.0
+    H_W_per_K = RHO * CP_J * qv_m3_s
+    duty = _arr(driftstimer) / HOURS_YEAR
+    E_kWh = (H_W_per_K / 1000.0) * d_eta * Kh * duty
+    return np.maximum(E_kWh, 0.0)
+
+def besparelse_sfp_batch(qv_m3_h, SFP_old, SFP_new, driftstimer) -> np.ndarray:
+    dSFP = np.maximum(_arr(SFP_old) - _arr(SFP_new), 0.0)
+    qv_m3_s = _arr(qv_m3_h) / 3600.0
+    return np.maximum(dSFP * qv_m3_s * _arr(driftstimer), 0.0)
+
+def besparelse_varmepumpe_batch(Q_netto_kWh_year, eta_old, COP_new, dekningsgrad) -> np.ndarray:
+    eta_old = np.maximum(_arr(eta_old), 1e-6)
+    COP_new = np.maximum(_arr(COP_new), 1e-6)
+    dekningsgrad = np.clip(_arr(dekningsgrad), 0.0, 1.0)
+    Q_vp = _arr(Q_netto_kWh_year) * dekningsgrad
+    return np.maximum(Q_vp * (1.0/eta_old - 1.0/COP_new), 0.0)
+
+def besparelse_tempreduksjon_batch(Q_space_kWh_year, delta_T_C) -> np.ndarray:
+    return np.maximum(_arr(Q_space_kWh_year) * 0.05 * np.maximum(_arr(delta_T_C), 0.0), 0.0)
+
+def besparelse_nattsenking_batch(Q_space_kWh_year, setback_C, timer_per_dogn) -> np.ndarray:
+    duty = np.clip(_arr(timer_per_dogn), 0.0, 24.0) / 24.0
+    return np.maximum(_arr(Q_space_kWh_year) * 0.05 * np.maximum(_arr(setback_C), 0.0) * duty, 0.0)
+
+def besparelse_belysning_batch(ant_armatur, W_gammel, W_led, timer_per_aar) -> np.ndarray:
+    dW = np.maximum(_arr(W_gammel) - _arr(W_led), 0.0)
+    return (dW * np.trunc(_arr(ant_armatur)) * _arr(timer_per_aar)) / 1000.0
+
+def solceller_batch(areal_m2, utnyttelse, kwp_per_m2, spes_prod) -> np.ndarray:
+    kWp = np.maximum(_arr(areal_m2) * _arr(utnyttelse) * _arr(kwp_per_m2), 0.0)
+    return kWp * _arr(spes_prod)
+
+# tiltak-ID -> (batchfunksjon, kolonnenavn i input-DataFrame)
+TILTAK_BATCH = {
+    "iso":   (etterisolering_batch,             ("A_m2", "U_old", "U_new")),
+    "hrv":   (besparelse_varmegjenvinner_batch, ("qv_m3_h", "eta_old", "eta_new", "driftstimer")),
+    "sfp":   (besparelse_sfp_batch,             ("qv_m3_h", "SFP_old", "SFP_new", "driftstimer")),
+    "vp":    (besparelse_varmepumpe_batch,      ("Q_netto_kWh_year", "eta_old", "COP_new", "dekningsgrad")),
+    "temp":  (besparelse_tempreduksjon_batch,   ("Q_space_kWh_year", "delta_T_C")),
+    "night": (besparelse_nattsenking_batch,     ("Q_space_kWh_year", "setback_C", "timer_per_dogn")),
+    "led":   (besparelse_belysning_batch,       ("ant_armatur", "W_gammel", "W_led", "timer_per_aar")),
+    "pv":    (solceller_batch,                  ("areal_m2", "utnyttelse", "kwp_per_m2", "spes_prod")),
+}
+
+def beregn_batch(tiltak_id: str, inputs, pris_kr_per_kWh, utslipp_g_per_kWh, invest_kr=None) -> pd.DataFrame:
+    """
+    Beregner ett tiltak for mange rader i én vektorisert runde.
+    `inputs` er en DataFrame (eller dict av arrays) med kolonnene i TILTAK_BATCH.
+    Pris, utslipp og invest kan være skalarer eller arrays med én verdi per rad.
+    """
+    if tiltak_id not in TILTAK_BATCH:
+        raise ValueError(f"Ukjent tiltak: {tiltak_id!r}")
+    fn, kolonner = TILTAK_BATCH[tiltak_id]
+    mangler = [k for k in kolonner if k not in inputs]
+    if mangler:
+        raise ValueError(f"Mangler kolonner for {tiltak_id!r}: {', '.join(mangler)}")
+
+    kWh = fn(*(inputs[k] for k in kolonner))
+    kr_aar, co2_kg = nok_og_co2_batch(kWh, pris_kr_per_kWh, utslipp_g_per_kWh)
+    kWh, kr_aar, co2_kg = np.broadcast_arrays(kWh, kr_aar, co2_kg)
+
+    index = inputs.index if isinstance(inputs, pd.DataFrame) else None
+    out = pd.DataFrame({"kWh": kWh, "kr_aar": kr_aar, "co2_kg": co2_kg}, index=index)
+    if invest_kr is not None:
+        out["invest"] = np.broadcast_to(_arr(invest_kr), kWh.shape)
+        out["payback"] = payback_years_batch(out["invest"].to_numpy(), kr_aar)
+    return out
+
+# ===============================
+# Standard investering (samme grove satser som i fanene)
+# ===============================
+# tiltak-ID -> {satskolonne: standardverdi}. En kolonne med samme navn i input overstyrer per rad.
+STANDARD_SATSER = {
+    "iso":   {"kr_per_m2": 2800.0},
+    "hrv":   {"kr_per_m3h": 35.0},
+    "sfp":   {"kr_per_aggregat": 400_000.0},
+    "vp":    {"kr_per_kw": 16_000.0, "fullasttimer": 2000.0},
+    "temp":  {"kr_invest": 50_000.0},
+    "night": {"kr_invest": 75_000.0},
+    "led":   {"kr_per_armatur": 3000.0},
+    "pv":    {"kr_per_kwp": 10_500.0},
+}
+
+def standard_invest_batch(tiltak_id: str, inputs, satser: dict = None) -> np.ndarray:
+    """Grov standardinvestering per rad, etter samme regler som fanene i appen."""
+    sats = dict(STANDARD_SATSER[tiltak_id])
+    sats.update(satser or {})
+    for k in sats:
+        if k in inputs:
+            sats[k] = inputs[k]
+
+    if tiltak_id == "iso":
+        inv = _arr(sats["kr_per_m2"]) * _arr(inputs["A_m2"])
+    elif tiltak_id == "hrv":
+        inv = _arr(sats["kr_per_m3h"]) * _arr(inputs["qv_m3_h"])
+    elif tiltak_id == "sfp":
+        inv = _arr(sats["kr_per_aggregat"])
+    elif tiltak_id == "vp":
+        Q_vp = _arr(inputs["Q_netto_kWh_year"]) * _arr(inputs["dekningsgrad"])
+        vp_kw = Q_vp / np.maximum(_arr(sats["fullasttimer"]), 1.0)
+        inv = vp_kw * _arr(sats["kr_per_kw"])
+    elif tiltak_id in ("temp", "night"):
+        inv = _arr(sats["kr_invest"])
+    elif tiltak_id == "led":
+        inv = _arr(sats["kr_per_armatur"]) * _arr(inputs["ant_armatur"])
+    elif tiltak_id == "pv":
+        kWp = np.maximum(_arr(inputs["areal_m2"]) * _arr(inputs["utnyttelse"]) * _arr(inputs["kwp_per_m2"]), 0.0)
+        inv = _arr(sats["kr_per_kwp"]) * kWp
+    else:
+        raise ValueError(f"Ukjent tiltak: {tiltak_id!r}")
+    return inv
+
+def beregn_portefolje(df: pd.DataFrame, pris_kr_per_kWh, utslipp_g_per_kWh, satser: dict = None) -> pd.DataFrame:
+    """
+    Beregner en blandet tabell med én rad per bygg og tiltak (kolonnen 'tiltak' har tiltak-ID).
+    Radene grupperes per tiltak og beregnes vektorisert; rekkefølgen i resultatet er som i input.
+    En kolonne 'invest' overstyrer standardinvesteringen der den er fylt ut, og kolonnene
+    'pris'/'utslipp_g' overstyrer pris og utslippsfaktor per rad.
+    """
+    ukjent = set(df["tiltak"].unique()) - set(TILTAK_BATCH)
+    if ukjent:
+        raise ValueError(f"Ukjente tiltak: {', '.join(sorted(map(str, ukjent)))}")
+
+    out = pd.DataFrame(index=df.index, columns=["kWh", "kr_aar", "co2_kg", "invest", "payback"], dtype=float)
+    for tiltak_id, del_df in df.groupby("tiltak", sort=False):
+        pris = del_df["pris"] if "pris" in del_df else pris_kr_per_kWh
+        utslipp = del_df["utslipp_g"] if "utslipp_g" in del_df else utslipp_g_per_kWh
+        invest = np.broadcast_to(standard_invest_batch(tiltak_id, del_df, (satser or {}).get(tiltak_id)), len(del_df))
+        if "invest" in del_df:
+            invest = np.where(del_df["invest"].notna(), del_df["invest"].to_numpy(dtype=float), invest)
+        res = beregn_batch(tiltak_id, del_df, pris, utslipp, invest)
+        out.loc[del_df.index, res.columns] = res
+    return out
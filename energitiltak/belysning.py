@@ -0,0 +1,212 @@
+"""
+LED-ombygging for hele bygg: inventarliste med rom, etasje og armaturtype.
+
+Armaturkatalogen indekseres på navn (standardlisten LUMINAIRE_MAP, eventuelt utvidet
+fra fil), og inventaret slås opp mot katalogen og beregnes i én vektorisert operasjon.
+Hver rad kan ha egen brukstid, tilstedeværelsessensor og dagslysstyring:
+
+    kWh spart = max(W_gammel - W_led · (1 - sensor) · (1 - dagslys), 0) · antall · timer / 1000
+
+Uten styring blir det samme formel som besparelse_belysning.
+"""
+import numpy as np
+import pandas as pd
+
+from .beregning import HOURS_YEAR, LUMINAIRE_MAP
+from . import timesimulering as ts
+
+# Standard reduksjon i brukstid for LED når kolonnen er sann/usann i stedet for en andel
+SENSOR_REDUKSJON = 0.30
+DAGSLYS_REDUKSJON = 0.20
+KR_PER_ARMATUR = 3000.0
+
+KOL_ROM = "rom"
+KOL_ETASJE = "etasje"
+KOL_TYPE = "armatur"
+KOL_ANTALL = "antall"
+KOL_TIMER = "timer"
+KOL_SENSOR = "sensor"
+KOL_DAGSLYS = "dagslys"
+
+# Alternative kolonnenavn i inventarfiler -> standardnavn
+_ALIAS = {
+    "room": KOL_ROM, "romnr": KOL_ROM, "rom_nr": KOL_ROM,
+    "floor": KOL_ETASJE, "plan": KOL_ETASJE, "etg": KOL_ETASJE,
+    "type": KOL_TYPE, "armaturtype": KOL_TYPE, "luminaire": KOL_TYPE, "navn": KOL_TYPE,
+    "count": KOL_ANTALL, "ant": KOL_ANTALL, "stk": KOL_ANTALL, "ant_armatur": KOL_ANTALL,
+    "hours": KOL_TIMER, "driftstimer": KOL_TIMER, "timer_per_aar": KOL_TIMER,
+    "occupancy": KOL_SENSOR, "tilstedevaerelse": KOL_SENSOR, "tilstedeværelse": KOL_SENSOR,
+    "daylight": KOL_DAGSLYS, "dagslysstyring": KOL_DAGSLYS,
+    "w_gammel": "W_gammel", "w_led": "W_led",
+}
+
+# ===============================
+# Katalog
+# ===============================
+class Katalog:
+    """
+    Armaturtyper indeksert på navn, med effekt før (W) og LED-effekt etter (W, eller
+    andel av gammel effekt) samt investering per armatur.
+    """
+
+    def __init__(self, rader: list):
+        self.navn = [str(r["navn"]) for r in rader]
+        self.indeks = {n: i for i, n in enumerate(self.navn)}
+        gammel = np.array([np.nan if r.get("gammel_W") is None else float(r["gammel_W"]) for r in rader])
+        faktor = np.array([float(r.get("led_factor", 0.40)) for r in rader])
+        led = np.array([np.nan if r.get("led_W") is None else float(r["led_W"]) for r in rader])
+        self.gammel_W = gammel
+        self.led_W = np.where(np.isnan(led), gammel * faktor, led)
+        self.led_factor = faktor
+        kr = np.array([np.nan if r.get("kr_per_armatur") is None else float(r["kr_per_armatur"]) for r in rader])
+        self.kr = np.where(np.isnan(kr), KR_PER_ARMATUR, kr)   # 0 kr er en gyldig kostnad
+
+    def __contains__(self, navn) -> bool:
+        return navn in self.indeks
+
+    def __len__(self) -> int:
+        return len(self.navn)
+
+    def __getitem__(self, navn: str) -> dict:
+        i = self.indeks[navn]
+        return {"navn": navn, "gammel_W": self.gammel_W[i], "led_W": self.led_W[i],
+                "led_factor": self.led_factor[i], "kr_per_armatur": self.kr[i]}
+
+    def oppslag(self, typer) -> np.ndarray:
+        """Katalogindeks for hver rad; KeyError med de ukjente navnene hvis noen mangler."""
+        idx = pd.Index(self.navn).get_indexer(pd.Index(typer, dtype=object).astype(str))
+        if (idx < 0).any():
+            ukjente = sorted(set(np.asarray(typer, dtype=object)[idx < 0].astype(str)))
+            raise KeyError("Ukjente armaturtyper: " + ", ".join(ukjente[:10]) + (" …" if len(ukjente) > 10 else ""))
+        return idx
+
+    def utvid(self, rader: list) -> "Katalog":
+        """Ny katalog der `rader` legges til eller erstatter typer med samme navn."""
+        alle = {n: self[n] for n in self.navn}
+        alle.update({str(r["navn"]): r for r in rader})
+        return Katalog(list(alle.values()))
+
+STANDARD_KATALOG = Katalog(LUMINAIRE_MAP)
+
+def last_katalog(fil, basis: Katalog = STANDARD_KATALOG) -> Katalog:
+    """
+    Leser armaturtyper fra CSV/Parquet (kolonner navn, gammel_W og led_W eller led_factor,
+    valgfritt kr_per_armatur) og legger dem til standardkatalogen.
+    """
+    df = _les(fil)
+    df.columns = [str(k).strip().lower() for k in df.columns]
+    if "navn" not in df.columns or "gammel_w" not in df.columns:
+        raise ValueError("Katalogen må ha kolonnene 'navn' og 'gammel_W'")
+    df = df.rename(columns={"gammel_w": "gammel_W", "led_w": "led_W"})
+    rader = []
+    for r in df.to_dict("records"):
+        rad = {"navn": r["navn"], "gammel_W": r["gammel_W"]}
+        if pd.notna(r.get("led_W", np.nan)):
+            rad["led_W"] = r["led_W"]
+        if pd.notna(r.get("led_factor", np.nan)):
+            rad["led_factor"] = r["led_factor"]
+        if pd.notna(r.get("kr_per_armatur", np.nan)):
+            rad["kr_per_armatur"] = r["kr_per_armatur"]
+        rader.append(rad)
+    return basis.utvid(rader)
+
+# ===============================
+# Inventar
+# ===============================
+def _les(fil) -> pd.DataFrame:
+    navn = str(getattr(fil, "name", fil)).lower()
+    if navn.endswith((".parquet", ".pq")):
+        return pd.read_parquet(fil)
+    return ts.les_csv(fil)
+
+def last_inventar(fil) -> pd.DataFrame:
+    """Leser en inventarliste (CSV/Parquet) og normaliserer kolonnenavnene."""
+    return normaliser_inventar(_les(fil))
+
+def normaliser_inventar(df: pd.DataFrame) -> pd.DataFrame:
+    """Kolonnenavn til standardnavnene (rom, etasje, armatur, antall, timer, sensor, dagslys)."""
+    df = df.rename(columns=lambda k: _ALIAS.get(str(k).strip().lower(), str(k).strip().lower()))
+    for kol in (KOL_TYPE, KOL_ANTALL):
+        if kol not in df.columns:
+            raise ValueError(f"Inventaret mangler kolonnen '{kol}'")
+    return df
+
+def _andel(df: pd.DataFrame, kol: str, standard: float) -> np.ndarray:
+    """
+    Styringskolonne som andel: sann/ja/1 gir standardreduksjonen, tall under 1 er en andel
+    og tall over 1 prosent (30 og «30 %» gir 0,30). Tall- og tekstkolonner tolkes likt.
+    """
+    if kol not in df.columns:
+        return np.zeros(len(df))
+    x = df[kol]
+    if pd.api.types.is_bool_dtype(x):
+        return np.where(x.to_numpy(dtype=bool), standard, 0.0)
+    if pd.api.types.is_numeric_dtype(x):
+        tall = pd.to_numeric(x, errors="coerce")
+    else:
+        tekst = x.astype(str).str.strip().str.lower()
+        tall = pd.to_numeric(tekst.str.rstrip("%").str.strip().str.replace(",", ".", regex=False), errors="coerce")
+        tall = tall.where(~tekst.isin(("true", "ja", "j", "x", "yes", "sann")), 1.0)
+    tall = tall.fillna(0.0).to_numpy(dtype=float)
+    if ((tall < 0.0) | (tall > 100.0)).any():
+        raise ValueError(f"Kolonnen '{kol}' må være ja/nei, en andel (0–1) eller prosent (0–100)")
+    return np.where(tall == 1.0, standard, np.where(tall > 1.0, tall / 100.0, tall))
+
+def beregn_inventar(df: pd.DataFrame, katalog: Katalog = STANDARD_KATALOG, timer: float = 3000.0) -> pd.DataFrame:
+    """
+    Besparelse per inventarrad (én vektorisert operasjon). Kolonnene 'W_gammel'/'W_led'
+    i inventaret overstyrer katalogen; manglende 'timer' får `timer`. Gir inventaret
+    med kolonnene kWh_for, kWh_etter, kWh_spart og invest.
+    """
+    df = normaliser_inventar(df)
+    idx = katalog.oppslag(df[KOL_TYPE].to_numpy())
+    antall = pd.to_numeric(df[KOL_ANTALL], errors="coerce").fillna(0).to_numpy(dtype=float)
+    t = (pd.to_numeric(df[KOL_TIMER], errors="coerce").fillna(timer).to_numpy(dtype=float)
+         if KOL_TIMER in df.columns else np.full(len(df), float(timer)))
+    t = np.clip(t, 0.0, HOURS_YEAR)
+
+    def overstyr(kol, fra_katalog):
+        if kol in df.columns:
+            x = pd.to_numeric(df[kol], errors="coerce").to_numpy(dtype=float)
+            return np.where(np.isnan(x), fra_katalog, x)
+        return fra_katalog
+
+    Wg = overstyr("W_gammel", katalog.gammel_W[idx])
+    Wl = overstyr("W_led", katalog.led_W[idx])
+    if np.isnan(Wg).any() or np.isnan(Wl).any():
+        raise ValueError("Mangler effekt (W) for egendefinerte armaturer – oppgi W_gammel/W_led i inventaret")
+    styring = (1.0 - _andel(df, KOL_SENSOR, SENSOR_REDUKSJON)) * (1.0 - _andel(df, KOL_DAGSLYS, DAGSLYS_REDUKSJON))
+
+    ut = df.copy()
+    ut[KOL_TIMER] = t
+    ut["W_gammel"] = Wg
+    ut["W_led"] = Wl
+    ut["kWh_for"] = Wg * antall * t / 1000.0
+    ut["kWh_etter"] = Wl * styring * antall * t / 1000.0
+    ut["kWh_spart"] = np.maximum(Wg - Wl * styring, 0.0) * antall * t / 1000.0
+    ut["invest"] = katalog.kr[idx] * antall
+    return ut
+
+def grupper(resultat: pd.DataFrame, etter: str) -> pd.DataFrame:
+    """Summer per rom, armaturtype eller etasje, sortert etter størst besparelse."""
+    if etter not in resultat.columns:
+        raise KeyError(f"Inventaret har ikke kolonnen '{etter}'")
+    kol = [KOL_ANTALL, "kWh_for", "kWh_etter", "kWh_spart", "invest"]
+    g = resultat.groupby(etter, sort=False, observed=True)[kol].sum()
+    return g.sort_values("kWh_spart", ascending=False)
+
+def som_enkelttiltak(resultat: pd.DataFrame) -> dict:
+    """
+    Hele inventaret som ett ekvivalent led-tiltak (ant_armatur, W_gammel, W_led, timer_per_aar)
+    med samme årsbesparelse, slik at pakke, sensitivitet og batch kan bruke det.
+    """
+    ant = float(resultat[KOL_ANTALL].sum())
+    kwh_for = float(resultat["kWh_for"].sum())
+    spart = float(resultat["kWh_spart"].sum())
+    if ant <= 0 or kwh_for <= 0:
+        return {"ant_armatur": ant, "W_gammel": 0.0, "W_led": 0.0, "timer_per_aar": 0.0}
+    # Effekt veid med antall armaturer, brukstid veid med effekt
+    W_gammel = float((resultat["W_gammel"] * resultat[KOL_ANTALL]).sum()) / ant
+    timer = kwh_for * 1000.0 / (W_gammel * ant)
+    W_led = W_gammel - spart * 1000.0 / (ant * timer)
+    return {"ant_armatur": ant, "W_gammel": W_gammel, "W_led": W_led, "timer_per_aar": timer}
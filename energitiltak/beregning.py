@@ -0,0 +1,125 @@
+"""
+Beregningskjernen: konstanter, hjelpefunksjoner og de enkle tiltaksberegningene.
+Ren Python uten UI-avhengigheter – kan importeres fra batchjobber og workere.
+"""
+from datetime import time
+
+# ===============================
+# Konstanter og hjelpefunksjoner
+# ===============================
+RHO = 1.2
+CP_J = 1006.0
+HDD = 4800
+Kh = HDD * 24
+HOURS_YEAR = 8760
+
+def fmt_int(x: float) -> str:
+    try:
+        return f"{int(round(float(x))):,}".replace(",", " ")
+    except Exception:
+        return "–"
+
+def fmt_1(x: float) -> str:
+    try:
+        return f"{float(x):.1f}".replace(".", ",")
+    except Exception:
+        return "–"
+
+def nok_og_co2(kWh: float, pris_kr_per_kWh: float, utslipp_g_per_kWh: float):
+    kr_aar = float(kWh) * float(pris_kr_per_kWh)
+    kg_co2_aar = float(kWh) * (float(utslipp_g_per_kWh) / 1000.0)
+    return kr_aar, kg_co2_aar
+
+def payback_years(invest_kr: float, saving_kr_per_year: float):
+    if saving_kr_per_year <= 0:
+        return None
+    return float(invest_kr) / float(saving_kr_per_year)
+
+# -------------------------------
+# Driftstid-hjelp
+# -------------------------------
+def daily_hours(t_start: time, t_end: time) -> float:
+    start_h = t_start.hour + t_start.minute / 60
+    end_h   = t_end.hour + t_end.minute / 60
+    h = end_h - start_h
+    if h < 0:
+        h += 24
+    return max(min(h, 24.0), 0.0)
+
+def annual_hours_from_schedule(t_start: time, t_end: time, days_per_week: int, weeks_per_year: float = 52.0) -> float:
+    h_day = daily_hours(t_start, t_end)
+    return max(min(h_day * days_per_week * float(weeks_per_year), 8760.0), 0.0)
+
+# -------------------------------
+# Solceller-hjelp
+# -------------------------------
+def areal_til_kwp(areal_m2: float, utnyttelse: float = 0.80, kwp_per_m2: float = 0.20) -> float:
+    return max(float(areal_m2) * float(utnyttelse) * float(kwp_per_m2), 0.0)
+
+# ===============================
+# Tiltaksberegninger (enkle)
+# ===============================
+def etterisolering(A_m2: float, U_old: float, U_new: float) -> float:
+    dU = max(float(U_old) - float(U_new), 0.0)
+    return dU * float(A_m2) * Kh / 1000.0
+
+def besparelse_varmegjenvinner(qv_m3_h: float, eta_old: float, eta_new: float, driftstimer: float) -> float:
+    d_eta = max(float(eta_new) - float(eta_old), 0.0)
+    qv_m3_s = float(qv_m3_h) / 3600.0
+    H_W_per_K = RHO * CP_J * qv_m3_s
+    duty = float(driftstimer) / HOURS_YEAR
+    E_kWh = (H_W_per_K / 1000.0) * d_eta * Kh * duty
+    return max(E_kWh, 0.0)
+
+def besparelse_sfp(qv_m3_h: float, SFP_old: float, SFP_new: float, driftstimer: float) -> float:
+    dSFP = max(float(SFP_old) - float(SFP_new), 0.0)
+    qv_m3_s = float(qv_m3_h) / 3600.0
+    return max(dSFP * qv_m3_s * float(driftstimer), 0.0)
+
+def besparelse_varmepumpe(Q_netto_kWh_year: float, eta_old: float, COP_new: float, dekningsgrad: float) -> float:
+    eta_old = max(float(eta_old), 1e-6)
+    COP_new = max(float(COP_new), 1e-6)
+    dekningsgrad = max(min(float(dekningsgrad), 1.0), 0.0)
+    Q_vp = float(Q_netto_kWh_year) * dekningsgrad
+    return max(Q_vp * (1.0/eta_old - 1.0/COP_new), 0.0)
+
+def besparelse_tempreduksjon(Q_space_kWh_year: float, delta_T_C: float) -> float:
+    return max(float(Q_space_kWh_year) * 0.05 * max(float(delta_T_C), 0.0), 0.0)
+
+def besparelse_nattsenking(Q_space_kWh_year: float, setback_C: float, timer_per_dogn: float) -> float:
+    duty = max(min(float(timer_per_dogn), 24.0), 0.0) / 24.0
+    return max(float(Q_space_kWh_year) * 0.05 * max(float(setback_C), 0.0) * duty, 0.0)
+
+# ===============================
+# Belysning – hjelpetabell
+# ===============================
+LUMINAIRE_MAP = [
+    {"navn": "T8 2×58 W",              "gammel_W": 2*58,  "led_factor": 0.40},
+    {"navn": "T8 4×18 W",              "gammel_W": 4*18,  "led_factor": 0.45},
+    {"navn": "T5 2×49 W",              "gammel_W": 2*49,  "led_factor": 0.50},
+    {"navn": "Downlight halogen 50 W", "gammel_W": 50,    "led_factor": 0.20},
+    {"navn": "Metallhalogen 150 W",    "gammel_W": 150,   "led_factor": 0.40},
+    {"navn": "HQL 125 W",              "gammel_W": 125,   "led_factor": 0.45},
+    {"navn": "Egendefinert",           "gammel_W": None,  "led_factor": 0.40},
+]
+
+# Oppslag på navn
+LUMINAIRE_INDEKS = {d["navn"]: d for d in LUMINAIRE_MAP}
+
+def besparelse_belysning(ant_armatur: int, W_gammel: float, W_led: float, timer_per_aar: float) -> float:
+    dW = max(float(W_gammel) - float(W_led), 0.0)
+    return (dW * int(ant_armatur) * float(timer_per_aar)) / 1000.0
+
+# ===============================
+# Levetid per tiltak (år) – grove standardverdier
+# ===============================
+LEVETID = {
+    "iso": 40,
+    "hrv": 20,
+    "sfp": 15,
+    "vp": 15,
+    "temp": 10,
+    "night": 10,
+    "led": 15,
+    "pv": 25,
+}
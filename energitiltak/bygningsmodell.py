@@ -0,0 +1,283 @@
+"""
+Bygningsmodell: netto varmebehov fra klimaskjerm, ventilasjon, infiltrasjon og internlaster.
+
+Varmetapstallet per bygg er
+
+    H_tr   = Σ U·A + ψ''·BRA                      (transmisjon inkl. normalisert kuldebro)
+    H_inf  = ρ·cp · n50·e · V / 3600              (infiltrasjon, hele døgnet)
+    H_vent = ρ·cp · qv/3600 · (1 - η)             (ventilasjon etter varmegjenvinning, i driftstiden)
+
+og varmebehovet i hver time er max(H·(T_inne - T_ute) - internlast, 0). Med konstant
+internlast i og utenfor driftstiden er det det samme som H · graddagstimer over
+balansetemperaturen T_inne - internlast/H. Graddagstimene for en vilkårlig basistemperatur
+slås opp i en sortert, kumulert temperaturserie, så hele bygningsbestander beregnes
+vektorisert med én verdi per bygg – uten (bygg, 8760)-matriser.
+
+Parametrene kan oppgis direkte eller utledes av energiattestdata (BRA, byggeår, etasjer,
+kategori) med bygg_fra_energimerke. Resultater for bestander caches per bygg-ID.
+"""
+import numpy as np
+
+from .beregning import CP_J, HOURS_YEAR, RHO
+from .cache import LRUCache, normaliser
+
+KOMPONENTER = ("vegg", "tak", "gulv", "vindu")
+INFILTRASJON_E = 0.07    # skjermingskoeffisient, n_inf = n50 · e (moderat skjermet)
+ETASJEHOYDE = 3.0        # m, brutto per etasje
+ROMHOYDE = 2.7           # m, netto (for luftvolum)
+VINDUSANDEL = 0.25       # andel av veggflaten
+
+# Standardverdier for parametre som mangler (et middels kontorbygg fra 1990-tallet)
+STANDARD = {
+    "BRA": 2000.0,
+    "A_vegg": 1060.0, "U_vegg": 0.30,
+    "A_tak": 1000.0, "U_tak": 0.20,
+    "A_gulv": 1000.0, "U_gulv": 0.20,
+    "A_vindu": 350.0, "U_vindu": 2.0,
+    "kuldebro": 0.06,          # ψ'' (W/m²K per m² BRA)
+    "n50": 3.0,                # luftveksling ved 50 Pa (1/h)
+    "qv_m3_h": 14_000.0,
+    "eta_vgv": 0.70,
+    "internlast_drift": 20.0,  # W/m² i driftstiden (lys, utstyr, personer)
+    "internlast_natt": 1.0,    # W/m² utenfor driftstiden
+    "T_inne": 21.0,
+    "T_natt": 21.0,            # settpunkt utenfor driftstiden (lavere ved nattsenking)
+    "tappevann": 5.0,          # kWh/m² BRA per år
+}
+PARAMETRE = tuple(STANDARD)
+
+# Typiske verdier per byggeperiode (øvre år, U vegg/tak/gulv/vindu, n50, η varmegjenvinner)
+_PERIODER = np.array([
+    (1969, 0.90, 0.60, 0.50, 2.8, 6.0, 0.00),
+    (1986, 0.45, 0.30, 0.30, 2.6, 4.0, 0.50),
+    (1996, 0.30, 0.20, 0.20, 2.0, 3.0, 0.70),
+    (2006, 0.22, 0.15, 0.15, 1.6, 2.5, 0.75),
+    (2016, 0.18, 0.13, 0.15, 1.2, 1.5, 0.80),
+    (9999, 0.18, 0.13, 0.10, 0.8, 0.6, 0.85),
+])
+
+# Bygningskategori -> (internlast i driftstid W/m², luftmengde m³/h per m² BRA)
+KATEGORIER = {
+    "kontor": (20.0, 7.0),
+    "skole": (22.0, 9.0),
+    "forretning": (25.0, 9.0),
+    "sykehjem": (12.0, 6.0),
+    "boligblokk": (5.0, 1.2),
+}
+
+def _arr(x) -> np.ndarray:
+    return np.asarray(x, dtype=float)
+
+# ===============================
+# Parametre fra energiattest
+# ===============================
+def bygg_fra_energimerke(BRA, byggeaar, etasjer=2, kategori: str = "kontor") -> dict:
+    """
+    Grove modellparametre fra energiattestdata: geometri fra BRA og antall etasjer
+    (kvadratisk fotavtrykk), U-verdier, tetthet og varmegjenvinning fra byggeperioden,
+    internlast og luftmengde fra kategorien (se KATEGORIER). Tar skalarer eller arrays
+    (én verdi per bygg).
+    """
+    BRA, byggeaar, etasjer = np.broadcast_arrays(_arr(BRA), _arr(byggeaar), np.maximum(_arr(etasjer), 1.0))
+    periode = _PERIODER[np.minimum(np.searchsorted(_PERIODER[:, 0], byggeaar), len(_PERIODER) - 1)]
+    fotavtrykk = BRA / etasjer
+    vegg_brutto = 4.0 * np.sqrt(fotavtrykk) * etasjer * ETASJEHOYDE
+    unike, indeks = np.unique(np.broadcast_to(np.asarray(kategori, dtype=object), BRA.shape).astype(str),
+                              return_inverse=True)
+    ukjente = [k for k in unike if k not in KATEGORIER]
+    if ukjente:
+        raise KeyError(f"Ukjent kategori: {', '.join(ukjente)}")
+    internlast, qv_per_m2 = np.array([KATEGORIER[k] for k in unike]).reshape(-1, 2)[indeks.reshape(BRA.shape)].T
+    return {
+        "BRA": BRA,
+        "A_vegg": vegg_brutto * (1.0 - VINDUSANDEL), "U_vegg": periode[..., 1],
+        "A_tak": fotavtrykk, "U_tak": periode[..., 2],
+        "A_gulv": fotavtrykk, "U_gulv": periode[..., 3],
+        "A_vindu": vegg_brutto * VINDUSANDEL, "U_vindu": periode[..., 4],
+        "n50": periode[..., 5],
+        "eta_vgv": periode[..., 6],
+        "qv_m3_h": BRA * qv_per_m2,
+        "internlast_drift": internlast,
+    }
+
+def fullstendig(bygg: dict) -> dict:
+    """Alle parametre i PARAMETRE som arrays; manglende fylles med STANDARD."""
+    return {k: _arr(bygg.get(k, v)) for k, v in STANDARD.items()}
+
+# ===============================
+# Graddagstimer
+# ===============================
+class Graddagskurve:
+    """
+    Graddagstimer Σ max(T_b - T_ute, 0) som funksjon av basistemperaturen T_b, for en
+    delmengde av timene (med vekt, f.eks. driftsandel). Sortert og kumulert én gang,
+    deretter oppslag for vilkårlig mange basistemperaturer.
+    """
+
+    def __init__(self, T_ute, vekt=None):
+        T = _arr(T_ute)
+        w = np.ones_like(T) if vekt is None else _arr(vekt)
+        rekkefolge = np.argsort(T, kind="stable")
+        self.T = T[rekkefolge]
+        w = w[rekkefolge]
+        self.W = np.concatenate([[0.0], np.cumsum(w)])
+        self.WT = np.concatenate([[0.0], np.cumsum(w * self.T)])
+        self.timer = float(self.W[-1])
+
+    def __call__(self, T_basis) -> np.ndarray:
+        Tb = _arr(T_basis)
+        k = np.searchsorted(self.T, Tb, side="left")
+        return np.maximum(self.W[k] * Tb - self.WT[k], 0.0)
+
+_KURVER = LRUCache(maxsize=16)
+
+def graddagskurver(T_ute=None, drift=None) -> tuple:
+    """(kurve i driftstiden, kurve utenfor), cachet per klima og driftsmaske."""
+    if T_ute is None:
+        from .prisserier import standard_temperatur
+
+        T_ute = standard_temperatur()
+    nokkel = (normaliser(np.asarray(T_ute, dtype=float)), normaliser(None if drift is None else np.asarray(drift, dtype=float)))
+    kurver = _KURVER.get(nokkel)
+    if kurver is None:
+        d = np.ones(HOURS_YEAR) if drift is None else np.clip(_arr(drift), 0.0, 1.0)
+        kurver = (Graddagskurve(T_ute, d), Graddagskurve(T_ute, 1.0 - d))
+        _KURVER.put(nokkel, kurver)
+    return kurver
+
+# ===============================
+# Varmebehov
+# ===============================
+def varmetap(bygg: dict) -> dict:
+    """Varmetapstall (W/K) per bygg: transmisjon, infiltrasjon og ventilasjon."""
+    p = fullstendig(bygg)
+    H_tr = sum(p[f"U_{k}"] * p[f"A_{k}"] for k in KOMPONENTER) + p["kuldebro"] * p["BRA"]
+    H_inf = RHO * CP_J * p["n50"] * INFILTRASJON_E * p["BRA"] * ROMHOYDE / 3600.0
+    H_vent = RHO * CP_J * p["qv_m3_h"] / 3600.0 * (1.0 - np.clip(p["eta_vgv"], 0.0, 1.0))
+    return {"transmisjon": H_tr, "infiltrasjon": H_inf, "ventilasjon": H_vent}
+
+def varmebehov(bygg: dict, T_ute=None, drift=None) -> dict:
+    """
+    Netto varmebehov per bygg (kWh/år). `bygg` er en dict med parametre (skalarer eller
+    arrays, se STANDARD); `T_ute` en 8760-serie (standard: syntetisk normalår) og `drift`
+    driftsandel per time (standard: døgnkontinuerlig). Gir Q_rom (romoppvarming inkl.
+    ventilasjonsvarme), Q_netto (med tappevann), spesifikt behov og tap per post.
+    """
+    p = fullstendig(bygg)
+    H = varmetap(p)
+    kurve_drift, kurve_natt = graddagskurver(T_ute, drift)
+    H_drift = H["transmisjon"] + H["infiltrasjon"] + H["ventilasjon"]
+    H_natt = H["transmisjon"] + H["infiltrasjon"]
+    G_drift = p["internlast_drift"] * p["BRA"]
+    G_natt = p["internlast_natt"] * p["BRA"]
+
+    def balanse(Hx, G):
+        return np.where(Hx > 0, G / np.where(Hx > 0, Hx, 1.0), 0.0)
+
+    Q_rom = (H_drift * kurve_drift(p["T_inne"] - balanse(H_drift, G_drift))
+             + H_natt * kurve_natt(p["T_natt"] - balanse(H_natt, G_natt))) / 1000.0
+    dh_drift = kurve_drift(p["T_inne"])
+    dh_natt = kurve_natt(p["T_natt"])
+    tap = {
+        "transmisjon": H["transmisjon"] * (dh_drift + dh_natt) / 1000.0,
+        "infiltrasjon": H["infiltrasjon"] * (dh_drift + dh_natt) / 1000.0,
+        "ventilasjon": H["ventilasjon"] * dh_drift / 1000.0,
+    }
+    Q_netto = Q_rom + p["tappevann"] * p["BRA"]
+    return {
+        "Q_rom": Q_rom,
+        "Q_netto": Q_netto,
+        "spesifikt": np.where(p["BRA"] > 0, Q_netto / np.where(p["BRA"] > 0, p["BRA"], 1.0), 0.0),
+        "tap": tap,
+        "tilskudd": sum(tap.values()) - Q_rom,
+    }
+
+def besparelse(bygg: dict, endring: dict, T_ute=None, drift=None) -> np.ndarray:
+    """Redusert romoppvarming (kWh/år) når parametrene i `endring` settes inn, f.eks. {"U_tak": 0.13}."""
+    etter = dict(bygg)
+    etter.update(endring)
+    return np.maximum(varmebehov(bygg, T_ute, drift)["Q_rom"] - varmebehov(etter, T_ute, drift)["Q_rom"], 0.0)
+
+# ===============================
+# Bygningsbestand (cache per bygg-ID)
+# ===============================
+RESULTATER = ("Q_rom", "Q_netto", "spesifikt")
+MAKS_BESTAND = 2_000_000   # bygg per klima i cachen
+
+class _Bestandscache:
+    """Parametre og resultater per bygg-ID for ett klima; oppslag og lagring er vektorisert."""
+
+    def __init__(self):
+        import pandas as pd
+
+        self.ider = pd.Index([])
+        self.P = np.empty((0, len(PARAMETRE)))
+        self.R = np.empty((0, len(RESULTATER)))
+
+    def slaa_opp(self, ider, P: np.ndarray) -> tuple:
+        """(resultater, treff) – treff der bygg-ID finnes og parametrene er uendret."""
+        pos = self.ider.get_indexer(ider)
+        funnet = pos >= 0
+        treff = funnet.copy()
+        treff[funnet] = (self.P[pos[funnet]] == P[funnet]).all(axis=1)
+        R = np.empty((len(P), len(RESULTATER)))
+        R[treff] = self.R[pos[treff]]
+        return R, treff
+
+    def lagre(self, ider, P: np.ndarray, R: np.ndarray):
+        import pandas as pd
+
+        ider = pd.Index(ider)
+        siste = ~ider.duplicated(keep="last")
+        ider, P, R = ider[siste], P[siste], R[siste]
+        pos = self.ider.get_indexer(ider)
+        gamle = pos >= 0
+        self.P[pos[gamle]] = P[gamle]
+        self.R[pos[gamle]] = R[gamle]
+        if (~gamle).any():
+            if len(self.ider) + int((~gamle).sum()) > MAKS_BESTAND:
+                self.__init__()
+                return self.lagre(ider, P, R)
+            self.ider = self.ider.append(ider[~gamle])
+            self.P = np.concatenate([self.P, P[~gamle]])
+            self.R = np.concatenate([self.R, R[~gamle]])
+
+_BESTAND = LRUCache(maxsize=4)   # klima -> _Bestandscache
+
+def varmebehov_bestand(df, T_ute=None, drift=None, id_kolonne: str = "bygg_id"):
+    """
+    Varmebehov for en bygningsbestand (DataFrame med én rad per bygg og kolonner fra
+    STANDARD). Har tabellen BRA og byggeaar (og eventuelt etasjer og kategori), utledes
+    parametrene som ikke er oppgitt med bygg_fra_energimerke. Resultatene caches per
+    bygg-ID og klima, så bare nye bygg og bygg med endrede parametre beregnes – samlet
+    og vektorisert. Gir DataFrame med RESULTATER.
+    """
+    import pandas as pd
+
+    n = len(df)
+    kolonner = {}
+    if "byggeaar" in df.columns and "BRA" in df.columns:
+        kolonner = bygg_fra_energimerke(df["BRA"].to_numpy(dtype=float), df["byggeaar"].to_numpy(dtype=float),
+                                        df["etasjer"].to_numpy(dtype=float) if "etasjer" in df.columns else 2.0,
+                                        df["kategori"].to_numpy() if "kategori" in df.columns else "kontor")
+    P = np.empty((n, len(PARAMETRE)))
+    for j, (k, v) in enumerate(STANDARD.items()):
+        P[:, j] = kolonner.get(k, v)
+        if k in df.columns:
+            x = pd.to_numeric(df[k], errors="coerce").to_numpy(dtype=float)
+            P[:, j] = np.where(np.isnan(x), P[:, j], x)
+
+    klima = (normaliser(None if T_ute is None else np.asarray(T_ute, dtype=float)),
+             normaliser(None if drift is None else np.asarray(drift, dtype=float)))
+    cache = _BESTAND.get(klima)
+    if cache is None:
+        cache = _Bestandscache()
+        _BESTAND.put(klima, cache)
+    ider = df[id_kolonne] if id_kolonne in df.columns else df.index
+    R, treff = cache.slaa_opp(ider, P)
+    if not treff.all():
+        mangler = ~treff
+        res = varmebehov(dict(zip(PARAMETRE, P[mangler].T)), T_ute, drift)
+        R[mangler] = np.column_stack([res[k] for k in RESULTATER])
+        cache.lagre(np.asarray(ider)[mangler], P[mangler], R[mangler])
+    return pd.DataFrame(R, columns=list(RESULTATER), index=df.index)
@@ -0,0 +1,126 @@
+"""
+Enkel LRU-memoisering for beregningskjernen.
+
+Nøkkelen bygges av normaliserte input-verdier (tall som float, klokkeslett,
+lister/dicts og NumPy-arrays via innholds-hash), slik at samme
+tiltak med samme input ikke beregnes på nytt ved hver Streamlit-rerun. Cachen har
+fast maksstørrelse og kaster ut minst nylig brukte element først.
+"""
+import functools
+import threading
+from collections import OrderedDict
+from datetime import time
+
+from . import maaling
+
+class IkkeHashbar(TypeError):
+    """Input som ikke kan gjøres om til en cache-nøkkel (memo kaller da funksjonen uten cache)."""
+
+def normaliser(verdi):
+    """Gjør en input-verdi om til en hashbar og stabil cache-nøkkel."""
+    if verdi is None or isinstance(verdi, str):
+        return verdi
+    if isinstance(verdi, bool):
+        # Egen merkelapp, ellers gir True og 1.0 samme nøkkel
+        return ("bool", verdi)
+    if isinstance(verdi, (int, float)):
+        return float(verdi)
+    if isinstance(verdi, time):
+        return ("time", verdi.hour, verdi.minute, verdi.second)
+    if isinstance(verdi, dict):
+        return tuple(sorted((str(k), normaliser(v)) for k, v in verdi.items()))
+    if isinstance(verdi, (list, tuple)):
+        return tuple(normaliser(v) for v in verdi)
+    if hasattr(verdi, "tobytes") and hasattr(verdi, "shape"):
+        if verdi.shape == ():
+            return normaliser(verdi.item())
+        import hashlib
+
+        h = hashlib.blake2b(verdi.tobytes(), digest_size=16).hexdigest()
+        return ("ndarray", verdi.shape, str(verdi.dtype), h)
+    if callable(verdi):
+        return ("fn", getattr(verdi, "__module__", None), getattr(verdi, "__qualname__", repr(verdi)))
+    try:
+        hash(verdi)
+    except TypeError:
+        raise IkkeHashbar(f"Kan ikke lage cache-nøkkel av {type(verdi).__name__}") from None
+    return verdi
+
+class LRUCache:
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = int(maxsize)
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
+
+_MANGLER = object()
+
+def memo(maxsize: int = 256):
+    """
+    Dekoratør: LRU-cache på normaliserte argumenter. NumPy-resultater gjøres
+    skrivebeskyttet, siden samme objekt deles mellom kall. Argumenter som ikke kan
+    normaliseres (IkkeHashbar) gir et vanlig kall uten cache.
+    """
+    def deco(fn):
+        cache = LRUCache(maxsize)
+        bom = f"cache-bom:{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                key = (normaliser(args), normaliser(kwargs))
+            except IkkeHashbar:
+                maaling.tell(f"cache-forbi:{fn.__qualname__}")
+                return fn(*args, **kwargs)
+            res = cache.get(key, _MANGLER)
+            if res is _MANGLER:
+                maaling.tell(bom)
+                res = fn(*args, **kwargs)
+                if hasattr(res, "setflags"):
+                    res.setflags(write=False)
+                cache.put(key, res)
+            return res
+
+        wrapper.cache = cache
+        wrapper.cache_info = cache.info
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return deco
+
+@maaling.tidta(navn=lambda fn, *args, **kwargs: f"beregn:{getattr(fn, '__name__', fn)}")
+@memo(maxsize=512)
+def memo_beregn(fn, *args, **kwargs):
+    """Kaller en tiltaksfunksjon via felles LRU-cache (nøkkel: funksjon + normalisert input)."""
+    return fn(*args, **kwargs)
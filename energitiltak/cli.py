@@ -0,0 +1,138 @@
+"""
+Kommandolinje for batchberegning av en portefølje:
+
+    python -m energitiltak portefolje.csv resultat.parquet --pris 1.25 --utslipp 20
+
+Input har én rad per bygg og tiltak, med tiltak-ID i kolonnen 'tiltak' og inputkolonnene
+fra TILTAK_BATCH (tomme der de ikke gjelder). Filen leses og skrives i biter, slik at
+også svært store porteføljer kan kjøres uten å ligge i minnet. CSV og Parquet støttes
+begge veier (valgt ut fra filendelsen, eller med --inn-format/--ut-format).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from .batch import STANDARD_SATSER, TILTAK_BATCH, beregn_portefolje
+
+RESULTATKOLONNER = ["kWh", "kr_aar", "co2_kg", "invest", "payback"]
+INPUTKOLONNER = {k for _, kolonner in TILTAK_BATCH.values() for k in kolonner}
+INPUTKOLONNER |= {k for satser in STANDARD_SATSER.values() for k in satser}
+INPUTKOLONNER |= {"invest", "pris", "utslipp_g"}
+
+def _format(sti: str, valgt: str = None) -> str:
+    if valgt:
+        return valgt
+    return "parquet" if os.path.splitext(sti)[1].lower() in (".parquet", ".pq") else "csv"
+
+def les_i_biter(sti: str, fmt: str, chunksize: int):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(sti).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        # Kolonner som bare sendes videre leses som tekst, så typen ikke skifter mellom bitene
+        # (tom 'navn' i første bit, tall-lignende 'bygg' før alfanumeriske osv.)
+        kolonner = pd.read_csv(sti, nrows=0).columns
+        tekst = {k: str for k in kolonner if k not in INPUTKOLONNER}
+        yield from pd.read_csv(sti, chunksize=chunksize, dtype=tekst)
+
+class Skriver:
+    """
+    Skriver resultatbiter fortløpende til CSV eller Parquet. Det skrives til en midlertidig fil
+    ved siden av `sti`, som får det endelige navnet først i lukk(); avbryt() fjerner den, så en
+    feil midt i kjøringen ikke etterlater en avkuttet resultatfil.
+    """
+
+    def __init__(self, sti: str, fmt: str):
+        self.sti = sti
+        self.fmt = fmt
+        self._tmp = f"{sti}.{os.getpid()}.tmp"
+        self._parquet = None
+        self._forste = True
+
+    def skriv(self, df: pd.DataFrame):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._parquet is None:
+                tabell = pa.Table.from_pandas(df, preserve_index=False)
+                self._parquet = pq.ParquetWriter(self._tmp, tabell.schema)
+            else:
+                tabell = pa.Table.from_pandas(df, schema=self._parquet.schema, preserve_index=False)
+            self._parquet.write_table(tabell)
+        else:
+            df.to_csv(self._tmp, mode="w" if self._forste else "a", header=self._forste, index=False)
+        self._forste = False
+
+    def lukk(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if os.path.exists(self._tmp):
+            os.replace(self._tmp, self.sti)
+
+    def avbryt(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+def kjor(inn: str, ut: str, pris: float, utslipp_g: float, chunksize: int = 200_000,
+         inn_format: str = None, ut_format: str = None, satser: dict = None) -> dict:
+    """Strømmer `inn` gjennom kalkulatorene og skriver til `ut`. Returnerer rader og tid."""
+    t0 = time.perf_counter()
+    rader = 0
+    skriver = Skriver(ut, _format(ut, ut_format))
+    try:
+        for chunk in les_i_biter(inn, _format(inn, inn_format), chunksize):
+            res = beregn_portefolje(chunk, pris, utslipp_g, satser)
+            behold = [k for k in chunk.columns if k not in INPUTKOLONNER and k not in RESULTATKOLONNER]
+            skriver.skriv(pd.concat([chunk[behold], res.astype(np.float64)], axis=1))
+            rader += len(chunk)
+    except BaseException:
+        skriver.avbryt()
+        raise
+    skriver.lukk()
+    sek = time.perf_counter() - t0
+    return {"rader": rader, "sekunder": sek, "rader_per_s": rader / sek if sek > 0 else float("inf")}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m energitiltak", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("inn", help="Input-fil (CSV eller Parquet)")
+    ap.add_argument("ut", help="Resultatfil (CSV eller Parquet)")
+    ap.add_argument("--pris", type=float, default=1.25, help="Energipris (kr/kWh), standard 1.25")
+    ap.add_argument("--utslipp", type=float, default=20.0, help="Utslippsfaktor (g CO₂/kWh), standard 20")
+    ap.add_argument("--chunksize", type=int, default=200_000, help="Rader per bit (standard 200 000)")
+    ap.add_argument("--inn-format", choices=["csv", "parquet"])
+    ap.add_argument("--ut-format", choices=["csv", "parquet"])
+    ap.add_argument("--sats", action="append", default=[], metavar="TILTAK.KOLONNE=VERDI",
+                    help="Overstyr en standard investeringssats, f.eks. iso.kr_per_m2=3200")
+    args = ap.parse_args(argv)
+
+    satser = {}
+    for s in args.sats:
+        try:
+            navn, verdi = s.split("=", 1)
+            tiltak_id, kolonne = navn.split(".", 1)
+            if kolonne not in STANDARD_SATSER[tiltak_id]:
+                raise KeyError(kolonne)
+            satser.setdefault(tiltak_id, {})[kolonne] = float(verdi)
+        except (ValueError, KeyError):
+            ap.error(f"Ugyldig --sats: {s!r}")
+
+    try:
+        stat = kjor(args.inn, args.ut, args.pris, args.utslipp, args.chunksize,
+                    args.inn_format, args.ut_format, satser)
+    except (ValueError, KeyError) as e:
+        print(f"Feil: {e}", file=sys.stderr)
+        return 2
+
+    print(f"{stat['rader']:,} rader på {stat['sekunder']:.2f} s – {stat['rader_per_s']:,.0f} rader/s".replace(",", " "),
+          file=sys.stderr)
+    return 0
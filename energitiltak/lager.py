@@ -0,0 +1,167 @@
+"""
+Varig lagring av tiltakslister i SQLite.
+
+Hvert tiltak lagres som én rad med nøkkel (prosjekt, bygg, tiltak_id) sammen med
+resultat og input, og oppdateres med upsert hver gang det legges til i oversikten.
+Et prosjekt lastes bygg for bygg, så åpning av store porteføljer leser bare det
+bygget som vises. Porteføljeoversikten leser alle bygg med én spørring uten input,
+og region per bygg ligger i en egen tabell.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STANDARD_STI = os.environ.get("ENERGITILTAK_DB", "energitiltak.db")
+
+_SKJEMA = """
+CREATE TABLE IF NOT EXISTS tiltak (
+    prosjekt  TEXT NOT NULL,
+    bygg      TEXT NOT NULL,
+    tiltak_id TEXT NOT NULL,
+    navn      TEXT NOT NULL,
+    kwh       REAL NOT NULL,
+    invest    REAL NOT NULL,
+    input     TEXT,
+    tillegg   REAL NOT NULL DEFAULT 0,
+    eksport   REAL NOT NULL DEFAULT 0,
+    eksportpris REAL NOT NULL DEFAULT 0,
+    endret    REAL NOT NULL,
+    PRIMARY KEY (prosjekt, bygg, tiltak_id)
+);
+CREATE INDEX IF NOT EXISTS ix_tiltak_prosjekt_tiltak ON tiltak (prosjekt, tiltak_id);
+CREATE TABLE IF NOT EXISTS bygg (
+    prosjekt  TEXT NOT NULL,
+    bygg      TEXT NOT NULL,
+    region    TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (prosjekt, bygg)
+);
+"""
+
+_UPSERT = """
+INSERT INTO tiltak (prosjekt, bygg, tiltak_id, navn, kwh, invest, input, tillegg, eksport, eksportpris, endret)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (prosjekt, bygg, tiltak_id) DO UPDATE SET
+    navn = excluded.navn, kwh = excluded.kwh, invest = excluded.invest, input = excluded.input,
+    tillegg = excluded.tillegg, eksport = excluded.eksport, eksportpris = excluded.eksportpris,
+    endret = excluded.endret
+"""
+
+def _verdier(prosjekt: str, bygg: str, rad: dict, endret: float) -> tuple:
+    inp = rad.get("Input")
+    return (prosjekt, bygg, rad["ID"], rad["Tiltak"], float(rad["kWh"]), float(rad["Invest"]),
+            None if inp is None else json.dumps(inp, default=float), float(rad.get("Tillegg", 0.0)),
+            float(rad.get("Eksport", 0.0)), float(rad.get("Eksportpris", 0.0)), endret)
+
+class Prosjektlager:
+    """Tynt lag over SQLite. Trådsikkert, så samme instans kan deles mellom Streamlit-økter."""
+
+    def __init__(self, sti: str = STANDARD_STI):
+        self.sti = sti
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(sti, check_same_thread=False)
+        self._con.row_factory = sqlite3.Row
+        if sti != ":memory:":
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.executescript(_SKJEMA)
+        self._migrer()
+
+    def _migrer(self):
+        """Legger til kolonner som mangler i databaser laget av eldre versjoner."""
+        kolonner = {r["name"] for r in self._con.execute("PRAGMA table_info(tiltak)")}
+        with self._con:
+            for kolonne in ("tillegg", "eksport", "eksportpris"):
+                if kolonne not in kolonner:
+                    self._con.execute(f"ALTER TABLE tiltak ADD COLUMN {kolonne} REAL NOT NULL DEFAULT 0")
+
+    def lagre(self, prosjekt: str, bygg: str, rad: dict):
+        """Upsert av én tiltaksrad (ID, Tiltak, kWh, Invest, valgfritt Input, Tillegg og Eksport/Eksportpris)."""
+        with self._lock, self._con:
+            self._con.execute(_UPSERT, _verdier(prosjekt, bygg, rad, time.time()))
+
+    def lagre_mange(self, prosjekt: str, rader):
+        """Upsert av mange (bygg, rad)-par i én transaksjon."""
+        naa = time.time()
+        with self._lock, self._con:
+            self._con.executemany(_UPSERT, [_verdier(prosjekt, bygg, r, naa) for bygg, r in rader])
+
+    def slett(self, prosjekt: str, bygg: str, tiltak_id: str = None):
+        with self._lock, self._con:
+            if tiltak_id is None:
+                self._con.execute("DELETE FROM tiltak WHERE prosjekt = ? AND bygg = ?", (prosjekt, bygg))
+            else:
+                self._con.execute("DELETE FROM tiltak WHERE prosjekt = ? AND bygg = ? AND tiltak_id = ?",
+                                  (prosjekt, bygg, tiltak_id))
+
+    @staticmethod
+    def _rad(r) -> dict:
+        rad = {"ID": r["tiltak_id"], "Tiltak": r["navn"], "kWh": r["kwh"], "Invest": r["invest"]}
+        if r["input"] is not None:
+            rad["Input"] = json.loads(r["input"])
+        if r["tillegg"]:
+            rad["Tillegg"] = r["tillegg"]
+        if r["eksport"]:
+            rad["Eksport"] = r["eksport"]
+            rad["Eksportpris"] = r["eksportpris"]
+        return rad
+
+    def last_bygg(self, prosjekt: str, bygg: str) -> dict:
+        """Tiltakene i ett bygg som dict ID -> rad (samme form som tiltakslisten i appen)."""
+        with self._lock:
+            cur = self._con.execute(
+                "SELECT * FROM tiltak WHERE prosjekt = ? AND bygg = ? ORDER BY rowid", (prosjekt, bygg))
+            return {r["tiltak_id"]: self._rad(r) for r in cur}
+
+    def last_prosjekt(self, prosjekt: str) -> list:
+        """Alle tiltak i et prosjekt som liste av (bygg, rad)."""
+        with self._lock:
+            rader = self._con.execute(
+                "SELECT * FROM tiltak WHERE prosjekt = ? ORDER BY bygg, rowid", (prosjekt,)).fetchall()
+        return [(r["bygg"], self._rad(r)) for r in rader]
+
+    def last_portefolje(self, prosjekt: str) -> list:
+        """Som last_prosjekt, men uten input (raskere for porteføljeoversikten)."""
+        with self._lock:
+            cur = self._con.cursor()
+            cur.row_factory = None   # rene tupler er merkbart raskere for titusenvis av rader
+            rader = cur.execute(
+                "SELECT bygg, tiltak_id, navn, kwh, invest, tillegg, eksport, eksportpris FROM tiltak "
+                "WHERE prosjekt = ? ORDER BY bygg, rowid", (prosjekt,)).fetchall()
+        return [(r[0], {"ID": r[1], "Tiltak": r[2], "kWh": r[3], "Invest": r[4], "Tillegg": r[5],
+                        "Eksport": r[6], "Eksportpris": r[7]}) for r in rader]
+
+    def sett_region(self, prosjekt: str, bygg: str, region: str):
+        with self._lock, self._con:
+            self._con.execute(
+                "INSERT INTO bygg (prosjekt, bygg, region) VALUES (?, ?, ?) "
+                "ON CONFLICT (prosjekt, bygg) DO UPDATE SET region = excluded.region",
+                (prosjekt, bygg, str(region).strip()))
+
+    def sett_regioner(self, prosjekt: str, regioner: dict):
+        """Region for mange bygg (bygg -> region) i én transaksjon."""
+        with self._lock, self._con:
+            self._con.executemany(
+                "INSERT INTO bygg (prosjekt, bygg, region) VALUES (?, ?, ?) "
+                "ON CONFLICT (prosjekt, bygg) DO UPDATE SET region = excluded.region",
+                [(prosjekt, b, str(r).strip()) for b, r in regioner.items()])
+
+    def regioner(self, prosjekt: str) -> dict:
+        """bygg -> region for bygg som har fått region."""
+        with self._lock:
+            return {r[0]: r[1] for r in self._con.execute(
+                "SELECT bygg, region FROM bygg WHERE prosjekt = ? AND region != ''", (prosjekt,))}
+
+    def prosjekter(self) -> list:
+        with self._lock:
+            return [r[0] for r in self._con.execute("SELECT DISTINCT prosjekt FROM tiltak ORDER BY prosjekt")]
+
+    def bygg(self, prosjekt: str) -> list:
+        with self._lock:
+            return [r[0] for r in self._con.execute(
+                "SELECT DISTINCT bygg FROM tiltak WHERE prosjekt = ? ORDER BY bygg", (prosjekt,))]
+
+    def lukk(self):
+        with self._lock:
+            self._con.close()
@@ -0,0 +1,127 @@
+"""
+Livsløpsberegning: kontantstrøm, nåverdi (NPV), internrente (IRR) og LCOE.
+
+Alt regnes som matriser med én rad per tiltak/bygg og én kolonne per år (år 0 = investering),
+slik at hele oversikten eller en portefølje beregnes i én operasjon. Energiprisen kan
+stige med en fast årlig rate, besparelsen kan degraderes (solceller), og utstyr med kortere
+levetid enn analyseperioden reinvesteres. Ved periodens slutt godskrives lineær restverdi.
+"""
+import numpy as np
+
+from .beregning import LEVETID
+
+# Årlig degradering av besparelsen (andel per år)
+DEGRADERING = {"pv": 0.005}
+
+def _kol(x) -> np.ndarray:
+    return np.atleast_1d(np.asarray(x, dtype=float))[:, None]
+
+def _deler(kwh, pris, invest, levetid, horisont: int, prisvekst: float, degradering, restverdi: bool = True):
+    """
+    Energi (kWh), besparelse (kr) og kostnad (kr, investering/reinvestering minus restverdi)
+    per år, hver (n, horisont + 1).
+    """
+    horisont = int(horisont)
+    t = np.arange(horisont + 1)
+    levetid = np.maximum(np.round(np.atleast_1d(np.asarray(levetid, dtype=float))), 1.0).astype(int)
+
+    # Mønstrene avhenger bare av levetiden – regn dem én gang per unik levetid
+    unike, hvem = np.unique(levetid, return_inverse=True)
+    hvem = hvem.reshape(-1)
+    alder_u = np.where(t > 0, (t - 1)[None, :] % unike[:, None], 0)
+    invest_u = ((t == 0) | ((t > 0) & (t % unike[:, None] == 0) & (t < horisont))).astype(float)
+    if restverdi:
+        brukt = horisont % unike
+        invest_u[:, -1] -= np.where(brukt > 0, 1.0 - brukt / unike, 0.0)
+
+    degradering = _kol(degradering)
+    if np.any(degradering != 0):
+        energi = np.where(t > 0, _kol(kwh) * (1.0 - degradering) ** alder_u[hvem], 0.0)
+    else:
+        energi = _kol(kwh) * (t > 0)
+    besparelse = energi * _kol(pris) * (1.0 + prisvekst) ** np.maximum(t - 1, 0)
+    kostnad = _kol(invest) * invest_u[hvem]
+    return energi, besparelse, kostnad
+
+def kontantstrom(kwh, pris, invest, levetid, horisont: int = 30, prisvekst: float = 0.0,
+                 degradering=0.0, restverdi: bool = True) -> np.ndarray:
+    """
+    Kontantstrøm (n, horisont + 1) i kr. År 0 er -invest, år t ≥ 1 er besparelsen
+    kWh·(1 - degradering)^alder · pris·(1 + prisvekst)^(t-1), minus reinvesteringer.
+    Ved slutten av perioden godskrives restverdien av siste investering.
+    """
+    _, besparelse, kostnad = _deler(kwh, pris, invest, levetid, horisont, prisvekst, degradering, restverdi)
+    return besparelse - kostnad
+
+def diskonteringsfaktorer(rente: float, horisont: int) -> np.ndarray:
+    return (1.0 + float(rente)) ** -np.arange(int(horisont) + 1, dtype=float)
+
+def npv(cf: np.ndarray, rente: float) -> np.ndarray:
+    return cf @ diskonteringsfaktorer(rente, cf.shape[1] - 1)
+
+def irr(cf: np.ndarray, start: float = 0.08, maks_iter: int = 50, tol: float = 1e-10) -> np.ndarray:
+    """
+    Internrente for hver rad med vektoriserte Newton-iterasjoner. Rader som har konvergert
+    tas ut underveis. NaN der kontantstrømmen ikke skifter fortegn eller iterasjonen ikke
+    konvergerer (typisk flere fortegnsskifter pga. reinvestering, uten entydig internrente).
+    """
+    cf = np.atleast_2d(np.asarray(cf, dtype=float))
+    r = np.full(cf.shape[0], np.nan)
+    aktiv = np.flatnonzero((cf.min(axis=1) < 0) & (cf.max(axis=1) > 0))
+    c = cf[aktiv]
+    # Startgjetning med riktig fortegn: negativ internrente når summen av kontantstrømmen er negativ
+    ri = np.where(c.sum(axis=1) > 0, float(start), -0.05)
+    for _ in range(maks_iter):
+        if len(aktiv) == 0:
+            break
+        # Horner i x = 1/(1 + r): f = Σ c_t x^t og f' = Σ t c_t x^(t-1); df/dr = -x² f'
+        x = 1.0 / (1.0 + ri)
+        f = np.zeros(len(ri))
+        fp = np.zeros(len(ri))
+        for t in range(c.shape[1] - 1, -1, -1):
+            fp = fp * x + f
+            f = f * x + c[:, t]
+        df_dr = -x * x * fp
+        steg = f / np.where(df_dr == 0, np.inf, df_dr)
+        # Dempet steg: høyst halve avstanden mot -100 %, og høyst en dobling oppover
+        ny = np.clip(ri - steg, (ri - 1.0) / 2.0, 2.0 * ri + 1.0)
+        ferdig = np.abs(steg) < tol
+        r[aktiv[ferdig]] = ny[ferdig]
+        aktiv, ri, c = aktiv[~ferdig], ny[~ferdig], c[~ferdig]
+    return r
+
+def lcoe(kostnad: np.ndarray, energi: np.ndarray, rente: float) -> np.ndarray:
+    """
+    Nivåkostnad for spart/produsert energi (kr/kWh): nåverdi av kostnadene
+    (investering og reinvestering minus restverdi) delt på nåverdi av kWh.
+    """
+    d = diskonteringsfaktorer(rente, kostnad.shape[1] - 1)
+    pv_energi = energi @ d
+    return np.where(pv_energi > 0, (kostnad @ d) / np.where(pv_energi > 0, pv_energi, 1.0), np.nan)
+
+def livslop(tiltak_id, kwh, pris, invest, rente: float = 0.04, horisont: int = 30,
+            prisvekst: float = 0.02, levetid=None, degradering=None) -> dict:
+    """
+    NPV, IRR og LCOE for mange tiltak på én gang. `tiltak_id` (str eller liste) gir
+    standard levetid og degradering når de ikke er oppgitt.
+    """
+    ider = np.atleast_1d(np.asarray(tiltak_id, dtype=object))
+    n = max(len(ider), len(np.atleast_1d(kwh)))
+    if len(ider) == 1:
+        ider = np.repeat(ider, n)
+    if levetid is None:
+        levetid = [LEVETID.get(t, 15) for t in ider]
+    if degradering is None:
+        degradering = [DEGRADERING.get(t, 0.0) for t in ider]
+    kwh = np.broadcast_to(np.asarray(kwh, dtype=float), (n,))
+    pris = np.broadcast_to(np.asarray(pris, dtype=float), (n,))
+    invest = np.broadcast_to(np.asarray(invest, dtype=float), (n,))
+
+    energi, besparelse, kostnad = _deler(kwh, pris, invest, levetid, horisont, prisvekst, degradering)
+    cf = besparelse - kostnad
+    return {
+        "kontantstrom": cf,
+        "npv": npv(cf, rente),
+        "irr": irr(cf),
+        "lcoe": lcoe(kostnad, energi, rente),
+    }
@@ -0,0 +1,134 @@
+"""
+Valgfri tidsmåling av en app-kjøring (rerun): seksjoner, funksjonskall og tellere.
+
+Av som standard. Da koster en instrumentert funksjon ett oppslag i en trådlokal
+variabel per kall. Når måling er slått på for en kjøring (start_kjoring), samles:
+
+- seksjoner: rundetider mellom runde("navn")-merker i skriptet (import, sidepanel, faner …)
+- funksjoner: antall kall og samlet tid for funksjoner merket med @tidta
+- tellere: frie tellere via tell("navn"), f.eks. cache-bom
+
+avslutt_kjoring() gir en post som kan vises i et utviklerpanel og eventuelt legges
+til en JSON-lines-logg (én linje per kjøring). Loggfilen settes bare med
+miljøvariabelen ENERGITILTAK_PROFIL_LOGG på serveren.
+"""
+import functools
+import os
+import threading
+from datetime import datetime
+from time import perf_counter
+
+PROFIL_AKTIV = os.environ.get("ENERGITILTAK_PROFIL", "").strip().lower() in ("1", "true", "ja", "on")
+PROFIL_LOGG = os.environ.get("ENERGITILTAK_PROFIL_LOGG") or None
+
+_lokal = threading.local()
+
+class Kjoring:
+    """Målinger for én kjøring av skriptet (én tråd)."""
+
+    def __init__(self, navn: str = "kjøring"):
+        self.navn = navn
+        self.start = perf_counter()
+        self.seksjoner = {}
+        self.funksjoner = {}
+        self.tellere = {}
+        self._runde_navn = None
+        self._runde_start = self.start
+
+    def runde(self, navn: str = None):
+        naa = perf_counter()
+        if self._runde_navn is not None:
+            self.seksjoner[self._runde_navn] = self.seksjoner.get(self._runde_navn, 0.0) + (naa - self._runde_start)
+        self._runde_navn = navn
+        self._runde_start = naa
+
+    def legg_til(self, navn: str, sekunder: float):
+        n, s = self.funksjoner.get(navn, (0, 0.0))
+        self.funksjoner[navn] = (n + 1, s + sekunder)
+
+    def post(self) -> dict:
+        return {
+            "tid": datetime.now().isoformat(timespec="milliseconds"),
+            "navn": self.navn,
+            "total_ms": (perf_counter() - self.start) * 1000.0,
+            "seksjoner": {k: v * 1000.0 for k, v in self.seksjoner.items()},
+            "funksjoner": {k: {"n": n, "ms": s * 1000.0} for k, (n, s) in self.funksjoner.items()},
+            "tellere": dict(self.tellere),
+        }
+
+def aktiv() -> bool:
+    return getattr(_lokal, "kjoring", None) is not None
+
+def start_kjoring(navn: str = "kjøring", forhaand: dict = None) -> Kjoring:
+    """
+    Slår på måling for denne tråden. `forhaand` er seksjoner (navn -> sekunder) målt før
+    start, f.eks. import av Streamlit øverst i skriptet.
+    """
+    k = Kjoring(navn)
+    for seksjon, sek in (forhaand or {}).items():
+        k.seksjoner[seksjon] = float(sek)
+    _lokal.kjoring = k
+    return k
+
+def avslutt_kjoring() -> dict:
+    """Avslutter målingen for tråden og gir posten. Med PROFIL_LOGG legges den til som én JSON-linje."""
+    k = getattr(_lokal, "kjoring", None)
+    if k is None:
+        return None
+    k.runde(None)
+    _lokal.kjoring = None
+    post = k.post()
+    if PROFIL_LOGG:
+        import json
+
+        with open(PROFIL_LOGG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(post, ensure_ascii=False) + "\n")
+    return post
+
+def avbryt_kjoring():
+    """
+    Forkaster en påbegynt måling i tråden uten å lage post. Kalles øverst i hver kjøring, så
+    en kjøring som ble avbrutt før avslutt_kjoring (st.rerun, st.stop, unntak) ikke fortsetter
+    å måle i de neste.
+    """
+    _lokal.kjoring = None
+
+def runde(navn: str):
+    """Merke i skriptet: tiden fra forrige merke føres på forrige seksjon."""
+    k = getattr(_lokal, "kjoring", None)
+    if k is not None:
+        k.runde(navn)
+
+def tell(navn: str, n: int = 1):
+    k = getattr(_lokal, "kjoring", None)
+    if k is not None:
+        k.tellere[navn] = k.tellere.get(navn, 0) + n
+
+def tidta(fn=None, *, navn=None):
+    """
+    Dekoratør: tar tiden på hvert kall når måling er på. `navn` er en streng eller en
+    funksjon av argumentene (kalles bare når målingen er på).
+    """
+    def deco(fn):
+        standard = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            k = getattr(_lokal, "kjoring", None)
+            if k is None:
+                return fn(*args, **kwargs)
+            t0 = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                k.legg_til(standard if navn is None else (navn if isinstance(navn, str) else navn(*args, **kwargs)),
+                           perf_counter() - t0)
+        return wrapper
+    return deco if fn is None else deco(fn)
+
+def sammendrag(post: dict) -> list:
+    """Rader (type, navn, antall, ms) sortert etter tid, for visning i en tabell."""
+    rader = [("seksjon", k, None, v) for k, v in post["seksjoner"].items()]
+    rader += [("funksjon", k, v["n"], v["ms"]) for k, v in post["funksjoner"].items()]
+    rader += [("teller", k, v, None) for k, v in post["tellere"].items()]
+    return sorted(rader, key=lambda r: (r[0] != "seksjon", -(r[3] or 0.0)))
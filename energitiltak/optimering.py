@@ -0,0 +1,113 @@
+"""
+Optimal tiltakspakke innenfor et budsjett.
+
+Kandidatene er rader som i tiltakslisten (ID, kWh, Invest, eventuelt Input og Bygg).
+For hvert bygg evalueres alle delmengder av byggets tiltak med samspill (pakke.py),
+dominerte alternativer fjernes, og byggene kombineres med dynamisk programmering
+(flervalgs-ryggsekk) over et diskretisert budsjett. Kostnader rundes opp til nærmeste
+budsjettsteg, så løsningen holder seg alltid innenfor budsjettet.
+"""
+import math
+
+import numpy as np
+
+from .beregning import LEVETID
+from .maaling import tidta
+from .pakke import marginal_delmengder, varmebehov
+
+MAKS_PER_BYGG = 12   # 2^12 delmengder per bygg
+
+def annuitetsfaktor(rente: float, aar: float) -> float:
+    """Nåverdi av 1 kr/år i `aar` år."""
+    if rente <= 0:
+        return float(aar)
+    return (1.0 - (1.0 + rente) ** -aar) / rente
+
+def _alternativer(rader: list, maal: str, pris, rente: float):
+    """Alle delmengder for ett bygg: (invest, verdi, kWh, maske). Dominerte alternativer fjernes."""
+    k = len(rader)
+    if k > MAKS_PER_BYGG:
+        raise ValueError(f"For mange tiltak i ett bygg ({k} > {MAKS_PER_BYGG})")
+    masker = ((np.arange(2 ** k)[:, None] >> np.arange(k)) & 1).astype(bool)
+    ider = [r["ID"] for r in rader]
+    marg = marginal_delmengder(ider, [r["kWh"] for r in rader], masker, varmebehov(rader),
+                               [r.get("Input") for r in rader])
+
+    invest = masker @ np.array([float(r["Invest"]) for r in rader])
+    kwh = marg.sum(axis=1)
+    if maal == "kWh":
+        verdi = kwh
+    else:
+        af = np.array([annuitetsfaktor(rente, LEVETID.get(t, 15)) for t in ider])
+        priser = np.array([pris[t] if isinstance(pris, dict) else pris for t in ider], dtype=float)
+        verdi = (marg * priser) @ af - invest
+
+    # Pareto-front: sortert på kostnad, behold bare alternativer som gir mer enn alle billigere
+    orden = np.lexsort((-verdi, invest))
+    behold = []
+    beste = -np.inf
+    for i in orden:
+        if verdi[i] > beste:
+            behold.append(i)
+            beste = verdi[i]
+    return invest[behold], verdi[behold], kwh[behold], masker[behold]
+
+@tidta
+def optimer(kandidater: list, budsjett: float, maal: str = "kWh", pris=1.25,
+            rente: float = 0.04, steg: int = 2000) -> dict:
+    """
+    Velger tiltakene som maksimerer `maal` ("kWh" eller "NPV") innenfor `budsjett`.
+    Samspill regnes innen hvert bygg (nøkkel "Bygg", standard ett felles bygg).
+    `pris` kan være en dict ID -> timesvektet pris.
+    """
+    if maal not in ("kWh", "NPV"):
+        raise ValueError(f"Ukjent mål: {maal!r}")
+    budsjett = max(float(budsjett), 0.0)
+    # Uten budsjett er kapasiteten null steg, så bare tiltak uten kostnad kan velges
+    steg = max(int(steg), 1) if budsjett > 0 else 0
+    enhet = budsjett / steg if budsjett > 0 else 1.0
+
+    bygg = {}
+    for r in kandidater:
+        bygg.setdefault(r.get("Bygg", ""), []).append(r)
+
+    # dp[b] = beste verdi med kostnad <= b steg
+    dp = np.zeros(steg + 1)
+    valg = []
+    alternativer = []
+    for navn, rader in bygg.items():
+        invest, verdi, kwh, masker = _alternativer(rader, maal, pris, rente)
+        kost = np.ceil(np.round(invest / enhet, 9)).astype(int)
+        ny = np.full(steg + 1, -np.inf)
+        hvilket = np.zeros(steg + 1, dtype=np.int32)
+        for j in range(len(kost)):
+            c = kost[j]
+            if c > steg:
+                continue
+            kandidat = np.full(steg + 1, -np.inf)
+            kandidat[c:] = dp[:steg + 1 - c] + verdi[j]
+            bedre = kandidat > ny
+            ny[bedre] = kandidat[bedre]
+            hvilket[bedre] = j
+        dp = ny
+        valg.append(hvilket)
+        alternativer.append((navn, rader, invest, kwh, masker, kost))
+
+    # Spor tilbake valgt alternativ per bygg
+    b = int(np.argmax(dp))
+    valgte = []
+    sum_inv = sum_kwh = 0.0
+    for (navn, rader, invest, kwh, masker, kost), hvilket in zip(reversed(alternativer), reversed(valg)):
+        j = int(hvilket[b])
+        b -= int(kost[j])
+        sum_inv += float(invest[j])
+        sum_kwh += float(kwh[j])
+        valgte.extend((navn, rader[i]["ID"]) for i in np.flatnonzero(masker[j]))
+
+    return {
+        "valgt": sorted(valgte, key=lambda x: (str(x[0]), x[1])),
+        "kWh": sum_kwh,
+        "invest": sum_inv,
+        "verdi": float(dp.max()) if math.isfinite(dp.max()) else 0.0,
+        "maal": maal,
+    }
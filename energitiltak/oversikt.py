@@ -0,0 +1,159 @@
+"""
+Oversikt / pakke: oppdatering av tiltakslisten og aggregering til tabell og summer.
+"""
+from .beregning import nok_og_co2, payback_years
+from .cache import memo
+from .maaling import tidta
+
+KOL_TILTAK = "Tiltak"
+KOL_KWH = "Energisparing (kWh/år)"
+KOL_KR = "Kostnadsbesparelse (kr/år)"
+KOL_CO2 = "CO₂-reduksjon (kg/år)"
+KOL_INV = "Investering (kr)"
+KOL_PB = "Tilbakebetaling (år)"
+KOL_NPV = "Nåverdi (kr)"
+KOL_IRR = "Internrente (%)"
+KOL_LCOE = "LCOE (kr/kWh)"
+
+# tiltak-ID -> navn i oversikten
+TILTAK_NAVN = {
+    "iso": "Etterisolering",
+    "hrv": "Oppgradering varmegjenvinner",
+    "sfp": "SFP-tiltak / vifteoppgradering",
+    "vp": "Varmepumpe (luft–vann)",
+    "temp": "Temperaturreduksjon",
+    "night": "Nattsenking",
+    "led": "LED-ombygging",
+    "pv": "Solceller",
+}
+
+def upsert_tiltak(tiltak_liste: dict, tiltak_id: str, navn: str, kwh: float, invest: float, input: dict = None,
+                  eksport: float = 0.0, eksportpris: float = 0.0) -> dict:
+    """
+    Legger til eller oppdaterer et tiltak i tiltakslisten (dict ID -> rad, i innsettingsrekkefølge).
+    `input` (tiltakets input) lagres for samspill/optimering. `eksport` (kWh/år av `kwh`) selges
+    til `eksportpris` i stedet for strømprisen, f.eks. overskudd fra solceller. Gir den lagrede raden.
+    """
+    rad = {"ID": tiltak_id, "Tiltak": navn, "kWh": float(kwh), "Invest": float(invest)}
+    if input is not None:
+        rad["Input"] = dict(input)
+    if eksport:
+        rad["Eksport"] = float(eksport)
+        rad["Eksportpris"] = float(eksportpris)
+    tiltak_liste[tiltak_id] = rad
+    return rad
+
+def tillegg_for(rad: dict, pris: float) -> float:
+    """
+    kr/år utover kWh · pris for en tiltaksrad: eksportert strøm selges til eksportprisen i
+    stedet for `pris`, og et fast `Tillegg` (kr/år, fra API/importfiler) legges til. Regnes
+    med gjeldende pris, så tallene følger endringer i sidepanelet.
+    """
+    return (float(rad.get("Tillegg", 0.0))
+            + float(rad.get("Eksport", 0.0)) * (float(rad.get("Eksportpris", 0.0)) - float(pris)))
+
+@memo(maxsize=4096)
+def oversikt_rad(navn: str, kwh: float, invest: float, pris: float, utslipp_g: float, tillegg: float = 0.0) -> dict:
+    kWh = float(kwh)
+    inv = float(invest)
+    kr_aar, co2_kg = nok_og_co2(kWh, pris, utslipp_g)
+    kr_aar += float(tillegg)
+    pb = payback_years(inv, kr_aar)
+    return {
+        KOL_TILTAK: navn,
+        KOL_KWH: kWh,
+        KOL_KR: kr_aar,
+        KOL_CO2: co2_kg,
+        KOL_INV: inv,
+        KOL_PB: (None if pb is None else pb)
+    }
+
+def sats_for(sats, tiltak_id: str) -> float:
+    """Pris/utslipp er enten ett tall for alle tiltak eller en dict ID -> timesvektet sats."""
+    return float(sats[tiltak_id]) if isinstance(sats, dict) else float(sats)
+
+@tidta
+def oversikt_rader(tiltak_liste, pris, utslipp_g) -> list:
+    """
+    Én rad per tiltak med kr/år, CO₂ og enkel tilbakebetaling. `pris` og `utslipp_g` kan være
+    dict ID -> sats (timesvektet per tiltak). Uendrede rader hentes fra cache.
+    """
+    if isinstance(tiltak_liste, dict):
+        tiltak_liste = tiltak_liste.values()
+    rader = []
+    for r in tiltak_liste:
+        p = sats_for(pris, r["ID"])
+        rader.append(dict(oversikt_rad(r["Tiltak"], r["kWh"], r["Invest"], p, sats_for(utslipp_g, r["ID"]),
+                                       tillegg_for(r, p))))
+    return rader
+
+def oversikt_summer(rows: list) -> dict:
+    """Summer for pakken og samlet enkel tilbakebetaling (None hvis ingen besparelse)."""
+    sum_kwh = sum(r[KOL_KWH] for r in rows)
+    sum_kr = sum(r[KOL_KR] for r in rows)
+    sum_co2 = sum(r[KOL_CO2] for r in rows)
+    sum_inv = sum(r[KOL_INV] for r in rows)
+    return {
+        "kWh": sum_kwh,
+        "kr": sum_kr,
+        "co2": sum_co2,
+        "invest": sum_inv,
+        "payback": payback_years(sum_inv, sum_kr),
+    }
+
+@tidta
+def legg_til_livslop(rows: list, tiltak_liste, pris, rente: float = 0.04, horisont: int = 30,
+                     prisvekst: float = 0.02) -> dict:
+    """
+    Legger nåverdi, internrente og LCOE til oversiktsradene (én vektorisert beregning for
+    hele listen). Gir pakkens summerte nåverdi og internrente. NumPy importeres først her.
+    """
+    from .livslop import irr, livslop
+
+    if isinstance(tiltak_liste, dict):
+        tiltak_liste = list(tiltak_liste.values())
+    if not tiltak_liste:
+        return {"npv": 0.0, "irr": None}
+    # Eksport og tillegg regnes om til en effektiv pris per kWh, så det følger prisveksten
+    priser = [p + (tillegg_for(r, p) / r["kWh"] if r["kWh"] else 0.0)
+              for r, p in ((r, sats_for(pris, r["ID"])) for r in tiltak_liste)]
+    res = livslop([r["ID"] for r in tiltak_liste], [r["kWh"] for r in tiltak_liste], priser,
+                  [r["Invest"] for r in tiltak_liste], rente=rente, horisont=horisont, prisvekst=prisvekst)
+    for row, v, i, l in zip(rows, res["npv"], res["irr"], res["lcoe"]):
+        row[KOL_NPV] = float(v)
+        row[KOL_IRR] = None if i != i else float(i) * 100.0
+        row[KOL_LCOE] = None if l != l else float(l)
+    pakke_irr = float(irr(res["kontantstrom"].sum(axis=0))[0])
+    return {"npv": float(res["npv"].sum()), "irr": None if pakke_irr != pakke_irr else pakke_irr}
+
+# --- Formatering: heltall + tusenskille (mellomrom) ---
+def int_space(x):
+    return f"{int(round(x)):,}".replace(",", " ")
+
+def years_1(x):
+    if x is None or x != x:
+        return "–"
+    return f"{x:.1f}".replace(".", ",")
+
+def kr_2(x):
+    if x is None or x != x:
+        return "–"
+    return f"{x:.2f}".replace(".", ",")
+
+@tidta
+def stil_oversikt(rows: list):
+    """DataFrame + Styler for oversiktstabellen (pandas importeres først her)."""
+    import pandas as pd
+
+    df = pd.DataFrame(rows)
+    formater = {
+        KOL_KWH: int_space,
+        KOL_KR: int_space,
+        KOL_CO2: int_space,
+        KOL_INV: int_space,
+        KOL_PB: years_1,
+        KOL_NPV: int_space,
+        KOL_IRR: years_1,
+        KOL_LCOE: kr_2,
+    }
+    return df.style.format({k: f for k, f in formater.items() if k in df.columns})
@@ -0,0 +1,307 @@
+"""
+Samspill mellom tiltak i samme bygg.
+
+Tiltakene beregnes hver for seg mot det opprinnelige varmebehovet. Når flere gjennomføres
+sammen, krymper etterisolering og varmegjenvinning varmebehovet som temperaturreduksjon,
+nattsenking og varmepumpe sparer på. Her legges tiltakene på en felles varmebalanse, og
+hvert tiltak får sitt marginale bidrag.
+
+Balansen har to tilstander: gjenværende netto varmebehov Q og leveringsfaktoren f (levert
+energi per kWh varmebehov). Før varmepumpa er f = 1/eta_old for den gamle varmekilden
+(1 uten varmepumpeinput), og varmepumpa ganger f med sin faktor. Varmetiltakene reduserer
+Q med sin andel av det opprinnelige varmebehovet, og sparer f av reduksjonen. Begge
+operasjonene er multiplikative, så samlet besparelse for en gitt delmengde er den samme
+i alle rekkefølger; rekkefølgen avgjør bare hvordan den fordeles mellom tiltakene.
+
+- Pakke: én pakke i fast rekkefølge med tilstanden før hvert steg bufret, så av/på eller
+  endring av ett tiltak bare beregner det og tiltakene etter det på nytt.
+- marginal_delmengder: mange delmengder i fast rekkefølge på én gang (optimeringen).
+- alle_rekkefolger: alle rekkefølger av alle delmengder som et prefikstre, for rangering
+  og snittbidrag over rekkefølgene (Shapley-verdi).
+"""
+import math
+
+import numpy as np
+
+# Rekkefølge tiltakene legges på i: først de som reduserer varmetapet, så drift, til sist
+# varmepumpa (som dekker det varmebehovet som er igjen).
+REKKEFOLGE = ("iso", "hrv", "temp", "night", "vp", "sfp", "led", "pv")
+SENKER_VARME = ("iso", "hrv", "temp", "night")   # reduserer varmebehovet med en andel
+MAKS_REKKEFOLGE = 9   # alle_rekkefolger: 9 tiltak gir 986 410 sekvenser
+
+# Stegtyper i varmebalansen
+_ANDEL, _VP, _UAVHENGIG = 0, 1, 2
+
+def varmebehov(tiltak: list) -> float:
+    """Byggets netto varmebehov fra input til varmepumpe, temperaturreduksjon eller nattsenking."""
+    for tid, kol in (("vp", "Q_netto_kWh_year"), ("temp", "Q_space_kWh_year"), ("night", "Q_space_kWh_year")):
+        for r in tiltak:
+            if r.get("ID") == tid and kol in (r.get("Input") or {}):
+                return float(r["Input"][kol])
+    return None
+
+def _rekkefolge_indeks(ider) -> list:
+    return sorted(range(len(ider)), key=lambda i: REKKEFOLGE.index(ider[i]) if ider[i] in REKKEFOLGE else len(REKKEFOLGE))
+
+def _type(tid: str, Q_varme: float) -> int:
+    if not Q_varme or Q_varme <= 0:
+        return _UAVHENGIG
+    if tid == "vp":
+        return _VP
+    return _ANDEL if tid in SENKER_VARME else _UAVHENGIG
+
+def _vp_faktor(kwh: float, input: dict, Q_varme: float) -> float:
+    """
+    Leveringsfaktoren etter varmepumpa: 1 - dekningsgrad · (1 - eta_old/COP). Uten input
+    regnes den ut fra besparelsen, som om eta_old = 1.
+    """
+    inp = input or {}
+    if all(k in inp for k in ("eta_old", "COP_new", "dekningsgrad")):
+        r = 1.0 - float(inp["dekningsgrad"]) * (1.0 - float(inp["eta_old"]) / max(float(inp["COP_new"]), 1e-6))
+    elif Q_varme:
+        r = 1.0 - float(kwh) / float(Q_varme)
+    else:
+        r = 1.0
+    return min(max(r, 0.0), 1.0)
+
+def _f0(ider, input) -> float:
+    """Leveringsfaktoren før varmepumpa: 1/eta_old fra varmepumpeinputen, ellers 1."""
+    for tid, inp in zip(ider, input):
+        if tid == "vp" and inp and "eta_old" in inp:
+            return 1.0 / max(float(inp["eta_old"]), 1e-6)
+    return 1.0
+
+def _parametre(ider, kwh, input, Q_varme) -> tuple:
+    """Stegtype, kWh og varmepumpefaktor per tiltak som arrays, og leveringsfaktoren f0."""
+    input = input if input is not None else [None] * len(ider)
+    typer = np.array([_type(t, Q_varme) for t in ider], dtype=np.int8)
+    kwh = np.asarray(kwh, dtype=float)
+    r = np.array([_vp_faktor(k, i, Q_varme) if t == _VP else 1.0 for k, i, t in zip(kwh, input, typer)])
+    return typer, kwh, r, _f0(ider, input)
+
+def _steg(typ, kwh, r, Q, f, Q_varme: float) -> tuple:
+    """
+    Legger ett tiltak på balansen (Q, f). Alle argumenter kan være arrays (kringkastes).
+    Varmetiltak fjerner andelen kwh/Q_varme av gjenværende Q, varmepumpa ganger f med r.
+    Gir (bidrag, Q etter, f etter).
+    """
+    andel = np.minimum(kwh / Q_varme, 1.0) if Q_varme else 0.0
+    dQ = np.where(typ == _ANDEL, Q * andel, 0.0)
+    bidrag = np.where(typ == _VP, Q * f * (1.0 - r), np.where(typ == _UAVHENGIG, kwh, dQ * f))
+    return bidrag, Q - dQ, np.where(typ == _VP, f * r, f)
+
+def _alene(typ, kwh, r, f0: float, Q_varme: float) -> np.ndarray:
+    """Hvert tiltak alene på balansen (levert energi), samme enheter som bidragene i en pakke."""
+    return _steg(typ, kwh, r, float(Q_varme or 0.0), f0, Q_varme)[0]
+
+def marginal_delmengder(ider, kwh, masker, Q_varme: float = None, input: list = None) -> np.ndarray:
+    """
+    Marginale kWh for mange delmengder på én gang, i fast rekkefølge (REKKEFOLGE).
+    `ider`/`kwh` har lengde k (ett element per kandidattiltak), `masker` er (m, k) bool
+    der hver rad er en delmengde. `input` (tiltakenes input) gir varmepumpas faktor.
+    Gir (m, k) med hvert tiltaks bidrag i hver delmengde.
+    """
+    ider = list(ider)
+    masker = np.asarray(masker, dtype=bool)
+    typer, kwh, r, f0 = _parametre(ider, kwh, input, Q_varme)
+    marg = np.zeros(masker.shape)
+    if not Q_varme or Q_varme <= 0:
+        return np.where(masker, kwh, 0.0)
+
+    Q = np.full(masker.shape[0], float(Q_varme))
+    f = np.full(masker.shape[0], f0)
+    for i in _rekkefolge_indeks(ider):
+        valgt = masker[:, i]
+        bidrag, Q, f = _steg(typer[i], np.where(valgt, kwh[i], 0.0), np.where(valgt, r[i], 1.0), Q, f, Q_varme)
+        marg[:, i] = bidrag
+    return marg
+
+# ===============================
+# Inkrementell pakke
+# ===============================
+class Pakke:
+    """
+    Én pakke i fast rekkefølge mot en felles varmebalanse. Tilstanden (Q, f) før hvert
+    steg er bufret, så når et tiltak slås av/på eller endres, beregnes bare det og
+    tiltakene etter det på nytt. `omregnet` teller beregnede steg.
+    """
+
+    def __init__(self, tiltak=(), Q_varme: float = None, rekkefolge: tuple = REKKEFOLGE):
+        self.rekkefolge = tuple(rekkefolge)
+        self._Q_fast = Q_varme
+        self.Q_varme = None
+        self.ider, self.navn, self.kwh, self.input, self.aktiv = [], [], [], [], []
+        self._typer, self._r, self._f0 = [], [], 1.0
+        self._Q, self._f, self.marg = [], [], []
+        self.omregnet = 0
+        self.synk(tiltak)
+
+    def _plass(self, tid: str) -> int:
+        return self.rekkefolge.index(tid) if tid in self.rekkefolge else len(self.rekkefolge)
+
+    def synk(self, tiltak):
+        """
+        Oppdaterer fra tiltakslisten (dict ID -> rad eller liste av rader). Tiltak som er
+        uendret fram til første endring i rekkefølgen, beregnes ikke på nytt.
+        """
+        rader = list(tiltak.values()) if isinstance(tiltak, dict) else list(tiltak)
+        rader.sort(key=lambda r: self._plass(r["ID"]))
+        Q_varme = self._Q_fast if self._Q_fast is not None else varmebehov(rader)
+        aktiv = dict(zip(self.ider, self.aktiv))
+        ider = [r["ID"] for r in rader]
+        kwh = [float(r["kWh"]) for r in rader]
+        inp = [r.get("Input") for r in rader]
+        typer, _, r, f0 = _parametre(ider, kwh, inp, Q_varme)
+
+        # Første tiltak som er nytt eller endret; er varmebehovet eller f0 endret, beregnes alt
+        fra = next((i for i, tid in enumerate(ider) if i >= len(self.ider)
+                    or (tid, kwh[i], r[i]) != (self.ider[i], self.kwh[i], self._r[i])), len(ider))
+        if Q_varme != self.Q_varme or f0 != self._f0:
+            fra = 0
+        self._f0 = f0
+        self.Q_varme = Q_varme
+        self.ider, self.kwh, self.input = ider, kwh, inp
+        self.navn = [r.get("Tiltak", r["ID"]) for r in rader]
+        self.aktiv = [aktiv.get(t, True) for t in ider]
+        self._typer, self._r = list(typer), list(r)
+        self._beregn(fra)
+        return self
+
+    def sett_aktiv(self, tid: str, aktiv: bool = True):
+        """Slår et tiltak av eller på; beregner fra tiltaket og utover."""
+        i = self.ider.index(tid)
+        if self.aktiv[i] != bool(aktiv):
+            self.aktiv[i] = bool(aktiv)
+            self._beregn(i)
+
+    def _beregn(self, fra: int):
+        n = len(self.ider)
+        Q0 = self.Q_varme or 0.0
+        if fra == 0:
+            self._Q, self._f = [Q0], [self._f0]
+        del self._Q[fra + 1:], self._f[fra + 1:], self.marg[fra:]
+        for i in range(fra, n):
+            a = self.aktiv[i]
+            b, Q, f = _steg(self._typer[i], self.kwh[i] if a else 0.0, self._r[i] if a else 1.0,
+                            self._Q[i], self._f[i], Q0)
+            self.marg.append(float(b))
+            self._Q.append(float(Q))
+            self._f.append(float(f))
+        self.omregnet += n - fra
+
+    @property
+    def kWh(self) -> float:
+        """Samlet besparelse med samspill."""
+        return float(sum(self.marg))
+
+    def alene(self) -> list:
+        """Hvert tiltak alene på varmebalansen (levert energi, kWh/år)."""
+        return [float(x) for x in _alene(np.array(self._typer, dtype=np.int8), np.array(self.kwh, dtype=float),
+                                         np.array(self._r, dtype=float), self._f0, self.Q_varme)]
+
+    @property
+    def kWh_alene(self) -> float:
+        """Summen av de aktive tiltakene beregnet hver for seg på varmebalansen."""
+        return float(sum(k for k, a in zip(self.alene(), self.aktiv) if a))
+
+    def marginal(self) -> dict:
+        return dict(zip(self.ider, self.marg))
+
+    def restbehov(self) -> float:
+        """Netto varmebehov etter pakken (None uten kjent varmebehov)."""
+        return self._Q[-1] if self.Q_varme else None
+
+def evaluer_pakke(tiltak: list, Q_varme: float = None) -> dict:
+    """
+    Samlet besparelse for en pakke tiltak i ett bygg (rader som i tiltakslisten).
+    Gir {"kWh": sum, "marginal": {ID: kWh}}. Uten kjent varmebehov summeres tiltakene.
+    """
+    p = Pakke(tiltak, Q_varme)
+    return {"kWh": p.kWh, "marginal": p.marginal()}
+
+# ===============================
+# Alle rekkefølger og delmengder
+# ===============================
+def _spor(foreldre: list, siste: list, tot: list, d: int, noder: np.ndarray) -> tuple:
+    """Sekvensene (indekser) og kumulativ kWh for nodene `noder` på nivå d, fulgt tilbake til roten."""
+    seq = np.empty((len(noder), d), dtype=np.int8)
+    kum = np.empty((len(noder), d))
+    for nivaa in range(d, 0, -1):
+        seq[:, nivaa - 1] = siste[nivaa][noder]
+        kum[:, nivaa - 1] = tot[nivaa][noder]
+        noder = foreldre[nivaa][noder]
+    return seq, kum
+
+def alle_rekkefolger(ider, kwh, Q_varme: float = None, input: list = None) -> dict:
+    """
+    Evaluerer alle rekkefølger av alle delmengder av k tiltak (k!/(k-d)! sekvenser med d
+    tiltak) som et prefikstre: hvert nivå utvider sekvensene på forrige nivå med ett
+    ubrukt tiltak, vektorisert, så felles prefikser bare beregnes én gang. Gir
+
+    - "shapley": ID -> snittet av marginalbidraget over alle rekkefølger av hele pakken
+    - "maske", "kWh_min", "kWh_maks", "beste": per delmengde (indeks = bitmaske) laveste og
+      høyeste samlede besparelse over rekkefølgene (like bortsett fra avrunding, siden
+      balansen er uavhengig av rekkefølgen), og en rekkefølge (ID-er) som gir høyest
+    - "rekkefolger", "kumulativ", "akkumulert": alle rekkefølger av hele pakken (k!, k) med
+      samlet besparelse etter hvert steg, sortert synkende på summen av den (tidligst
+      besparelse når tiltakene gjennomføres ett og ett)
+    """
+    ider = list(ider)
+    k = len(ider)
+    if k > MAKS_REKKEFOLGE:
+        raise ValueError(f"For mange tiltak for alle rekkefølger ({k} > {MAKS_REKKEFOLGE})")
+    typer, kwh, r, f0 = _parametre(ider, kwh, input, Q_varme)
+    Q0 = float(Q_varme or 0.0)
+    bits = 1 << np.arange(k)
+
+    foreldre, siste, tot = [None], [None], [np.zeros(1)]
+    brukt, Q, f, akk = np.zeros(1, dtype=np.int64), np.full(1, Q0), np.full(1, f0), np.zeros(1)
+    shapley = np.zeros(k)
+    kWh_min = np.zeros(1 << k)
+    kWh_maks = np.zeros(1 << k)
+    beste_node = [np.zeros(1, dtype=np.int64)]
+    for d in range(1, k + 1):
+        p, j = np.nonzero((brukt[:, None] & bits) == 0)
+        b, Q, f = _steg(typer[j], kwh[j], r[j], Q[p], f[p], Q0)
+        t = tot[-1][p] + b
+        brukt = brukt[p] | bits[j]
+        akk = akk[p] + t
+        # Hver node på nivå d ligger i (k-d)! av de k! fulle rekkefølgene
+        shapley += np.bincount(j, weights=b, minlength=k) * (math.factorial(k - d) / math.factorial(k))
+        orden = np.lexsort((t, brukt))
+        ny_gruppe = np.r_[True, brukt[orden][1:] != brukt[orden][:-1]]
+        forst = orden[ny_gruppe]
+        sist = orden[np.r_[ny_gruppe[1:], True]]
+        kWh_min[brukt[forst]] = t[forst]
+        kWh_maks[brukt[sist]] = t[sist]
+        beste_node.append((brukt[sist], sist))
+        foreldre.append(p)
+        siste.append(j)
+        tot.append(t)
+
+    beste = [()] * (1 << k)
+    for d in range(1, k + 1):
+        koder, noder = beste_node[d]
+        seq, _ = _spor(foreldre, siste, tot, d, noder)
+        for kode, s in zip(koder, seq):
+            beste[kode] = tuple(ider[i] for i in s)
+    orden = np.argsort(-akk, kind="stable")
+    seq, kum = _spor(foreldre, siste, tot, k, orden)
+    return {
+        "ider": ider,
+        "shapley": dict(zip(ider, map(float, shapley))),
+        "maske": ((np.arange(1 << k)[:, None] & bits) > 0),
+        "kWh_min": kWh_min,
+        "kWh_maks": kWh_maks,
+        "beste": beste,
+        "rekkefolger": seq,
+        "kumulativ": kum,
+        "akkumulert": akk[orden],
+    }
+
+def rekkefolger_for(tiltak: list, Q_varme: float = None) -> dict:
+    """alle_rekkefolger for rader som i tiltakslisten (varmebehovet hentes fra input)."""
+    if Q_varme is None:
+        Q_varme = varmebehov(tiltak)
+    return alle_rekkefolger([r["ID"] for r in tiltak], [r["kWh"] for r in tiltak], Q_varme,
+                            [r.get("Input") for r in tiltak])
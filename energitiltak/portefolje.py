@@ -0,0 +1,369 @@
+"""
+Portefølje: tiltak for mange bygg i kolonnetabeller, med summer per bygg, tiltak og region.
+
+Radene (ett tiltak i ett bygg) ligger i NumPy-arrays som vokser ved behov, og summene per
+gruppe holdes oppdatert løpende: når et tiltak legges til, endres eller fjernes, trekkes
+den gamle raden fra og den nye legges til summene for bygget, tiltaket og regionen. Bare
+endring av pris/utslipp (som påvirker alle rader) beregner alt på nytt, vektorisert.
+
+Filtrering, sortering og sider gjøres på arrayene; en DataFrame bygges bare for siden som
+vises, så en portefølje på 5 000 bygg × 8 tiltak kan blas i uten å rendre hele tabellen.
+"""
+import numpy as np
+import pandas as pd
+
+from .beregning import nok_og_co2
+from .cache import normaliser
+from . import timesimulering as ts
+from .oversikt import (KOL_CO2, KOL_INV, KOL_KR, KOL_KWH, KOL_PB, KOL_TILTAK, TILTAK_NAVN,
+                       sats_for)
+
+KOL_BYGG = "Bygg"
+KOL_REGION = "Region"
+UTEN_REGION = "Uten region"
+DIMENSJONER = ("bygg", "tiltak", "region")
+SUMMER = ("kWh", "kr", "co2", "invest", "antall")
+SORTERING = {"payback": KOL_PB, "co2": KOL_CO2, "kr": KOL_KR, "kWh": KOL_KWH, "invest": KOL_INV}
+
+# Kolonnenavn i importfiler (f.eks. resultatet fra kommandolinjen) -> standardnavn
+_ALIAS = {
+    "bygg": ("bygg", "bygg_id", "byggnavn", "bygning", "building"),
+    "tiltak": ("tiltak", "tiltak_id", "id", "measure"),
+    "kWh": ("kwh", "kwh_aar", "energisparing"),
+    "invest": ("invest", "investering", "invest_kr"),
+    "region": ("region", "omrade", "område", "fylke", "kommune"),
+    "navn": ("navn", "tiltaksnavn"),
+    "tillegg": ("tillegg",),
+    "eksport": ("eksport", "eksport_kwh"),
+    "eksportpris": ("eksportpris",),
+}
+
+# Valgfrie kolonner i radene: kolonne -> felt i tiltaksraden
+_VALGFRIE = (("tillegg", "Tillegg"), ("eksport", "Eksport"), ("eksportpris", "Eksportpris"))
+
+class _Koder:
+    """Navn <-> heltallskode, i den rekkefølgen navnene dukker opp."""
+
+    def __init__(self):
+        self.navn = []
+        self.indeks = {}
+
+    def kode(self, navn: str) -> int:
+        k = self.indeks.get(navn)
+        if k is None:
+            k = self.indeks[navn] = len(self.navn)
+            self.navn.append(navn)
+        return k
+
+def _voks(x: np.ndarray, n: int) -> np.ndarray:
+    """Samme array med plass til minst n elementer (dobling, så innsetting blir amortisert O(1))."""
+    if len(x) >= n:
+        return x
+    ny = np.zeros((max(n, 2 * len(x), 16),) + x.shape[1:], dtype=x.dtype)
+    ny[:len(x)] = x
+    return ny
+
+class Portefolje:
+    """
+    Tiltaksrader for mange bygg med løpende summer per bygg, tiltak og region.
+    `pris` og `utslipp_g` er tall eller dict tiltak-ID -> sats, som i oversikten.
+    """
+
+    def __init__(self, pris=1.25, utslipp_g=20.0):
+        self._koder = {dim: _Koder() for dim in DIMENSJONER}
+        self._rad = {}                 # (bygg, tiltak-ID) -> radindeks
+        self._rader_i_bygg = {}        # byggkode -> set av radindekser
+        self._n = 0
+        self._navn = []
+        self._kol = {k: np.zeros(0) for k in ("kWh", "invest", "tillegg", "eksport", "eksportpris", "kr", "co2")}
+        self._kode = {dim: np.zeros(0, dtype=np.int32) for dim in DIMENSJONER}
+        self._aktiv = np.zeros(0, dtype=bool)
+        self._region_for_bygg = np.zeros(0, dtype=np.int32)
+        self._sum = {dim: np.zeros((0, len(SUMMER))) for dim in DIMENSJONER}
+        self._koder["region"].kode(UTEN_REGION)
+        self._pris = pris
+        self._utslipp = utslipp_g
+        self._satser_nokkel = normaliser((pris, utslipp_g))
+
+    # ---------------------------------
+    # Innlasting og løpende oppdatering
+    # ---------------------------------
+    @classmethod
+    def fra_lager(cls, lager, prosjekt: str, pris=1.25, utslipp_g=20.0) -> "Portefolje":
+        """Hele prosjektet fra Prosjektlager (én spørring, uten input-JSON)."""
+        p = cls(pris, utslipp_g)
+        for bygg, region in lager.regioner(prosjekt).items():
+            p.sett_region(bygg, region)
+        p.last_rader(lager.last_portefolje(prosjekt))
+        return p
+
+    def last_rader(self, rader):
+        """Mange (bygg, rad)-par på én gang; summene bygges vektorisert etterpå."""
+        rader = list(rader)
+        if self._n or len({(b, r["ID"]) for b, r in rader}) < len(rader):
+            for bygg, rad in rader:
+                self._skriv(bygg, rad)
+        else:
+            # Tom portefølje uten duplikater: kolonnene fylles direkte
+            n = len(rader)
+            for k in self._kol:
+                self._kol[k] = _voks(self._kol[k], n)
+            for dim in DIMENSJONER:
+                self._kode[dim] = _voks(self._kode[dim], n)
+            self._aktiv = _voks(self._aktiv, n)
+            self._aktiv[:n] = True
+            bygg = np.array([self._bygg_kode(b) for b, _ in rader], dtype=np.int32)
+            self._kode["bygg"][:n] = bygg
+            self._kode["tiltak"][:n] = [self._koder["tiltak"].kode(r["ID"]) for _, r in rader]
+            self._kode["region"][:n] = self._region_for_bygg[bygg]
+            self._kol["kWh"][:n] = [r["kWh"] for _, r in rader]
+            self._kol["invest"][:n] = [r["Invest"] for _, r in rader]
+            for k, felt in _VALGFRIE:
+                self._kol[k][:n] = [r.get(felt, 0.0) for _, r in rader]
+            self._navn = [r.get("Tiltak") or TILTAK_NAVN.get(r["ID"], r["ID"]) for _, r in rader]
+            for i, (b, r) in enumerate(rader):
+                self._rad[(b, r["ID"])] = i
+                self._rader_i_bygg.setdefault(int(bygg[i]), set()).add(i)
+            self._n = n
+        self._beregn_alt()
+
+    def oppdater(self, bygg: str, rad: dict):
+        """Upsert av én tiltaksrad (ID, Tiltak, kWh, Invest, valgfritt Tillegg og Eksport); summene justeres."""
+        i = self._rad.get((bygg, rad["ID"]))
+        if i is not None and self._aktiv[i]:
+            self._juster(i, -1.0)
+        i = self._skriv(bygg, rad)
+        self._verdsett(i)
+        self._juster(i, 1.0)
+
+    def fjern(self, bygg: str, tiltak_id: str = None):
+        """Fjerner ett tiltak, eller alle tiltakene i bygget."""
+        if tiltak_id is None:
+            kode = self._koder["bygg"].indeks.get(bygg)
+            indekser = list(self._rader_i_bygg.get(kode, ()))
+        else:
+            indekser = [self._rad[(bygg, tiltak_id)]] if (bygg, tiltak_id) in self._rad else []
+        for i in indekser:
+            if self._aktiv[i]:
+                self._juster(i, -1.0)
+                self._aktiv[i] = False
+
+    def sett_region(self, bygg: str, region: str):
+        """Flytter bygget (og summene for tiltakene i det) til en annen region."""
+        b = self._bygg_kode(bygg)
+        ny = self._koder["region"].kode(str(region).strip() or UTEN_REGION)
+        if self._region_for_bygg[b] == ny:
+            return
+        aktive = [i for i in self._rader_i_bygg.get(b, ()) if self._aktiv[i]]
+        for i in aktive:
+            self._juster(i, -1.0, ("region",))
+        self._region_for_bygg[b] = ny
+        for i in aktive:
+            self._kode["region"][i] = ny
+            self._juster(i, 1.0, ("region",))
+
+    def sett_satser(self, pris, utslipp_g) -> bool:
+        """Ny pris/utslipp for alle rader. Beregner alt på nytt bare hvis satsene faktisk er endret."""
+        nokkel = normaliser((pris, utslipp_g))
+        if nokkel == self._satser_nokkel:
+            return False
+        self._pris, self._utslipp, self._satser_nokkel = pris, utslipp_g, nokkel
+        self._beregn_alt()
+        return True
+
+    def _bygg_kode(self, bygg: str) -> int:
+        b = self._koder["bygg"].kode(bygg)
+        if b >= len(self._region_for_bygg):
+            self._region_for_bygg = _voks(self._region_for_bygg, b + 1)
+        return b
+
+    def _skriv(self, bygg: str, rad: dict) -> int:
+        """Skriver råverdiene for en rad (ny eller eksisterende); kr/CO₂ og summer settes av kalleren."""
+        b = self._bygg_kode(bygg)
+        i = self._rad.get((bygg, rad["ID"]))
+        if i is None:
+            i = self._n
+            self._n += 1
+            for k in self._kol:
+                self._kol[k] = _voks(self._kol[k], self._n)
+            for dim in DIMENSJONER:
+                self._kode[dim] = _voks(self._kode[dim], self._n)
+            self._aktiv = _voks(self._aktiv, self._n)
+            self._navn.append(None)
+            self._rad[(bygg, rad["ID"])] = i
+            self._rader_i_bygg.setdefault(b, set()).add(i)
+        self._navn[i] = rad.get("Tiltak") or TILTAK_NAVN.get(rad["ID"], rad["ID"])
+        self._kol["kWh"][i] = float(rad["kWh"])
+        self._kol["invest"][i] = float(rad["Invest"])
+        for k, felt in _VALGFRIE:
+            self._kol[k][i] = float(rad.get(felt, 0.0))
+        self._kode["bygg"][i] = b
+        self._kode["tiltak"][i] = self._koder["tiltak"].kode(rad["ID"])
+        self._kode["region"][i] = self._region_for_bygg[b]
+        self._aktiv[i] = True
+        return i
+
+    def _verdsett(self, i: int):
+        tiltak_id = self._koder["tiltak"].navn[self._kode["tiltak"][i]]
+        pris = sats_for(self._pris, tiltak_id)
+        kr, co2 = nok_og_co2(self._kol["kWh"][i], pris, sats_for(self._utslipp, tiltak_id))
+        self._kol["kr"][i] = kr + self._tillegg(pris, i)
+        self._kol["co2"][i] = co2
+
+    def _juster(self, i: int, fortegn: float, dimensjoner=DIMENSJONER):
+        verdier = (self._kol["kWh"][i], self._kol["kr"][i], self._kol["co2"][i], self._kol["invest"][i], 1.0)
+        for dim in dimensjoner:
+            g = self._kode[dim][i]
+            if g >= len(self._sum[dim]):
+                self._sum[dim] = _voks(self._sum[dim], len(self._koder[dim].navn))
+            s = self._sum[dim][g]
+            s += fortegn * np.asarray(verdier)
+            if s[-1] <= 0:
+                s[:] = 0.0   # tom gruppe: ingen avrundingsrester
+
+    def _beregn_alt(self):
+        """kr/CO₂ for alle rader og summer per gruppe, vektorisert (brukes ved innlasting og nye satser)."""
+        n = self._n
+        ider = self._koder["tiltak"].navn
+        pris = np.array([sats_for(self._pris, t) for t in ider] or [0.0])
+        utslipp = np.array([sats_for(self._utslipp, t) for t in ider] or [0.0])
+        t = self._kode["tiltak"][:n]
+        kWh = self._kol["kWh"][:n]
+        # Samme regneoperasjoner som nok_og_co2, så tallene blir like som ved løpende oppdatering
+        self._kol["kr"][:n] = kWh * pris[t] + self._tillegg(pris[t], slice(0, n))
+        self._kol["co2"][:n] = kWh * (utslipp[t] / 1000.0)
+        for dim in DIMENSJONER:
+            self._sum[dim] = self._summer_per_gruppe(dim, self._aktiv[:n])
+
+    def _tillegg(self, pris, rader):
+        """kr/år utover kWh · pris for rad(ene) `rader` (som tillegg_for i oversikten), med gjeldende pris."""
+        return (self._kol["tillegg"][rader]
+                + self._kol["eksport"][rader] * (self._kol["eksportpris"][rader] - pris))
+
+    def _summer_per_gruppe(self, dim: str, maske: np.ndarray) -> np.ndarray:
+        n = self._n
+        kode = self._kode[dim][:n][maske]
+        m = len(self._koder[dim].navn)
+        kolonner = [self._kol[k][:n][maske] for k in ("kWh", "kr", "co2", "invest")]
+        ut = np.column_stack([np.bincount(kode, weights=x, minlength=m) for x in kolonner]
+                             + [np.bincount(kode, minlength=m).astype(float)])
+        return ut.reshape(m, len(SUMMER))
+
+    # ---------------------------------
+    # Spørringer
+    # ---------------------------------
+    def __len__(self) -> int:
+        return int(self._aktiv[:self._n].sum())
+
+    def navn(self, dim: str) -> list:
+        """Gruppenavn med minst ett aktivt tiltak (bygg, tiltak-ID eller region)."""
+        s = self._sum[dim]
+        return [n for g, n in enumerate(self._koder[dim].navn) if g < len(s) and s[g, -1] > 0]
+
+    def payback(self) -> np.ndarray:
+        n = self._n
+        kr = self._kol["kr"][:n]
+        pb = np.full(n, np.nan)
+        np.divide(self._kol["invest"][:n], kr, out=pb, where=kr > 0)
+        return pb
+
+    def maske(self, tiltak=None, regioner=None, bygg=None, payback_maks: float = None,
+              co2_min: float = None) -> np.ndarray:
+        """Aktive rader som oppfyller filtrene (None = ikke filtrer). Tom liste gir ingen rader."""
+        n = self._n
+        m = self._aktiv[:n].copy()
+        for dim, verdier in (("tiltak", tiltak), ("region", regioner), ("bygg", bygg)):
+            if verdier is not None:
+                koder = [self._koder[dim].indeks[v] for v in verdier if v in self._koder[dim].indeks]
+                m &= np.isin(self._kode[dim][:n], koder)
+        if payback_maks is not None:
+            m &= self.payback() <= float(payback_maks)
+        if co2_min is not None:
+            m &= self._kol["co2"][:n] >= float(co2_min)
+        return m
+
+    def summer(self, maske: np.ndarray = None) -> dict:
+        """Summer som i oversikt_summer, for hele porteføljen (løpende summer) eller et utvalg."""
+        if maske is None:
+            s = self._sum["tiltak"].sum(axis=0) if len(self._sum["tiltak"]) else np.zeros(len(SUMMER))
+        else:
+            s = [float(self._kol[k][:self._n][maske].sum()) for k in ("kWh", "kr", "co2", "invest")]
+            s.append(float(maske.sum()))
+        ut = dict(zip(SUMMER, (float(x) for x in s)))
+        ut["antall"] = int(ut["antall"])
+        ut["payback"] = ut["invest"] / ut["kr"] if ut["kr"] > 0 else None
+        return ut
+
+    def grupper(self, etter: str, maske: np.ndarray = None) -> pd.DataFrame:
+        """
+        Summer per bygg, tiltak eller region, sortert etter størst besparelse. Uten `maske`
+        brukes de løpende summene; med filter summeres utvalget med bincount.
+        """
+        if etter not in DIMENSJONER:
+            raise KeyError(f"Kan ikke gruppere etter {etter!r}")
+        s = self._sum[etter] if maske is None else self._summer_per_gruppe(etter, maske)
+        navn = self._koder[etter].navn[:len(s)]
+        df = pd.DataFrame(s[:len(navn)], index=pd.Index(navn, name=etter), columns=list(SUMMER))
+        df = df[df["antall"] > 0]
+        df["antall"] = df["antall"].astype(int)
+        df["payback"] = np.where(df["kr"] > 0, df["invest"] / df["kr"].where(df["kr"] > 0, 1.0), np.nan)
+        return df.sort_values("kr", ascending=False)
+
+    def side(self, maske: np.ndarray = None, sorter: str = "payback", synkende: bool = False,
+             side: int = 0, per_side: int = 50) -> tuple:
+        """
+        Én side av radtabellen: (DataFrame, antall rader i utvalget). Sorteringen gjøres på
+        arrayene; tilbakebetaling NaN (ingen besparelse) havner alltid sist.
+        """
+        if maske is None:
+            maske = self._aktiv[:self._n]
+        idx = np.flatnonzero(maske)
+        verdi = self.payback()[idx] if sorter == "payback" else self._kol[sorter][:self._n][idx]
+        nokkel = np.where(np.isnan(verdi), np.inf, -verdi if synkende else verdi)
+        start = max(int(side), 0) * int(per_side)
+        valgt = idx[np.argsort(nokkel, kind="stable")[start:start + int(per_side)]]
+        bygg, region = self._koder["bygg"].navn, self._koder["region"].navn
+        pb = self.payback()[valgt]
+        df = pd.DataFrame({
+            KOL_BYGG: [bygg[b] for b in self._kode["bygg"][valgt]],
+            KOL_REGION: [region[r] for r in self._kode["region"][valgt]],
+            KOL_TILTAK: [self._navn[i] for i in valgt],
+            KOL_KWH: self._kol["kWh"][valgt],
+            KOL_KR: self._kol["kr"][valgt],
+            KOL_CO2: self._kol["co2"][valgt],
+            KOL_INV: self._kol["invest"][valgt],
+            KOL_PB: pb,
+        })
+        return df, len(idx)
+
+def les_portefolje(fil) -> tuple:
+    """
+    Leser tiltak for mange bygg fra CSV/Parquet (kolonnene bygg, tiltak, kWh, invest og
+    valgfritt region, navn, tillegg, eksport og eksportpris – også resultatfilen fra kommandolinjen). Gir
+    (liste av (bygg, rad), dict bygg -> region).
+    """
+    navn = str(getattr(fil, "name", fil)).lower()
+    df = pd.read_parquet(fil) if navn.endswith((".parquet", ".pq")) else ts.les_csv(fil)
+    kolonner = {}
+    for std, alias in _ALIAS.items():
+        kolonner[std] = next((k for k in df.columns if str(k).strip().lower() in alias), None)
+    mangler = [k for k in ("bygg", "tiltak", "kWh", "invest") if kolonner[k] is None]
+    if mangler:
+        raise ValueError(f"Porteføljen mangler kolonnene: {', '.join(mangler)}")
+
+    bygg = df[kolonner["bygg"]].astype(str).str.strip().to_numpy()
+    tiltak = df[kolonner["tiltak"]].astype(str).str.strip().to_numpy()
+    tall = {k: pd.to_numeric(df[kolonner[k]], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+            for k in ("kWh", "invest", "tillegg", "eksport", "eksportpris") if kolonner[k] is not None}
+    null = np.zeros(len(df))
+    navn = (df[kolonner["navn"]].astype(str).to_numpy() if kolonner["navn"] is not None
+            else [TILTAK_NAVN.get(t, t) for t in tiltak])
+    rader = [(b, {"ID": t, "Tiltak": n, "kWh": k, "Invest": i, "Tillegg": x, "Eksport": e, "Eksportpris": ep})
+             for b, t, n, k, i, x, e, ep in zip(bygg, tiltak, navn, tall["kWh"].tolist(), tall["invest"].tolist(),
+                                                *(tall.get(k, null).tolist()
+                                                  for k in ("tillegg", "eksport", "eksportpris")))]
+    regioner = {}
+    if kolonner["region"] is not None:
+        r = df[kolonner["region"]].fillna("").astype(str).str.strip()
+        regioner = dict(zip(bygg[r.to_numpy() != ""], r[r != ""]))
+    return rader, regioner
@@ -0,0 +1,241 @@
+"""
+Timespriser (spot) og utslippsfaktorer for strømnettet, og verdsetting av besparelser time for time.
+
+En besparelse om kvelden eller midtvinters er verdt noe annet enn snittprisen. Hvert tiltak
+får derfor en spareprofil (andel av årsbesparelsen per time, sum 1) utledet av driftstid,
+graddagstimer eller solproduksjon. Kr og CO₂ blir da skalarprodukter:
+
+    kr = kWh · (profil · pris),   CO₂ = kWh · (profil · utslipp) / 1000
+
+Seriene leses fra CSV eller Parquet (én rad per time, eventuelt med sonekolonne), parses én
+gang og lagres som NumPy-filer i en cachemappe. Senere åpninger minnekartlegger filene, så
+flerårige serier for alle prisområder lastes uten å lese inn alt, og bytte av sone eller år
+leser bare de 8760 timene som trengs.
+"""
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+
+from .beregning import HOURS_YEAR
+from .cache import memo
+from . import timesimulering as ts
+
+CACHE_MAPPE = os.environ.get("ENERGITILTAK_CACHE", ".energitiltak_cache")
+
+KOLONNER_TID = ("tid", "time", "timestamp", "datetime", "dato", "start", "fra", "from")
+KOLONNER_SONE = ("sone", "zone", "prisområde", "prisomrade", "omrade", "område", "area")
+KOLONNER_PRIS = ("pris", "price", "spotpris", "kr_per_kwh", "nok_per_kwh", "pris_kr_kwh",
+                 "nok_per_mwh", "kr_per_mwh", "price_nok_mwh")
+KOLONNER_UTSLIPP = ("utslipp", "utslipp_g", "co2", "g_per_kwh", "gco2_per_kwh", "emission", "emissions")
+ALLE = "Alle"
+
+# ===============================
+# Lesing og cache
+# ===============================
+def _les_tabell(data: bytes, navn: str):
+    import pandas as pd
+
+    if navn.lower().endswith((".parquet", ".pq")) or data[:4] == b"PAR1":
+        return pd.read_parquet(io.BytesIO(data))
+    return ts.les_csv(io.BytesIO(data))
+
+def _finn(df, navn: tuple):
+    return next((k for k in df.columns if str(k).strip().lower() in navn), None)
+
+def _tid(kol):
+    """Tidsstempler som naiv norsk normaltid (UTC+1), så sommertid ikke gir doble/manglende timer."""
+    import pandas as pd
+
+    try:
+        tid = pd.to_datetime(kol, errors="coerce")
+    except ValueError:
+        tid = None
+    if tid is None or not pd.api.types.is_datetime64_any_dtype(tid):
+        # Blandede UTC-forskyvninger (+01:00/+02:00)
+        tid = pd.to_datetime(kol, errors="coerce", utc=True)
+    if getattr(tid.dt, "tz", None) is not None:
+        tid = tid.dt.tz_convert("Etc/GMT-1").dt.tz_localize(None)
+    return tid.dt.floor("h")
+
+def _parse(data: bytes, navn: str) -> tuple:
+    """Tabell -> (start, soner, {"pris": (timer, soner), "utslipp": (timer, soner)})."""
+    import pandas as pd
+
+    df = _les_tabell(data, navn)
+    kol_tid = _finn(df, KOLONNER_TID)
+    if kol_tid is None:
+        raise ValueError("Fant ingen tidskolonne (f.eks. 'tid' eller 'time')")
+    kol_sone = _finn(df, KOLONNER_SONE)
+    kolonner = {"pris": _finn(df, KOLONNER_PRIS), "utslipp": _finn(df, KOLONNER_UTSLIPP)}
+    if kolonner["pris"] is None and kolonner["utslipp"] is None:
+        raise ValueError("Fant verken pris- eller utslippskolonne")
+
+    tid = _tid(df[kol_tid])
+    if tid.isna().any():
+        raise ValueError("Tidskolonnen inneholder ugyldige verdier")
+    sone = df[kol_sone].astype(str).str.strip() if kol_sone is not None else pd.Series(ALLE, index=df.index)
+
+    fra, til = tid.min(), tid.max()
+    timer = int((til - fra) / pd.Timedelta(hours=1)) + 1
+    soner = sorted(sone.unique())
+    serier = {}
+    for hva, kol in kolonner.items():
+        if kol is None:
+            continue
+        x = pd.to_numeric(df[kol], errors="coerce")
+        if "mwh" in str(kol).lower():
+            x = x / 1000.0
+        tabell = (pd.DataFrame({"tid": tid, "sone": sone, "x": x})
+                  .pivot_table(index="tid", columns="sone", values="x", aggfunc="mean")
+                  .reindex(index=pd.date_range(fra, periods=timer, freq="h"), columns=soner)
+                  .interpolate(limit_direction="both"))
+        serier[hva] = tabell.to_numpy(dtype=float)
+    return np.datetime64(fra.to_datetime64(), "h"), soner, serier
+
+class Prisserier:
+    """
+    Timesserier for pris (kr/kWh) og utslipp (g CO₂/kWh) per sone. Matrisene har form
+    (timer, soner) og er normalt minnekartlagte fra cachemappen.
+    """
+
+    def __init__(self, start: np.datetime64, soner: list, serier: dict):
+        self.start = np.datetime64(start, "h")
+        self.soner = list(soner)
+        self.serier = serier
+        self._aar = {}
+
+    @property
+    def timer(self) -> int:
+        return next(iter(self.serier.values())).shape[0]
+
+    @property
+    def har_pris(self) -> bool:
+        return "pris" in self.serier
+
+    @property
+    def har_utslipp(self) -> bool:
+        return "utslipp" in self.serier
+
+    def aar(self) -> list:
+        """Kalenderår som dekkes helt av seriene."""
+        forste = int(str(self.start)[:4])
+        siste = int(str(self.start + np.timedelta64(self.timer - 1, "h"))[:4])
+        return [a for a in range(forste, siste + 1) if self._indeks(a) is not None]
+
+    def _indeks(self, aar: int):
+        fra = int((np.datetime64(f"{aar}-01-01T00", "h") - self.start).astype(int))
+        til = int((np.datetime64(f"{aar + 1}-01-01T00", "h") - self.start).astype(int))
+        if fra < 0 or til > self.timer:
+            return None
+        return fra, til
+
+    def aarsserie(self, hva: str, sone: str, aar: int) -> np.ndarray:
+        """8760 timesverdier for ett år og én sone (29. februar fjernes). Caches per (hva, sone, år)."""
+        nokkel = (hva, sone, int(aar))
+        if nokkel not in self._aar:
+            if hva not in self.serier:
+                raise KeyError(f"Seriene mangler {hva!r}")
+            indeks = self._indeks(int(aar))
+            if indeks is None:
+                raise ValueError(f"Seriene dekker ikke hele {aar}")
+            x = np.array(self.serier[hva][indeks[0]:indeks[1], self.soner.index(sone)], dtype=float)
+            x = ts.til_8760(x, f"{hva.capitalize()}serien for {sone} {aar}")
+            x.setflags(write=False)
+            self._aar[nokkel] = x
+        return self._aar[nokkel]
+
+def last_prisserier(kilde, navn: str = None, cache_mappe: str = CACHE_MAPPE) -> Prisserier:
+    """
+    Leser pris-/utslippsserier fra en filsti eller bytes. Første gang parses tabellen og
+    lagres som .npy i `cache_mappe` (nøkkel: innholds-hash); deretter minnekartlegges den.
+    """
+    data = None
+    if isinstance(kilde, (bytes, bytearray, memoryview)):
+        data = bytes(kilde)
+        nokkel = hashlib.blake2b(data, digest_size=16).hexdigest()
+    else:
+        # Lokal fil: nøkkel fra sti, størrelse og endringstid, så filen bare leses ved første parsing
+        st = os.stat(kilde)
+        nokkel = hashlib.blake2b(f"{os.path.abspath(kilde)}|{st.st_size}|{st.st_mtime_ns}".encode(),
+                                 digest_size=16).hexdigest()
+        navn = navn or str(kilde)
+    mappe = os.path.join(cache_mappe, nokkel)
+    meta_fil = os.path.join(mappe, "meta.json")
+
+    if not os.path.exists(meta_fil):
+        if data is None:
+            with open(kilde, "rb") as f:
+                data = f.read()
+        start, soner, serier = _parse(data, navn or "")
+        os.makedirs(mappe, exist_ok=True)
+        for hva, x in serier.items():
+            np.save(os.path.join(mappe, f"{hva}.npy"), x)
+        with open(meta_fil, "w", encoding="utf-8") as f:
+            json.dump({"start": str(start), "soner": soner, "serier": sorted(serier)}, f)
+
+    with open(meta_fil, encoding="utf-8") as f:
+        meta = json.load(f)
+    serier = {hva: np.load(os.path.join(mappe, f"{hva}.npy"), mmap_mode="r") for hva in meta["serier"]}
+    return Prisserier(np.datetime64(meta["start"], "h"), meta["soner"], serier)
+
+# ===============================
+# Spareprofiler
+# ===============================
+@memo(maxsize=8)
+def standard_temperatur(T_snitt: float = 6.0, amplitude: float = 10.0, dogn_amplitude: float = 3.0) -> np.ndarray:
+    """Syntetisk normalår for utetemperatur (kaldest i slutten av januar, varmest kl. 15)."""
+    h = np.arange(HOURS_YEAR)
+    dag = h / 24.0
+    return (float(T_snitt) - float(amplitude) * np.cos(2.0 * np.pi * (dag - 25.0) / 365.0)
+            - float(dogn_amplitude) * np.cos(2.0 * np.pi * ((h % 24) - 3.0) / 24.0))
+
+def _normer(x) -> np.ndarray:
+    x = np.maximum(np.asarray(x, dtype=float), 0.0)
+    s = x.sum()
+    return x / s if s > 0 else np.full(HOURS_YEAR, 1.0 / HOURS_YEAR)
+
+@memo(maxsize=256)
+def spareprofil(tiltak_id: str, drift=None, T_ute=None, senking=None, sol=None) -> np.ndarray:
+    """
+    Andel av årsbesparelsen per time (sum 1) for et tiltak:
+    varmetiltak følger graddagstimene (i driftstiden for varmegjenvinning, i senketimene
+    for nattsenking), vifter og belysning følger driftstiden, og solceller solproduksjonen.
+    Uten temperaturserie brukes et syntetisk normalår; uten driftsmaske døgnkontinuerlig drift.
+    """
+    dh = ts.graddagstimer(standard_temperatur() if T_ute is None else T_ute)
+    drift = np.ones(HOURS_YEAR) if drift is None else np.asarray(drift, dtype=float)
+    if tiltak_id in ("iso", "temp", "vp"):
+        return _normer(dh)
+    if tiltak_id == "hrv":
+        return _normer(dh * drift)
+    if tiltak_id == "night":
+        return _normer(dh if senking is None else dh * np.asarray(senking, dtype=float))
+    if tiltak_id in ("sfp", "led"):
+        return _normer(drift)
+    if tiltak_id == "pv":
+        if sol is None:
+            from . import solceller as sc
+
+            ghi, dhi = sc.klarvaer(*sc.STED_STANDARD)
+            sol = sc.feltprofiler(*sc.STED_STANDARD, ghi, 35.0, 180.0, dhi)[0]
+        return _normer(sol)
+    raise KeyError(f"Ukjent tiltak: {tiltak_id!r}")
+
+def effektive_satser(profiler, pris=None, utslipp=None) -> tuple:
+    """
+    Timesvektet pris (kr/kWh) og utslipp (g/kWh) per profil: profiler (m, 8760) mot
+    serier (8760,) eller (8760, k) for flere soner/år på én gang.
+    """
+    P = np.atleast_2d(np.asarray(profiler, dtype=float))
+    p = None if pris is None else P @ np.asarray(pris, dtype=float)
+    u = None if utslipp is None else P @ np.asarray(utslipp, dtype=float)
+    return p, u
+
+def verdsett(kwh, profiler, pris, utslipp) -> tuple:
+    """(kr/år, kg CO₂/år) for årsbesparelser `kwh` (m,) med hver sin spareprofil."""
+    p, u = effektive_satser(profiler, pris, utslipp)
+    kwh = np.asarray(kwh, dtype=float)
+    return kwh * p, kwh * u / 1000.0
@@ -0,0 +1,677 @@
+"""
+Rapport for tiltakspakken som Excel (XLSX) og PDF med figurer – bare standardbiblioteket.
+
+    python -m energitiltak.rapport --prosjekt "Mitt prosjekt" --ut rapporter.zip --format pdf,xlsx
+
+rapportdata() samler oversiktsradene, summene og forutsetningene for ett bygg, og
+excel()/pdf() skriver filen direkte: XLSX er en zip med XML-deler der figurene er
+Excel-diagrammer koblet til tabellen, og PDF-en bruker standardskriftene Helvetica og
+Helvetica-Bold (ingen innebygde fonter) med tabell og stolpediagrammer som vektorgrafikk.
+De statiske delene – XLSX-malene (stiler, relasjoner, innholdstyper) og fontobjektene og
+tegnbreddene i PDF-en – bygges én gang og gjenbrukes, så én rapport tar noen millisekunder.
+
+start() kjører en rapport (eller en bulkjobb) i en bakgrunnstråd og gir en Future, slik at
+Streamlit-økten ikke blokkeres. bulk() lager rapporter for mange bygg fra Prosjektlager,
+fordelt på en prosesspool i biter, og pakker dem i én zip.
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from .beregning import fmt_int
+from .cache import memo
+from .maaling import tidta
+from .oversikt import (KOL_CO2, KOL_INV, KOL_IRR, KOL_KR, KOL_KWH, KOL_LCOE, KOL_NPV, KOL_PB, KOL_TILTAK,
+                       kr_2, legg_til_livslop, oversikt_rader, oversikt_summer, years_1)
+
+FORMATER = ("pdf", "xlsx")
+BIT = 25             # bygg per oppgave i bulk
+POOL_FRA = 200       # bruk prosesspool fra dette antallet bygg (under er én prosess raskest)
+MAKS_STOLPER = 25    # flere tiltak enn dette: diagrammene viser de største
+
+# Tabellkolonner i rekkefølge: nøkkel, format ("tekst", "int", "1", "2") og overskrift i PDF (to linjer)
+KOLONNER = [
+    (KOL_TILTAK, "tekst", ("Tiltak", "")),
+    (KOL_KWH, "int", ("Energisparing", "kWh/år")),
+    (KOL_KR, "int", ("Besparelse", "kr/år")),
+    (KOL_CO2, "int", ("CO₂-red.", "kg/år")),
+    (KOL_INV, "int", ("Investering", "kr")),
+    (KOL_PB, "1", ("Tilbakebet.", "år")),
+    (KOL_NPV, "int", ("Nåverdi", "kr")),
+    (KOL_IRR, "1", ("Internrente", "%")),
+    (KOL_LCOE, "2", ("LCOE", "kr/kWh")),
+]
+
+# ===============================
+# Rapportdata
+# ===============================
+def _sats(sats):
+    """Pris/utslipp som float eller dict ID -> float (NumPy-tall blir rene tall for pickling)."""
+    return {str(k): float(v) for k, v in sats.items()} if isinstance(sats, dict) else float(sats)
+
+def _sats_tekst(sats, enhet: str, desimaler: int) -> str:
+    def tall(x):
+        return f"{x:.{desimaler}f}".replace(".", ",")
+    if isinstance(sats, dict):
+        return f"timesvektet per tiltak, {tall(min(sats.values()))}–{tall(max(sats.values()))} {enhet}"
+    return f"{tall(sats)} {enhet}"
+
+def rapportdata(tiltak_liste, pris, utslipp_g, prosjekt: str = "", bygg: str = "", livslop: dict = None,
+                dato: str = None) -> dict:
+    """
+    Innholdet i rapporten for ett bygg: oversiktsradene (som i Oversikt-fanen), summene og
+    forutsetningene. Med `livslop` (rente, horisont, prisvekst) kommer nåverdi, internrente
+    og LCOE med.
+    """
+    pris, utslipp_g = _sats(pris), _sats(utslipp_g)
+    rader = oversikt_rader(tiltak_liste, pris, utslipp_g)
+    summer = oversikt_summer(rader)
+    forutsetninger = [("Energipris", _sats_tekst(pris, "kr/kWh", 2)),
+                      ("Utslippsfaktor", _sats_tekst(utslipp_g, "g CO₂/kWh", 0))]
+    if livslop is not None and rader:
+        summer.update(legg_til_livslop(rader, tiltak_liste, pris, **livslop))
+        forutsetninger += [
+            ("Kalkulasjonsrente", f"{livslop.get('rente', 0.04) * 100:.1f} %".replace(".", ",")),
+            ("Analyseperiode", f"{int(livslop.get('horisont', 30))} år"),
+            ("Prisvekst energi", f"{livslop.get('prisvekst', 0.02) * 100:.1f} %/år".replace(".", ",")),
+        ]
+    return {"prosjekt": str(prosjekt), "bygg": str(bygg), "dato": dato or date.today().isoformat(),
+            "rader": rader, "summer": summer, "forutsetninger": forutsetninger}
+
+def _kolonner(rader: list) -> list:
+    return [k for k in KOLONNER if k[0] == KOL_TILTAK or any(k[0] in r for r in rader)]
+
+def _verdi(x):
+    """None/NaN -> None, ellers float."""
+    return None if x is None or x != x else float(x)
+
+def _sumrad(data: dict) -> dict:
+    s = data["summer"]
+    irr = s.get("irr")
+    return {KOL_TILTAK: "Sum", KOL_KWH: s["kWh"], KOL_KR: s["kr"], KOL_CO2: s["co2"], KOL_INV: s["invest"],
+            KOL_PB: s["payback"], KOL_NPV: s.get("npv"), KOL_IRR: None if irr is None else irr * 100.0}
+
+def _tittel(data: dict) -> str:
+    return " – ".join(t for t in (data["prosjekt"], data["bygg"]) if t)
+
+# ===============================
+# Excel (XLSX)
+# ===============================
+_NS = ('xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+       'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"')
+_NS_C = ('xmlns:c="http://schemas.openxmlformats.org/drawingml/2006/chart" '
+         'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+         'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"')
+_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Stilindekser i styles.xml
+_S_TITTEL, _S_HODE, _S_INT, _S_1, _S_2, _S_SUM, _S_SUM_INT, _S_SUM_1, _S_SUM_2 = range(1, 10)
+_STIL = {"tekst": 0, "int": _S_INT, "1": _S_1, "2": _S_2}
+_SUMSTIL = {"tekst": _S_SUM, "int": _S_SUM_INT, "1": _S_SUM_1, "2": _S_SUM_2}
+
+@memo(maxsize=1)
+def _xlsx_maler() -> dict:
+    """Statiske XLSX-deler (del -> bytes), bygget én gang."""
+    innhold = ('<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+               '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+               '<Default Extension="xml" ContentType="application/xml"/>'
+               '<Override PartName="/xl/workbook.xml" '
+               'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+               '<Override PartName="/xl/worksheets/sheet1.xml" '
+               'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+               '<Override PartName="/xl/styles.xml" '
+               'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+               '{diagram}</Types>')
+    diagram = ('<Override PartName="/xl/drawings/drawing1.xml" '
+               'ContentType="application/vnd.openxmlformats-officedocument.drawing+xml"/>'
+               + "".join(f'<Override PartName="/xl/charts/chart{i}.xml" '
+                         'ContentType="application/vnd.openxmlformats-officedocument.drawingml.chart+xml"/>'
+                         for i in (1, 2)))
+    xf = '<xf numFmtId="{}" fontId="{}" fillId="{}" borderId="{}" xfId="0" applyNumberFormat="1" applyFont="1" applyFill="1" applyBorder="1"{}'
+    stiler = [
+        xf.format(0, 0, 0, 0, "/>"),
+        xf.format(0, 2, 0, 0, "/>"),                                                    # tittel
+        xf.format(0, 1, 2, 0, ' applyAlignment="1"><alignment wrapText="1" vertical="center"/></xf>'),  # hode
+        xf.format(3, 0, 0, 0, "/>"), xf.format(164, 0, 0, 0, "/>"), xf.format(165, 0, 0, 0, "/>"),
+        xf.format(0, 1, 0, 1, "/>"), xf.format(3, 1, 0, 1, "/>"), xf.format(164, 1, 0, 1, "/>"),
+        xf.format(165, 1, 0, 1, "/>"),
+    ]
+    styles = (
+        f'<styleSheet {_NS}>'
+        '<numFmts count="2"><numFmt numFmtId="164" formatCode="0.0"/><numFmt numFmtId="165" formatCode="0.00"/></numFmts>'
+        '<fonts count="3"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="14"/><name val="Calibri"/></font></fonts>'
+        '<fills count="3"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill>'
+        '<fill><patternFill patternType="solid"><fgColor rgb="FFDDEBF7"/><bgColor indexed="64"/></patternFill></fill></fills>'
+        '<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border>'
+        '<border><left/><right/><top style="thin"><color auto="1"/></top><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        f'<cellXfs count="{len(stiler)}">{"".join(stiler)}</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>')
+
+    def rels(*maal):
+        return (f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                + "".join(f'<Relationship Id="rId{i}" Type="{t}" Target="{m}"/>' for i, (t, m) in enumerate(maal, 1))
+                + "</Relationships>")
+
+    deler = {
+        "_rels/.rels": rels((f"{_REL}/officeDocument", "xl/workbook.xml")),
+        "xl/workbook.xml": f'<workbook {_NS}><sheets><sheet name="Oversikt" sheetId="1" r:id="rId1"/></sheets></workbook>',
+        "xl/_rels/workbook.xml.rels": rels((f"{_REL}/worksheet", "worksheets/sheet1.xml"),
+                                           (f"{_REL}/styles", "styles.xml")),
+        "xl/styles.xml": styles,
+        "xl/worksheets/_rels/sheet1.xml.rels": rels((f"{_REL}/drawing", "../drawings/drawing1.xml")),
+        "xl/drawings/_rels/drawing1.xml.rels": rels((f"{_REL}/chart", "../charts/chart1.xml"),
+                                                    (f"{_REL}/chart", "../charts/chart2.xml")),
+    }
+    maler = {k: (_XML + v).encode("utf-8") for k, v in deler.items()}
+    maler["innhold"] = (_XML + innhold.format(diagram=diagram)).encode("utf-8")
+    maler["innhold_uten_diagram"] = (_XML + innhold.format(diagram="")).encode("utf-8")
+    return maler
+
+def _hoderad(data: dict) -> int:
+    """Raden med tabelloverskriftene: under tittel, dato og forutsetninger."""
+    return len(data["forutsetninger"]) + 4
+
+def _kol(j: int) -> str:
+    return chr(ord("A") + j)
+
+def _celle(ref: str, verdi, stil: int = 0) -> str:
+    s = f' s="{stil}"' if stil else ""
+    if isinstance(verdi, str):
+        return f'<c r="{ref}" t="inlineStr"{s}><is><t>{escape(verdi)}</t></is></c>'
+    verdi = _verdi(verdi)
+    if verdi is None:
+        return f'<c r="{ref}"{s}/>' if stil else ""
+    return f'<c r="{ref}"{s}><v>{verdi!r}</v></c>'
+
+def _rad(nr: int, celler: list, hoyde: float = None) -> str:
+    ht = f' ht="{hoyde}" customHeight="1"' if hoyde else ""
+    return f'<row r="{nr}"{ht}>{"".join(celler)}</row>'
+
+def _xlsx_ark(data: dict, kolonner: list, diagram: bool) -> str:
+    rader = data["rader"]
+    hode = _hoderad(data)
+    ark = [_rad(1, [_celle("A1", "Tiltaksrapport" + (f" – {_tittel(data)}" if _tittel(data) else ""), _S_TITTEL)]),
+           _rad(2, [_celle("A2", "Dato"), _celle("B2", data["dato"])])]
+    for i, (navn, tekst) in enumerate(data["forutsetninger"], 3):
+        ark.append(_rad(i, [_celle(f"A{i}", navn), _celle(f"B{i}", tekst)]))
+    ark.append(_rad(hode, [_celle(f"{_kol(j)}{hode}", k[0], _S_HODE) for j, k in enumerate(kolonner)], 32))
+    for i, r in enumerate(rader, hode + 1):
+        ark.append(_rad(i, [_celle(f"{_kol(j)}{i}", r.get(k), _STIL[f]) for j, (k, f, _) in enumerate(kolonner)]))
+    nr = hode + len(rader) + 1
+    s = _sumrad(data)
+    ark.append(_rad(nr, [_celle(f"{_kol(j)}{nr}", s.get(k), _SUMSTIL[f]) for j, (k, f, _) in enumerate(kolonner)]))
+    return (f'<worksheet {_NS}>'
+            f'<sheetViews><sheetView workbookViewId="0"><pane ySplit="{hode}" topLeftCell="A{hode + 1}" '
+            'activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>'
+            '<sheetFormatPr defaultRowHeight="15"/>'
+            f'<cols><col min="1" max="1" width="34" customWidth="1"/>'
+            f'<col min="2" max="{len(kolonner)}" width="15" customWidth="1"/></cols>'
+            f'<sheetData>{"".join(ark)}</sheetData>'
+            + ('<drawing r:id="rId1"/>' if diagram else "") + '</worksheet>')
+
+def _xlsx_diagram(tittel: str, kol: str, hode: int, rader: list, verdier: list, format_kode: str) -> str:
+    """Liggende stolpediagram med tiltakene (kolonne A) mot én tallkolonne, med verdiene bufret."""
+    forste, siste = hode + 1, hode + len(rader)
+    navn = "".join(f'<c:pt idx="{i}"><c:v>{escape(r[KOL_TILTAK])}</c:v></c:pt>' for i, r in enumerate(rader))
+    tall = "".join(f'<c:pt idx="{i}"><c:v>{v!r}</c:v></c:pt>' for i, v in enumerate(verdier) if v is not None)
+    return (f'<c:chartSpace {_NS_C}><c:roundedCorners val="0"/><c:chart>'
+            f'<c:title><c:tx><c:rich><a:bodyPr/><a:p><a:pPr><a:defRPr sz="1200" b="1"/></a:pPr>'
+            f'<a:r><a:t>{escape(tittel)}</a:t></a:r></a:p></c:rich></c:tx><c:overlay val="0"/></c:title>'
+            '<c:autoTitleDeleted val="0"/><c:plotArea><c:layout/>'
+            '<c:barChart><c:barDir val="bar"/><c:grouping val="clustered"/><c:varyColors val="0"/>'
+            '<c:ser><c:idx val="0"/><c:order val="0"/>'
+            '<c:spPr><a:solidFill><a:srgbClr val="2E75B6"/></a:solidFill></c:spPr><c:invertIfNegative val="0"/>'
+            f'<c:cat><c:strRef><c:f>Oversikt!$A${forste}:$A${siste}</c:f>'
+            f'<c:strCache><c:ptCount val="{len(rader)}"/>{navn}</c:strCache></c:strRef></c:cat>'
+            f'<c:val><c:numRef><c:f>Oversikt!${kol}${forste}:${kol}${siste}</c:f>'
+            f'<c:numCache><c:formatCode>{format_kode}</c:formatCode><c:ptCount val="{len(rader)}"/>{tall}</c:numCache>'
+            '</c:numRef></c:val></c:ser>'
+            '<c:gapWidth val="60"/><c:axId val="1001"/><c:axId val="1002"/></c:barChart>'
+            '<c:catAx><c:axId val="1001"/><c:scaling><c:orientation val="maxMin"/></c:scaling><c:delete val="0"/>'
+            '<c:axPos val="l"/><c:numFmt formatCode="General" sourceLinked="0"/><c:tickLblPos val="nextTo"/>'
+            '<c:crossAx val="1002"/><c:crosses val="autoZero"/><c:auto val="1"/><c:lblAlgn val="ctr"/>'
+            '<c:lblOffset val="100"/></c:catAx>'
+            '<c:valAx><c:axId val="1002"/><c:scaling><c:orientation val="minMax"/></c:scaling><c:delete val="0"/>'
+            f'<c:axPos val="b"/><c:majorGridlines/><c:numFmt formatCode="{format_kode}" sourceLinked="0"/>'
+            '<c:tickLblPos val="nextTo"/><c:crossAx val="1001"/><c:crosses val="max"/>'
+            '<c:crossBetween val="between"/></c:valAx>'
+            '</c:plotArea><c:plotVisOnly val="1"/></c:chart></c:chartSpace>')
+
+def _xlsx_tegning(rad: int, hoyde: int) -> str:
+    def anker(nr: int, fra: int, til: int) -> str:
+        return ('<xdr:twoCellAnchor>'
+                f'<xdr:from><xdr:col>{fra}</xdr:col><xdr:colOff>0</xdr:colOff><xdr:row>{rad}</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:from>'
+                f'<xdr:to><xdr:col>{til}</xdr:col><xdr:colOff>0</xdr:colOff><xdr:row>{rad + hoyde}</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:to>'
+                f'<xdr:graphicFrame macro=""><xdr:nvGraphicFramePr><xdr:cNvPr id="{nr + 1}" name="Diagram {nr}"/>'
+                '<xdr:cNvGraphicFramePr/></xdr:nvGraphicFramePr>'
+                '<xdr:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/></xdr:xfrm>'
+                '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/chart">'
+                f'<c:chart xmlns:c="http://schemas.openxmlformats.org/drawingml/2006/chart" r:id="rId{nr}"/>'
+                '</a:graphicData></a:graphic></xdr:graphicFrame><xdr:clientData/></xdr:twoCellAnchor>')
+    return ('<xdr:wsDr xmlns:xdr="http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing" '
+            'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+            f'xmlns:r="{_REL}">{anker(1, 0, 3)}{anker(2, 3, 7)}</xdr:wsDr>')
+
+@tidta
+def excel(data: dict) -> bytes:
+    """XLSX med oversiktstabellen, summer, forutsetninger og to diagrammer (energisparing og tilbakebetaling)."""
+    maler = _xlsx_maler()
+    rader = data["rader"]
+    kolonner = _kolonner(rader)
+    diagram = bool(rader)
+    buf = BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+        z.writestr("[Content_Types].xml", maler["innhold"] if diagram else maler["innhold_uten_diagram"])
+        for del_ in ("_rels/.rels", "xl/workbook.xml", "xl/_rels/workbook.xml.rels", "xl/styles.xml"):
+            z.writestr(del_, maler[del_])
+        z.writestr("xl/worksheets/sheet1.xml", _XML + _xlsx_ark(data, kolonner, diagram))
+        if diagram:
+            z.writestr("xl/worksheets/_rels/sheet1.xml.rels", maler["xl/worksheets/_rels/sheet1.xml.rels"])
+            z.writestr("xl/drawings/_rels/drawing1.xml.rels", maler["xl/drawings/_rels/drawing1.xml.rels"])
+            hode = _hoderad(data)
+            z.writestr("xl/drawings/drawing1.xml", _XML + _xlsx_tegning(hode + len(rader) + 2, max(15, 6 + len(rader))))
+            plass = [k for k, _, _ in kolonner]
+            z.writestr("xl/charts/chart1.xml", _XML + _xlsx_diagram(
+                "Energisparing (kWh/år)", _kol(plass.index(KOL_KWH)), hode, rader,
+                [_verdi(r[KOL_KWH]) for r in rader], "#,##0"))
+            z.writestr("xl/charts/chart2.xml", _XML + _xlsx_diagram(
+                "Tilbakebetaling (år)", _kol(plass.index(KOL_PB)), hode, rader,
+                [_verdi(r[KOL_PB]) for r in rader], "0.0"))
+    return buf.getvalue()
+
+# ===============================
+# PDF
+# ===============================
+_A4 = (595.28, 841.89)
+_MARG = 42.0
+_BLAA = "0.180 0.459 0.714"
+_LYSBLAA = "0.867 0.922 0.969"
+_GRAA = "0.45 0.45 0.45"
+_SONE = "0.955 0.955 0.955"
+
+# Tegnbredder (1/1000 em) for ASCII 32–126 i Helvetica og Helvetica-Bold (Adobe AFM)
+_HELVETICA = (
+    "278 278 355 556 556 889 667 191 333 333 389 584 278 333 278 278 556 556 556 556 556 556 556 556 556 556 "
+    "278 278 584 584 584 556 1015 667 667 722 722 667 611 778 722 278 500 667 556 833 722 778 667 778 722 667 "
+    "611 722 667 944 667 667 611 278 278 278 469 556 333 556 556 500 556 556 278 556 556 222 222 500 222 833 "
+    "556 556 556 556 333 500 278 556 500 722 500 500 500 334 260 334 584")
+_HELVETICA_BOLD = (
+    "278 333 474 556 556 889 722 238 333 333 389 584 278 333 278 278 556 556 556 556 556 556 556 556 556 556 "
+    "333 333 584 584 584 611 975 722 722 722 722 667 611 778 722 278 556 722 611 833 722 778 667 778 722 667 "
+    "611 722 667 944 667 667 611 333 278 333 584 556 333 556 611 556 611 556 333 611 611 278 278 556 278 889 "
+    "611 611 611 611 389 556 333 611 556 778 556 556 500 389 280 389 584")
+# Utvalgte tegn utenfor ASCII (WinAnsi): vanlig, fet
+_EKSTRA = {"æ": (889, 889), "ø": (611, 611), "å": (556, 556), "Æ": (1000, 1000), "Ø": (778, 778), "Å": (667, 722),
+           "é": (556, 556), "ö": (556, 611), "ä": (556, 556), "ü": (556, 611), "–": (556, 556), "…": (1000, 1000),
+           "·": (278, 278), "°": (400, 400)}
+_ERSTATT = str.maketrans({"₂": "2", "≈": "~", "−": "-", "²": "2", "³": "3"})
+
+@memo(maxsize=1)
+def _pdf_fonter() -> tuple:
+    """Fontobjektene og breddetabellene (256 tegn per font, WinAnsi), bygget én gang."""
+    bredder = []
+    for nr, tabell in enumerate((_HELVETICA, _HELVETICA_BOLD)):
+        b = [556] * 256
+        for i, w in enumerate(tabell.split()):
+            b[32 + i] = int(w)
+        for tegn, w in _EKSTRA.items():
+            b[tegn.encode("cp1252")[0]] = w[nr]
+        bredder.append(tuple(b))
+    objekter = tuple(f"<< /Type /Font /Subtype /Type1 /BaseFont /{navn} /Encoding /WinAnsiEncoding >>".encode("ascii")
+                     for navn in ("Helvetica", "Helvetica-Bold"))
+    return objekter, {"F1": bredder[0], "F2": bredder[1]}
+
+def _pdf_bytes(tekst: str) -> bytes:
+    return str(tekst).translate(_ERSTATT).encode("cp1252", errors="replace")
+
+class _Pdf:
+    """Enkel sidebeskriver: tekst, rektangler og linjer i PDF-operatorer (origo nede til venstre)."""
+
+    def __init__(self):
+        self.bredder = _pdf_fonter()[1]
+        self.sider = []
+        self.ny_side()
+
+    def ny_side(self):
+        self.ops = []
+        self.sider.append(self.ops)
+        self.y = _A4[1] - _MARG
+
+    def bredde(self, tekst: str, font: str = "F1", storrelse: float = 9.0) -> float:
+        b = self.bredder[font]
+        return sum(b[c] for c in _pdf_bytes(tekst)) * storrelse / 1000.0
+
+    def kutt(self, tekst: str, maks: float, font: str = "F1", storrelse: float = 9.0) -> str:
+        """Korter teksten med … til den får plass i `maks` punkter."""
+        if self.bredde(tekst, font, storrelse) <= maks:
+            return tekst
+        while tekst and self.bredde(tekst + "…", font, storrelse) > maks:
+            tekst = tekst[:-1]
+        return tekst.rstrip() + "…"
+
+    def tekst(self, x: float, y: float, tekst: str, font: str = "F1", storrelse: float = 9.0,
+              farge: str = "0.1 0.1 0.1", hoyre: bool = False):
+        if hoyre:
+            x -= self.bredde(tekst, font, storrelse)
+        s = _pdf_bytes(tekst).replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)").decode("latin-1")
+        self.ops.append(f"BT {farge} rg /{font} {storrelse:g} Tf {x:.2f} {y:.2f} Td ({s}) Tj ET")
+
+    def rekt(self, x: float, y: float, b: float, h: float, farge: str):
+        self.ops.append(f"{farge} rg {x:.2f} {y:.2f} {b:.2f} {h:.2f} re f")
+
+    def linje(self, x1: float, y1: float, x2: float, y2: float, farge: str = "0.3 0.3 0.3", tykkelse: float = 0.5):
+        self.ops.append(f"{farge} RG {tykkelse:g} w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S")
+
+    def plass(self, hoyde: float):
+        """Ny side hvis det ikke er `hoyde` punkter igjen over bunnmargen."""
+        if self.y - hoyde < _MARG + 20:
+            self.ny_side()
+
+    def bytes(self, tittel: str, bunntekst: str) -> bytes:
+        fonter = _pdf_fonter()[0]
+        n = len(self.sider)
+        for i, ops in enumerate(self.sider, 1):
+            self.ops = ops
+            self.tekst(_MARG, 26, bunntekst, storrelse=7, farge=_GRAA)
+            self.tekst(_A4[0] - _MARG, 26, f"Side {i} av {n}", storrelse=7, farge=_GRAA, hoyre=True)
+        tittel = _pdf_bytes(tittel).replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+        objekter = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            ("<< /Type /Pages /Kids [" + " ".join(f"{6 + 2 * i} 0 R" for i in range(n)) + f"] /Count {n} >>").encode("ascii"),
+            fonter[0], fonter[1],
+            b"<< /Title (" + tittel + b") /Producer (Energitiltak) /CreationDate (D:"
+            + datetime.now().strftime("%Y%m%d%H%M%S").encode("ascii") + b") >>",
+        ]
+        for i, ops in enumerate(self.sider):
+            strom = zlib.compress("\n".join(ops).encode("latin-1"), 6)
+            objekter.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_A4[0]} {_A4[1]}] "
+                            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {7 + 2 * i} 0 R >>".encode("ascii"))
+            objekter.append(f"<< /Length {len(strom)} /Filter /FlateDecode >>\nstream\n".encode("ascii")
+                            + strom + b"\nendstream")
+        ut = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        posisjoner = []
+        for nr, obj in enumerate(objekter, 1):
+            posisjoner.append(len(ut))
+            ut += f"{nr} 0 obj\n".encode("ascii") + obj + b"\nendobj\n"
+        xref = len(ut)
+        ut += f"xref\n0 {len(objekter) + 1}\n0000000000 65535 f \n".encode("ascii")
+        ut += "".join(f"{p:010d} 00000 n \n" for p in posisjoner).encode("ascii")
+        ut += (f"trailer\n<< /Size {len(objekter) + 1} /Root 1 0 R /Info 5 0 R >>\n"
+               f"startxref\n{xref}\n%%EOF\n").encode("ascii")
+        return bytes(ut)
+
+# Kolonnebredder (pt) for tallkolonnene i PDF-tabellen; tiltaksnavnet får resten
+_PDF_BREDDE = {KOL_KWH: 52, KOL_KR: 50, KOL_CO2: 52, KOL_INV: 54, KOL_PB: 40, KOL_NPV: 54, KOL_IRR: 40, KOL_LCOE: 40}
+_PDF_FORMAT = {"tekst": str, "int": fmt_int, "1": years_1, "2": kr_2}
+
+def _pdf_tabell(side: _Pdf, data: dict, kolonner: list):
+    bredde = _A4[0] - 2 * _MARG
+    b = [bredde - sum(_PDF_BREDDE[k] for k, _, _ in kolonner[1:])] + [_PDF_BREDDE[k] for k, _, _ in kolonner[1:]]
+    x = [_MARG]
+    for w in b:
+        x.append(x[-1] + w)
+
+    def hode():
+        side.plass(24 + 13)
+        side.rekt(_MARG, side.y - 22, bredde, 22, _BLAA)
+        for j, (_, _, (l1, l2)) in enumerate(kolonner):
+            if j == 0:
+                side.tekst(x[0] + 4, side.y - 14, l1, "F2", 7.5, "1 1 1")
+            else:
+                side.tekst(x[j + 1] - 4, side.y - 10, l1, "F2", 7, "1 1 1", hoyre=True)
+                side.tekst(x[j + 1] - 4, side.y - 18, l2, "F1", 7, "1 1 1", hoyre=True)
+        side.y -= 22
+
+    def rad(r: dict, fet: bool, sone: bool):
+        font = "F2" if fet else "F1"
+        if sone:
+            side.rekt(_MARG, side.y - 13, bredde, 13, _SONE)
+        side.tekst(x[0] + 4, side.y - 9.5, side.kutt(str(r[KOL_TILTAK]), b[0] - 8, font, 8), font, 8)
+        for j, (k, f, _) in enumerate(kolonner[1:], 1):
+            v = r.get(k)
+            tekst = "" if v is None and f == "2" and fet else _PDF_FORMAT[f](v)
+            side.tekst(x[j + 1] - 4, side.y - 9.5, tekst, font, 8, hoyre=True)
+        side.y -= 13
+
+    hode()
+    for i, r in enumerate(data["rader"]):
+        if side.y - 13 < _MARG + 20:
+            side.ny_side()
+            hode()
+        rad(r, False, i % 2 == 1)
+    side.plass(14)
+    side.linje(_MARG, side.y, _MARG + bredde, side.y, tykkelse=0.8)
+    rad(_sumrad(data), True, False)
+
+def _pdf_diagram(side: _Pdf, x0: float, y0: float, bredde: float, tittel: str, punkter: list, fmt) -> float:
+    """Liggende stolpediagram med (navn, verdi) fra y0 og nedover; gir høyden som ble brukt."""
+    side.tekst(x0, y0 - 10, tittel, "F2", 9)
+    etikett = min(110.0, bredde * 0.42)
+    tall = 44.0
+    maks = max((v for _, v in punkter if v is not None and v > 0), default=0.0)
+    y = y0 - 20
+    side.linje(x0 + etikett, y, x0 + etikett, y - 14 * len(punkter), _GRAA, 0.5)
+    for navn, v in punkter:
+        side.tekst(x0, y - 10, side.kutt(navn, etikett - 6, "F1", 7), "F1", 7)
+        if v is not None and v > 0 and maks > 0:
+            lengde = (bredde - etikett - tall) * v / maks
+            side.rekt(x0 + etikett, y - 11.5, lengde, 9, _BLAA)
+        else:
+            lengde = 0.0
+        side.tekst(x0 + etikett + lengde + 3, y - 10, fmt(v), "F1", 7, _GRAA)
+        y -= 14
+    return y0 - y + 6
+
+def _diagrampunkter(rader: list, kol: str, synkende: bool) -> tuple:
+    punkter = [(r[KOL_TILTAK], _verdi(r.get(kol))) for r in rader]
+    punkter.sort(key=lambda p: (p[1] is None, -(p[1] or 0.0) if synkende else (p[1] or 0.0)))
+    return punkter[:MAKS_STOLPER], len(punkter) > MAKS_STOLPER
+
+@tidta
+def pdf(data: dict) -> bytes:
+    """PDF med nøkkeltall, oversiktstabellen og stolpediagram for energisparing og tilbakebetaling."""
+    side = _Pdf()
+    bredde = _A4[0] - 2 * _MARG
+    s = data["summer"]
+
+    side.tekst(_MARG, side.y - 18, "Tiltaksrapport", "F2", 20)
+    side.y -= 36
+    if _tittel(data):
+        side.tekst(_MARG, side.y, _tittel(data), "F1", 12)
+        side.y -= 15
+    linje = " · ".join([f"Dato: {data['dato']}"] + [f"{n}: {t}" for n, t in data["forutsetninger"]])
+    for del_ in _bryt(side, linje, bredde, 8):
+        side.tekst(_MARG, side.y, del_, "F1", 8, _GRAA)
+        side.y -= 11
+    side.y -= 8
+
+    # Nøkkeltall
+    tall = [("Energisparing", fmt_int(s["kWh"]) + " kWh/år"), ("Besparelse", fmt_int(s["kr"]) + " kr/år"),
+            ("CO₂-reduksjon", fmt_int(s["co2"]) + " kg/år"), ("Investering", fmt_int(s["invest"]) + " kr")]
+    boks = (bredde - 3 * 8) / 4
+    for i, (navn, verdi) in enumerate(tall):
+        x = _MARG + i * (boks + 8)
+        side.rekt(x, side.y - 40, boks, 40, _LYSBLAA)
+        side.tekst(x + 8, side.y - 13, navn, "F1", 8, _GRAA)
+        side.tekst(x + 8, side.y - 31, side.kutt(verdi, boks - 12, "F2", 12), "F2", 12)
+    side.y -= 54
+    pb = "–" if s["payback"] is None else f"{years_1(s['payback'])} år"
+    linje = f"Samlet tilbakebetaling (enkel): {pb}"
+    if "npv" in s:
+        linje += f" · Sum nåverdi: {fmt_int(s['npv'])} kr · Internrente pakke: " \
+                 + ("–" if s.get("irr") is None else f"{years_1(s['irr'] * 100)} %")
+    side.tekst(_MARG, side.y, linje, "F1", 9)
+    side.y -= 20
+
+    if not data["rader"]:
+        side.tekst(_MARG, side.y, "Ingen tiltak i pakken.", "F1", 10)
+    else:
+        _pdf_tabell(side, data, _kolonner(data["rader"]))
+        side.y -= 22
+        kwh, flere = _diagrampunkter(data["rader"], KOL_KWH, True)
+        pb_punkter, _ = _diagrampunkter(data["rader"], KOL_PB, False)
+        side.plass(20 + 14 * len(kwh) + 6)
+        halv = (bredde - 20) / 2
+        h1 = _pdf_diagram(side, _MARG, side.y, halv, "Energisparing (kWh/år)"
+                          + (f" – {MAKS_STOLPER} største" if flere else ""), kwh, fmt_int)
+        h2 = _pdf_diagram(side, _MARG + halv + 20, side.y, halv, "Tilbakebetaling (år)"
+                          + (f" – {MAKS_STOLPER} korteste" if flere else ""), pb_punkter, years_1)
+        side.y -= max(h1, h2)
+    return side.bytes("Tiltaksrapport" + (f" – {_tittel(data)}" if _tittel(data) else ""),
+                      f"Energitiltak · {_tittel(data) or 'tiltaksrapport'} · {data['dato']}")
+
+def _bryt(side: _Pdf, tekst: str, maks: float, storrelse: float) -> list:
+    """Deler teksten på ' · ' i linjer som får plass i `maks` punkter."""
+    linjer, naa = [], ""
+    for del_ in tekst.split(" · "):
+        forsok = f"{naa} · {del_}" if naa else del_
+        if naa and side.bredde(forsok, "F1", storrelse) > maks:
+            linjer.append(naa)
+            naa = del_
+        else:
+            naa = forsok
+    return linjer + [naa]
+
+LAG = {"pdf": pdf, "xlsx": excel}
+MIME = {"pdf": "application/pdf", "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "zip": "application/zip"}
+
+def lag(data: dict, fmt: str) -> bytes:
+    """Rapporten i formatet `fmt` ("pdf" eller "xlsx")."""
+    if fmt not in LAG:
+        raise ValueError(f"Ukjent rapportformat: {fmt!r} (bruk {', '.join(FORMATER)})")
+    return LAG[fmt](data)
+
+def filnavn(navn: str, fmt: str) -> str:
+    """Trygt filnavn (bokstaver, tall, mellomrom, - og _) med endelse."""
+    return (re.sub(r"[^\w\- ]+", "_", str(navn)).strip(" _") or "rapport") + "." + fmt
+
+# ===============================
+# Bakgrunn og bulk
+# ===============================
+_UTFORER = None
+_UTFORER_LAAS = threading.Lock()
+
+def start(fn, *args, **kwargs):
+    """
+    Kjører `fn` (f.eks. lag eller bulk) i en bakgrunnstråd og gir en Future. Tråden deles
+    mellom øktene; to arbeidere, så én stor bulkjobb ikke holder igjen enkeltrapporter.
+    """
+    global _UTFORER
+    with _UTFORER_LAAS:
+        if _UTFORER is None:
+            _UTFORER = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rapport")
+    return _UTFORER.submit(fn, *args, **kwargs)
+
+def _lag_bit(args) -> list:
+    prosjekt, bygg, pris, utslipp_g, livslop, formater, dato = args
+    ut = []
+    for navn, tiltak in bygg:
+        data = rapportdata(tiltak, pris, utslipp_g, prosjekt, navn, livslop, dato)
+        ut += [(navn, fmt, LAG[fmt](data)) for fmt in formater]
+    return ut
+
+@tidta
+def bulk(lager, prosjekt: str, pris, utslipp_g, formater=("pdf",), livslop: dict = None, bygg: list = None,
+         prosesser: int = None, fremdrift=None) -> bytes:
+    """
+    Rapporter for alle bygg i prosjektet (eller bare `bygg`) fra Prosjektlager, som én zip
+    med én fil per bygg og format. Byggene deles i biter på BIT bygg som fordeles på en
+    prosesspool; `prosesser=None` velger pool automatisk fra POOL_FRA bygg. `fremdrift`
+    kalles med (ferdige bygg, antall bygg) etter hver bit.
+    """
+    for fmt in formater:
+        if fmt not in LAG:
+            raise ValueError(f"Ukjent rapportformat: {fmt!r} (bruk {', '.join(FORMATER)})")
+    per_bygg = {}
+    for b, rad in lager.last_portefolje(prosjekt):
+        per_bygg.setdefault(b, []).append(rad)
+    if bygg is not None:
+        per_bygg = {b: per_bygg[b] for b in bygg if b in per_bygg}
+    alle = list(per_bygg.items())
+    pris, utslipp_g = _sats(pris), _sats(utslipp_g)
+    dato = date.today().isoformat()
+    jobber = [(prosjekt, alle[i:i + BIT], pris, utslipp_g, livslop, tuple(formater), dato)
+              for i in range(0, len(alle), BIT)]
+
+    if prosesser is None:
+        prosesser = min(os.cpu_count() or 1, len(jobber)) if len(alle) >= POOL_FRA else 1
+    buf = BytesIO()
+    brukt = set()
+    ferdig = 0
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as z:
+        def skriv(jobb, deler):
+            nonlocal ferdig
+            for navn, fmt, innhold in deler:
+                fil = filnavn(navn, fmt)
+                nr = 2
+                while fil in brukt:
+                    fil = filnavn(f"{navn} ({nr})", fmt)
+                    nr += 1
+                brukt.add(fil)
+                z.writestr(fil, innhold)
+            ferdig += len(jobb[1])
+            if fremdrift is not None:
+                fremdrift(ferdig, len(alle))
+
+        if prosesser > 1 and len(jobber) > 1:
+            # forkserver: bulk kjøres ofte fra en tråd (appen), og fork kan da arve en låst lås (LRUCache)
+            with ProcessPoolExecutor(max_workers=prosesser, mp_context=multiprocessing.get_context("forkserver")) as pool:
+                for jobb, deler in zip(jobber, pool.map(_lag_bit, jobber)):
+                    skriv(jobb, deler)
+        else:
+            for jobb in jobber:
+                skriv(jobb, _lag_bit(jobb))
+    return buf.getvalue()
+
+def main(argv=None) -> int:
+    from .lager import STANDARD_STI, Prosjektlager
+
+    ap = argparse.ArgumentParser(prog="python -m energitiltak.rapport", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--prosjekt", required=True, help="Prosjektet i databasen")
+    ap.add_argument("--ut", required=True, help="Zip-fil med én rapport per bygg og format")
+    ap.add_argument("--db", default=STANDARD_STI, help=f"SQLite-databasen (standard {STANDARD_STI})")
+    ap.add_argument("--format", default="pdf", help="Kommaseparert: pdf, xlsx (standard pdf)")
+    ap.add_argument("--bygg", action="append", help="Bare disse byggene (kan gjentas)")
+    ap.add_argument("--pris", type=float, default=1.25, help="Energipris (kr/kWh), standard 1.25")
+    ap.add_argument("--utslipp", type=float, default=20.0, help="Utslippsfaktor (g CO₂/kWh), standard 20")
+    ap.add_argument("--livslop", action="store_true", help="Ta med nåverdi, internrente og LCOE (4 %%, 30 år, 2 %%/år)")
+    ap.add_argument("--prosesser", type=int, help="Antall prosesser (standard: automatisk)")
+    args = ap.parse_args(argv)
+
+    formater = [f.strip().lower() for f in args.format.split(",") if f.strip()]
+    t0 = time.perf_counter()
+    lager = Prosjektlager(args.db)
+    try:
+        innhold = bulk(lager, args.prosjekt, args.pris, args.utslipp, formater,
+                       {"rente": 0.04, "horisont": 30, "prisvekst": 0.02} if args.livslop else None,
+                       args.bygg, args.prosesser)
+    except ValueError as e:
+        print(f"Feil: {e}", file=sys.stderr)
+        return 2
+    finally:
+        lager.lukk()
+    with open(args.ut, "wb") as f:
+        f.write(innhold)
+    with zipfile.ZipFile(BytesIO(innhold)) as z:
+        antall = len(z.namelist())
+    print(f"{antall} rapporter på {time.perf_counter() - t0:.2f} s -> {args.ut}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
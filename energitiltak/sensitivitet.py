@@ -0,0 +1,172 @@
+"""
+Sensitivitetsanalyse og scenario-sveip for ett tiltak.
+
+Et tiltak beskrives med et basis-sett input (kolonnenavnene i TILTAK_BATCH, pluss
+'pris', 'utslipp_g' og eventuelt 'invest' eller satsene i STANDARD_SATSER). Hver
+input kan varieres med en fordeling:
+
+    ("uniform", lav, høy)          ("normal", snitt, std)
+    ("triang", lav, modus, høy)    ("område", lav, høy, antall)   ("verdier", [v1, v2, ...])
+
+De to siste brukes for fullt rutenett (`rutenett`), de tre første for Monte Carlo
+(`monte_carlo`). Evalueringen er vektorisert, og store utvalg deles i biter som
+fordeles på en prosesspool.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .batch import STANDARD_SATSER, TILTAK_BATCH, nok_og_co2_batch, payback_years_batch, standard_invest_batch
+from .maaling import tidta
+
+BIT = 250_000            # prøver per bit i Monte Carlo
+POOL_FRA = 2_000_000     # bruk prosesspool fra dette antallet prøver (under er én kjerne raskest)
+
+def parametre(tiltak_id: str) -> list:
+    """Alle input som kan varieres for et tiltak."""
+    return list(TILTAK_BATCH[tiltak_id][1]) + ["pris", "utslipp_g", "invest"] + list(STANDARD_SATSER[tiltak_id])
+
+def evaluer(tiltak_id: str, verdier: dict) -> dict:
+    """
+    Vektorisert evaluering. `verdier` har alle input for tiltaket (skalarer eller
+    arrays med samme lengde) samt 'pris' og 'utslipp_g'. Mangler 'invest' brukes
+    standardinvestering. Gir arrays for kWh, kr_aar, co2_kg, invest og payback.
+    """
+    fn, kolonner = TILTAK_BATCH[tiltak_id]
+    kWh = fn(*(verdier[k] for k in kolonner))
+    kr_aar, co2_kg = nok_og_co2_batch(kWh, verdier["pris"], verdier["utslipp_g"])
+    if verdier.get("invest") is not None:
+        invest = np.asarray(verdier["invest"], dtype=float)
+    else:
+        invest = standard_invest_batch(tiltak_id, verdier)
+    kWh, kr_aar, co2_kg, invest = np.broadcast_arrays(kWh, kr_aar, co2_kg, invest)
+    return {"kWh": kWh, "kr_aar": kr_aar, "co2_kg": co2_kg, "invest": invest,
+            "payback": payback_years_batch(invest, kr_aar)}
+
+# ===============================
+# Fordelinger
+# ===============================
+def _sjekk(navn: str, fordeling):
+    if not isinstance(fordeling, (tuple, list)) or not fordeling:
+        raise ValueError(f"Ugyldig fordeling for {navn!r}: {fordeling!r}")
+    if fordeling[0] not in ("uniform", "normal", "triang", "område", "verdier"):
+        raise ValueError(f"Ukjent fordelingstype for {navn!r}: {fordeling[0]!r}")
+
+def trekk(fordeling, n: int, rng: np.random.Generator) -> np.ndarray:
+    typ, *p = fordeling
+    if typ == "uniform":
+        return rng.uniform(p[0], p[1], n)
+    if typ == "normal":
+        return rng.normal(p[0], p[1], n)
+    if typ == "triang":
+        return rng.triangular(p[0], p[1], p[2], n)
+    if typ == "område":
+        return rng.uniform(p[0], p[1], n)
+    if typ == "verdier":
+        return rng.choice(np.asarray(p[0], dtype=float), n)
+    raise ValueError(f"Ukjent fordelingstype: {typ!r}")
+
+def ytterpunkter(fordeling) -> tuple:
+    """Lav/høy verdi for tornado: P10/P90 for fordelinger, min/maks for områder og lister."""
+    typ, *p = fordeling
+    if typ == "uniform":
+        return p[0] + 0.1 * (p[1] - p[0]), p[0] + 0.9 * (p[1] - p[0])
+    if typ == "normal":
+        return p[0] - 1.2816 * p[1], p[0] + 1.2816 * p[1]
+    if typ == "triang":
+        q = np.quantile(trekk(fordeling, 20_001, np.random.default_rng(0)), [0.1, 0.9])
+        return float(q[0]), float(q[1])
+    if typ == "område":
+        return p[0], p[1]
+    return float(min(p[0])), float(max(p[0]))
+
+def _rutenettakse(navn: str, fordeling) -> np.ndarray:
+    typ, *p = fordeling
+    if typ == "område":
+        return np.linspace(p[0], p[1], int(p[2]))
+    if typ == "verdier":
+        return np.asarray(p[0], dtype=float)
+    raise ValueError(f"{navn!r}: rutenett krever 'område' eller 'verdier', ikke {typ!r}")
+
+# ===============================
+# Rutenett og Monte Carlo
+# ===============================
+def rutenett(tiltak_id: str, basis: dict, fordelinger: dict) -> pd.DataFrame:
+    """Evaluerer alle kombinasjoner av variable input. Én rad per kombinasjon."""
+    for navn, f in fordelinger.items():
+        _sjekk(navn, f)
+    navn = list(fordelinger)
+    akser = np.meshgrid(*(_rutenettakse(k, fordelinger[k]) for k in navn), indexing="ij")
+    verdier = dict(basis)
+    verdier.update({k: a.ravel() for k, a in zip(navn, akser)})
+    res = evaluer(tiltak_id, verdier)
+    df = pd.DataFrame({k: verdier[k] for k in navn})
+    for k, v in res.items():
+        df[k] = v
+    return df
+
+def _mc_bit(args) -> dict:
+    tiltak_id, basis, fordelinger, n, seed = args
+    rng = np.random.default_rng(seed)
+    verdier = dict(basis)
+    for k, f in fordelinger.items():
+        verdier[k] = trekk(f, n, rng)
+    res = evaluer(tiltak_id, verdier)
+    return {"kWh": res["kWh"], "payback": res["payback"]}
+
+@tidta
+def monte_carlo(tiltak_id: str, basis: dict, fordelinger: dict, n: int = 100_000,
+                seed: int = None, prosesser: int = None) -> dict:
+    """
+    Monte Carlo over fordelingene. Utvalget deles i biter på BIT prøver med egne
+    frø (SeedSequence.spawn), så resultatet er reproduserbart uavhengig av antall
+    prosesser. `prosesser=None` velger prosesspool automatisk for store utvalg.
+    Gir kWh- og payback-arrays (NaN = ingen besparelse).
+    """
+    for k, f in fordelinger.items():
+        _sjekk(k, f)
+    n = int(n)
+    if n < 1:
+        raise ValueError(f"Monte Carlo krever minst én prøve, fikk n={n}")
+    storrelser = [BIT] * (n // BIT) + ([n % BIT] if n % BIT else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(storrelser))
+    jobber = [(tiltak_id, basis, fordelinger, m, s) for m, s in zip(storrelser, seeds)]
+
+    if prosesser is None:
+        prosesser = min(os.cpu_count() or 1, len(jobber)) if n >= POOL_FRA else 1
+    if prosesser > 1 and len(jobber) > 1:
+        # forkserver, ikke fork: kalles fra appens tråder, der fork kan arve en låst lås
+        with ProcessPoolExecutor(max_workers=prosesser, mp_context=multiprocessing.get_context("forkserver")) as pool:
+            deler = list(pool.map(_mc_bit, jobber))
+    else:
+        deler = [_mc_bit(j) for j in jobber]
+
+    return {k: np.concatenate([d[k] for d in deler]) for k in ("kWh", "payback")}
+
+def persentiler(payback: np.ndarray, p=(10, 50, 90)) -> dict:
+    """P10/P50/P90 for payback; utfall uten besparelse regnes som uendelig lang payback."""
+    pb = np.where(np.isnan(payback), np.inf, payback)
+    return {f"P{q}": float(np.percentile(pb, q)) for q in p}
+
+@tidta
+def tornado(tiltak_id: str, basis: dict, fordelinger: dict, utfall: str = "payback") -> pd.DataFrame:
+    """
+    Én-og-én-variasjon: hver input settes til lav/høy verdi mens resten holdes på basis.
+    Sortert med største utslag øverst.
+    """
+    ref = float(evaluer(tiltak_id, basis)[utfall])
+    rader = []
+    for navn, f in fordelinger.items():
+        _sjekk(navn, f)
+        lav, hoy = ytterpunkter(f)
+        verdier = dict(basis)
+        verdier[navn] = np.array([lav, hoy])
+        res = evaluer(tiltak_id, verdier)[utfall]
+        rader.append({"parameter": navn, "lav": lav, "høy": hoy,
+                      "utfall_lav": float(res[0]), "utfall_høy": float(res[1]), "basis": ref})
+    df = pd.DataFrame(rader, columns=["parameter", "lav", "høy", "utfall_lav", "utfall_høy", "basis"])
+    df["utslag"] = (df["utfall_høy"] - df["utfall_lav"]).abs()
+    return df.sort_values("utslag", ascending=False, na_position="last").reset_index(drop=True)
@@ -0,0 +1,203 @@
+"""
+Timesmodell (8760 h) for solceller med egenforbruk og eksport.
+
+Innstrålingen (global horisontal, eventuelt også diffus) legges over på hvert takfelt med
+helning og asimut (isotrop himmelmodell), og produksjonen matches time for time mot
+byggets lastprofil. Det som brukes i bygget gir spart innkjøp; resten eksporteres til
+en egen pris.
+
+Solposisjonen for et sted regnes én gang og caches, og profilen per kWp caches per takfelt
+(sted, innstråling, helning, asimut). Nye takfelt beregnes samlet i én vektorisert
+operasjon over (felt, 8760); felt som allerede er beregnet hentes fra cache.
+"""
+import numpy as np
+
+from .beregning import HOURS_YEAR
+from .cache import LRUCache, memo, normaliser
+from . import timesimulering as ts
+
+SOLKONSTANT = 1367.0     # W/m²
+ALBEDO = 0.2             # bakkerefleksjon
+YTELSESFAKTOR = 0.85     # systemtap (inverter, temperatur, kabler, smuss)
+STED_STANDARD = (59.9, 10.8)   # Oslo
+# Andel av klarværsinnstråling som brukes når ingen innstrålingsfil er lastet opp
+# (gir omtrent 900 kWh/kWp for sørvendt tak med 35° helning på Østlandet)
+KLARHET_STANDARD = 0.55
+COS_Z_MIN = 0.087        # solhøyde ~5°: grense for direktestrålingsforholdet
+
+# ===============================
+# Solposisjon
+# ===============================
+@memo(maxsize=32)
+def solposisjon(breddegrad: float, lengdegrad: float, tidssone: float = 1.0) -> tuple:
+    """
+    (cos_z, asimut, G0) for midten av hver time i normaltid: cosinus til senitvinkelen
+    (negativ når sola er under horisonten), solas asimut i radianer (sør = π) og
+    ekstraterrestrisk innstråling på horisontalflate (W/m²).
+    """
+    h = np.arange(HOURS_YEAR)
+    dag = h // 24 + 1
+    B = 2.0 * np.pi * (dag - 1) / 365.0
+    dekl = (0.006918 - 0.399912 * np.cos(B) + 0.070257 * np.sin(B) - 0.006758 * np.cos(2 * B)
+            + 0.000907 * np.sin(2 * B) - 0.002697 * np.cos(3 * B) + 0.00148 * np.sin(3 * B))
+    tidslikning = 229.18 * (0.000075 + 0.001868 * np.cos(B) - 0.032077 * np.sin(B)
+                            - 0.014615 * np.cos(2 * B) - 0.04089 * np.sin(2 * B))
+    soltid = (h % 24) + 0.5 + tidslikning / 60.0 + (float(lengdegrad) - 15.0 * float(tidssone)) / 15.0
+    omega = np.radians(15.0 * (soltid - 12.0))
+    phi = np.radians(float(breddegrad))
+
+    cos_z = np.sin(phi) * np.sin(dekl) + np.cos(phi) * np.cos(dekl) * np.cos(omega)
+    asimut = np.arctan2(np.sin(omega), np.cos(omega) * np.sin(phi) - np.tan(dekl) * np.cos(phi)) + np.pi
+    G0 = SOLKONSTANT * (1.0 + 0.033 * np.cos(2.0 * np.pi * dag / 365.0)) * np.maximum(cos_z, 0.0)
+    for a in (cos_z, asimut, G0):
+        a.setflags(write=False)
+    return cos_z, asimut, G0
+
+def klarvaer(breddegrad: float, lengdegrad: float, klarhet: float = KLARHET_STANDARD) -> tuple:
+    """
+    (ghi, dhi) i W/m² fra klarværsmodellen til Haurwitz, delt med Erbs' korrelasjon og
+    deretter skalert med `klarhet`. Grovt anslag når målt innstråling mangler.
+    """
+    cos_z = solposisjon(breddegrad, lengdegrad)[0]
+    cz = np.maximum(cos_z, 1e-6)
+    ghi = np.where(cos_z > 0, 1098.0 * cz * np.exp(-0.057 / cz), 0.0)
+    _, dhi = _dekomponer(breddegrad, lengdegrad, ghi)
+    return float(klarhet) * ghi, float(klarhet) * dhi
+
+@memo(maxsize=32)
+def _dekomponer(breddegrad: float, lengdegrad: float, ghi: np.ndarray, dhi=None) -> tuple:
+    """(direkte horisontal, diffus) i W/m². Uten målt diffus brukes Erbs' korrelasjon."""
+    cos_z, _, G0 = solposisjon(breddegrad, lengdegrad)
+    ghi = np.maximum(np.asarray(ghi, dtype=float), 0.0)
+    ghi = np.where(cos_z > 0, ghi, 0.0)
+    if dhi is None:
+        kt = np.clip(ghi / np.where(G0 > 0, G0, np.inf), 0.0, 1.0)
+        andel = np.where(kt <= 0.22, 1.0 - 0.09 * kt,
+                         np.where(kt <= 0.80, 0.9511 - 0.1604 * kt + 4.388 * kt ** 2 - 16.638 * kt ** 3 + 12.336 * kt ** 4,
+                                  0.165))
+        dhi = ghi * andel
+    else:
+        dhi = np.minimum(np.maximum(np.asarray(dhi, dtype=float), 0.0), ghi)
+    direkte = ghi - dhi
+    for a in (direkte, dhi):
+        a.setflags(write=False)
+    return direkte, dhi
+
+# ===============================
+# Takfelt
+# ===============================
+def innstraling_skraa(breddegrad: float, lengdegrad: float, ghi, helning, asimut, dhi=None,
+                      albedo: float = ALBEDO) -> np.ndarray:
+    """
+    Innstråling i modulplanet (W/m²), form (felt, 8760). `helning` og `asimut` er grader
+    (asimut fra nord med klokka, sør = 180) som skalar eller array med én verdi per takfelt.
+    """
+    cos_z, sol_az, _ = solposisjon(breddegrad, lengdegrad)
+    direkte, diffus = _dekomponer(breddegrad, lengdegrad, np.asarray(ghi, dtype=float), dhi)
+    beta = np.radians(np.atleast_1d(np.asarray(helning, dtype=float)))[:, None]
+    gamma = np.radians(np.atleast_1d(np.asarray(asimut, dtype=float)))[:, None]
+
+    sin_z = np.sqrt(np.maximum(1.0 - cos_z ** 2, 0.0))
+    cos_inn = cos_z * np.cos(beta) + sin_z * np.sin(beta) * np.cos(sol_az - gamma)
+    rb = np.where(cos_z > 0, np.maximum(cos_inn, 0.0) / np.maximum(cos_z, COS_Z_MIN), 0.0)
+    ghi_h = direkte + diffus
+    return direkte * rb + diffus * (1.0 + np.cos(beta)) / 2.0 + ghi_h * float(albedo) * (1.0 - np.cos(beta)) / 2.0
+
+_PROFILER = LRUCache(maxsize=512)
+
+def feltprofiler(breddegrad: float, lengdegrad: float, ghi, helning, asimut, dhi=None,
+                 albedo: float = ALBEDO) -> np.ndarray:
+    """
+    Innstråling i modulplanet per takfelt (W/m² = Wh/m² per time), form (felt, 8760).
+    Hvert felt caches på (sted, innstråling, helning, asimut); bare nye felt beregnes.
+    """
+    helning = np.atleast_1d(np.asarray(helning, dtype=float))
+    asimut = np.broadcast_to(np.asarray(asimut, dtype=float), helning.shape)
+    sted = normaliser((breddegrad, lengdegrad, ghi, dhi, albedo))
+    nokler = [(sted, float(b), float(g)) for b, g in zip(helning, asimut)]
+
+    ut = np.empty((len(nokler), HOURS_YEAR))
+    mangler = []
+    for i, k in enumerate(nokler):
+        p = _PROFILER.get(k)
+        if p is None:
+            mangler.append(i)
+        else:
+            ut[i] = p
+    if mangler:
+        nye = innstraling_skraa(breddegrad, lengdegrad, ghi, helning[mangler], asimut[mangler], dhi, albedo)
+        for i, p in zip(mangler, nye):
+            ut[i] = p
+            p.setflags(write=False)
+            _PROFILER.put(nokler[i], p)
+    return ut
+
+def produksjon(kwp, profiler: np.ndarray, ytelsesfaktor: float = YTELSESFAKTOR) -> np.ndarray:
+    """Produksjon per takfelt og time (kWh), form (felt, 8760)."""
+    kwp = np.atleast_1d(np.asarray(kwp, dtype=float))[:, None]
+    return kwp * profiler * (float(ytelsesfaktor) / 1000.0)
+
+# ===============================
+# Last og egenforbruk
+# ===============================
+def lastprofil(aarsforbruk_kWh: float, drift_maske=None, grunnlast_andel: float = 0.4) -> np.ndarray:
+    """
+    Timeslast (kWh) for et bygg: en jevn grunnlast pluss resten fordelt på driftstimene.
+    Uten driftsmaske fordeles hele forbruket jevnt.
+    """
+    aar = max(float(aarsforbruk_kWh), 0.0)
+    if drift_maske is None:
+        return np.full(HOURS_YEAR, aar / HOURS_YEAR)
+    m = np.asarray(drift_maske, dtype=float)
+    if m.sum() <= 0:
+        return np.full(HOURS_YEAR, aar / HOURS_YEAR)
+    g = float(np.clip(grunnlast_andel, 0.0, 1.0))
+    return aar * (g / HOURS_YEAR + (1.0 - g) * m / m.sum())
+
+def egenforbruk(prod, last) -> dict:
+    """
+    Deler produksjonen (8760,) eller (n, 8760) i egenforbruk og eksport time for time.
+    Summene er per år (kWh), med samme ledende form som input; `egenforbruk_time` er
+    egenforbruket per time (brukes som spareprofil ved timesprising).
+    """
+    prod = np.asarray(prod, dtype=float)
+    selv = np.minimum(prod, np.asarray(last, dtype=float))
+    produsert = prod.sum(axis=-1)
+    egen = selv.sum(axis=-1)
+    return {
+        "produsert": produsert,
+        "egenforbruk": egen,
+        "eksport": produsert - egen,
+        "egenandel": np.where(produsert > 0, egen / np.where(produsert > 0, produsert, 1.0), 0.0),
+        "egenforbruk_time": selv,
+    }
+
+def solceller_time(kwp, helning, asimut, last, pris: float, eksportpris: float,
+                   ghi=None, dhi=None, breddegrad: float = STED_STANDARD[0], lengdegrad: float = STED_STANDARD[1],
+                   ytelsesfaktor: float = YTELSESFAKTOR, albedo: float = ALBEDO) -> dict:
+    """
+    Solcelleanlegg med ett eller flere takfelt mot byggets lastprofil. Uten `ghi`
+    brukes klarværsmodellen. Gir årssummer (kWh), kr/år og produksjon per felt.
+    """
+    if ghi is None:
+        ghi, dhi = klarvaer(breddegrad, lengdegrad)
+    prof = feltprofiler(breddegrad, lengdegrad, ghi, helning, asimut, dhi, albedo)
+    felt = produksjon(kwp, prof, ytelsesfaktor)
+    res = egenforbruk(felt.sum(axis=0), last)
+    res["kr_egenforbruk"] = float(res["egenforbruk"]) * float(pris)
+    res["kr_eksport"] = float(res["eksport"]) * float(eksportpris)
+    res["kr_aar"] = res["kr_egenforbruk"] + res["kr_eksport"]
+    res["per_felt"] = felt.sum(axis=1)
+    return res
+
+def last_innstraling(fil) -> tuple:
+    """
+    Leser timesverdier for innstråling (W/m²) fra CSV: global horisontal ('GHI'/'global')
+    og eventuelt diffus ('DHI'/'diffus'). Gir (ghi, dhi) der dhi er None når den mangler.
+    """
+    df = ts.les_csv(fil)
+    kol_ghi = ts.finn_kolonne(df, ("ghi", "global", "globalstraling", "innstraling"), "innstrålings")
+    kol_dhi = ts.finn_kolonne(df, ("dhi", "diffus", "diffusstraling"), "diffus", paakrevd=False)
+    ghi = ts.til_8760(df[kol_ghi], "Innstrålingsserien")
+    dhi = None if kol_dhi is None else ts.til_8760(df[kol_dhi], "Diffusstrålingen")
+    return ghi, dhi
@@ -0,0 +1,176 @@
+"""
+Timesimulering (8760 h) av varmetiltakene, drevet av en tidsserie for utetemperatur.
+
+I stedet for ett fast graddagstall (Kh) og en lineær driftsandel (driftstimer / 8760)
+summeres graddagstimene bare over de timene tiltaket faktisk virker. Alle funksjoner
+tar parametre som skalarer eller arrays med én verdi per bygg (form (n,)), og
+temperatur/driftsmasker som (8760,) eller (n, 8760) – de kan dermed brukes både for
+ett bygg i appen og for porteføljer i batch.
+"""
+import io
+from datetime import time
+
+import numpy as np
+
+from .beregning import RHO, CP_J, HOURS_YEAR
+
+T_BASIS = 17.0   # basistemperatur for graddagstall (°C)
+
+# ===============================
+# Klimadata
+# ===============================
+def les_csv(fil):
+    """
+    Leser en CSV med timesverdier som DataFrame. Semikolon-separerte filer leses med
+    desimalkomma (norsk Excel-eksport), ellers komma og desimalpunktum.
+    """
+    import pandas as pd
+
+    if hasattr(fil, "read"):
+        fil = io.BytesIO(fil.read())
+        forste = fil.readline().decode("utf-8", "replace")
+        fil.seek(0)
+    else:
+        with open(fil, encoding="utf-8", errors="replace") as f:
+            forste = f.readline()
+    semikolon = ";" in forste
+    return pd.read_csv(fil, sep=";" if semikolon else ",", decimal="," if semikolon else ".")
+
+def finn_kolonne(df, navn: tuple, hva: str, paakrevd: bool = True):
+    """Første kolonne med et av `navn` (uavhengig av store/små bokstaver), ellers siste numeriske kolonne."""
+    kol = next((k for k in df.columns if str(k).strip().lower() in navn), None)
+    if kol is None and paakrevd:
+        num = df.select_dtypes("number").columns
+        if len(num) == 0:
+            raise ValueError(f"Fant ingen numerisk {hva}kolonne i filen")
+        kol = num[-1]
+    return kol
+
+def til_8760(verdier, hva: str = "Tidsserien") -> np.ndarray:
+    """Validerer en timeserie. Skuddår (8784 verdier) kortes ned ved å fjerne 29. februar."""
+    import pandas as pd
+
+    x = pd.to_numeric(pd.Series(verdier), errors="coerce").to_numpy(dtype=float)
+    if len(x) == HOURS_YEAR + 24:
+        x = np.concatenate([x[:59 * 24], x[60 * 24:]])
+    if len(x) != HOURS_YEAR:
+        raise ValueError(f"Forventet {HOURS_YEAR} timesverdier, fikk {len(x)}")
+    if np.isnan(x).any():
+        raise ValueError(f"{hva} inneholder tomme/ugyldige verdier")
+    return x
+
+def last_temperaturserie(fil) -> np.ndarray:
+    """
+    Leser 8760 timesverdier for utetemperatur (°C) fra CSV. Bruker kolonnen
+    'T_ute'/'temperatur' hvis den finnes, ellers siste numeriske kolonne.
+    """
+    df = les_csv(fil)
+    kol = finn_kolonne(df, ("t_ute", "temperatur", "temp", "t"), "temperatur")
+    return til_8760(df[kol], "Temperaturserien")
+
+def graddagstimer(T_ute, T_basis: float = T_BASIS) -> np.ndarray:
+    return np.maximum(float(T_basis) - np.asarray(T_ute, dtype=float), 0.0)
+
+# ===============================
+# Driftsmasker
+# ===============================
+def _dagsvindu(start_h: float, varighet_h: float) -> np.ndarray:
+    """Andel av hver time (0–47) som dekkes av vinduet [start, start + varighet)."""
+    k = np.arange(48, dtype=float)
+    slutt_h = start_h + varighet_h
+    return np.clip(np.minimum(k + 1.0, slutt_h) - np.maximum(k, start_h), 0.0, 1.0)
+
+def _legg_ut_dager(vindu: np.ndarray, dager: np.ndarray) -> np.ndarray:
+    """Legger et 48-timers dagsvindu ut på valgte dager; det som går over nyttår legges i januar."""
+    maske = np.zeros(HOURS_YEAR + 24)
+    for d in np.flatnonzero(dager):
+        maske[d * 24:d * 24 + 48] += vindu
+    maske[:24] += maske[HOURS_YEAR:]
+    return np.minimum(maske[:HOURS_YEAR], 1.0)
+
+def driftsmaske(t_start: time, t_end: time, days_per_week: int, weeks_per_year: float = 52.0) -> np.ndarray:
+    """
+    Driftsandel (0–1) per time gjennom året for samme timeplan som annual_hours_from_schedule.
+    Året starter på en mandag, driftsdagene er de første `days_per_week` dagene i uka, og
+    ukene uten drift legges midt på sommeren (fellesferie).
+    """
+    start_h = t_start.hour + t_start.minute / 60
+    end_h = t_end.hour + t_end.minute / 60
+    h = end_h - start_h
+    if h < 0:
+        h += 24
+    h = max(min(h, 24.0), 0.0)
+
+    return _legg_ut_dager(_dagsvindu(start_h, h), _driftsdager(days_per_week, weeks_per_year))
+
+def _driftsdager(days_per_week: int, weeks_per_year: float) -> np.ndarray:
+    dag = np.arange(HOURS_YEAR // 24)
+    uke = np.minimum(dag // 7, 51)
+    fri_uker = min(max(52 - int(round(float(weeks_per_year))), 0), 52)
+    ferie_start = 29 - fri_uker // 2
+    return ((dag % 7) < int(days_per_week)) & ((uke - ferie_start) % 52 >= fri_uker)
+
+def timemaske(t_start: time, timer_per_aar: float, days_per_week: int, weeks_per_year: float = 52.0) -> np.ndarray:
+    """
+    Driftsandel per time for et tiltak med egne driftstimer (f.eks. belysning eller vifter):
+    `timer_per_aar` fordeles likt på driftsdagene i timeplanen fra kl. `t_start`, og timer
+    som ikke får plass der, likt på de andre dagene.
+    """
+    start_h = t_start.hour + t_start.minute / 60
+    i_drift = _driftsdager(days_per_week, weeks_per_year)
+    n_drift, n_fri = int(i_drift.sum()), int((~i_drift).sum())
+    timer = max(min(float(timer_per_aar), float(HOURS_YEAR)), 0.0)
+    h_drift = min(timer / n_drift, 24.0) if n_drift else 0.0
+    h_fri = min((timer - h_drift * n_drift) / n_fri, 24.0) if n_fri else 0.0
+    return np.minimum(_legg_ut_dager(_dagsvindu(start_h, h_drift), i_drift)
+                      + _legg_ut_dager(_dagsvindu(start_h, h_fri), ~i_drift), 1.0)
+
+def senkemaske(t_slutt: time, timer_per_dogn: float) -> np.ndarray:
+    """Senkeandel per time: `timer_per_dogn` timer hver natt, som slutter kl. `t_slutt`."""
+    varighet = max(min(float(timer_per_dogn), 24.0), 0.0)
+    start_h = (t_slutt.hour + t_slutt.minute / 60 - varighet) % 24
+    return _legg_ut_dager(_dagsvindu(start_h, varighet), np.ones(HOURS_YEAR // 24, dtype=bool))
+
+# ===============================
+# Tiltak (timesoppløst)
+# ===============================
+def _kol(x) -> np.ndarray:
+    # Parameter per bygg -> kolonne, slik at den kringkastes mot timeaksen
+    return np.asarray(x, dtype=float)[..., None]
+
+def varmegjenvinner_time(qv_m3_h, eta_old, eta_new, T_ute, drift, T_basis: float = T_BASIS) -> np.ndarray:
+    d_eta = np.maximum(_kol(eta_new) - _kol(eta_old), 0.0)
+    H_kW_per_K = RHO * CP_J * (_kol(qv_m3_h) / 3600.0) / 1000.0
+    return np.maximum((H_kW_per_K * d_eta * graddagstimer(T_ute, T_basis) * drift).sum(axis=-1), 0.0)
+
+def sfp_time(qv_m3_h, SFP_old, SFP_new, drift) -> np.ndarray:
+    dSFP = np.maximum(_kol(SFP_old) - _kol(SFP_new), 0.0)
+    return np.maximum((dSFP * (_kol(qv_m3_h) / 3600.0) * drift).sum(axis=-1), 0.0)
+
+def nattsenking_time(Q_space_kWh_year, setback_C, T_ute, senking, T_basis: float = T_BASIS) -> np.ndarray:
+    """5 %/°C av varmebehovet i senketimene, der varmebehovet fordeles etter graddagstimer."""
+    dh = graddagstimer(T_ute, T_basis)
+    andel = (dh * senking).sum(axis=-1) / np.maximum(dh.sum(axis=-1), 1e-9)
+    return np.maximum(np.asarray(Q_space_kWh_year, dtype=float) * 0.05
+                      * np.maximum(np.asarray(setback_C, dtype=float), 0.0) * andel, 0.0)
+
+def cop_fra_temperatur(T_ute, COP_ref, T_ref: float = 7.0, stigning: float = 0.08, COP_min: float = 1.0) -> np.ndarray:
+    """Enkel lineær COP-modell: COP_ref ved T_ref, endres med `stigning` per °C."""
+    return np.maximum(_kol(COP_ref) + stigning * (np.asarray(T_ute, dtype=float) - T_ref), COP_min)
+
+def varmepumpe_time(Q_netto_kWh_year, eta_old, COP_ref, dekningsgrad, T_ute,
+                    effekt_kW=None, T_basis: float = T_BASIS, **cop_kwargs) -> np.ndarray:
+    """
+    Varmebehovet fordeles time for time etter graddagstimer. Varmepumpa dekker
+    `dekningsgrad` av hver time (eller opptil `effekt_kW` hvis oppgitt) med
+    temperaturavhengig COP; resten dekkes fortsatt av gammel kjel.
+    """
+    dh = graddagstimer(T_ute, T_basis)
+    q = _kol(Q_netto_kWh_year) * dh / np.maximum(dh.sum(axis=-1, keepdims=True), 1e-9)
+    if effekt_kW is None:
+        q_vp = q * np.clip(_kol(dekningsgrad), 0.0, 1.0)
+    else:
+        q_vp = np.minimum(q, np.maximum(_kol(effekt_kW), 0.0))
+    eta_old = np.maximum(_kol(eta_old), 1e-6)
+    cop = np.maximum(cop_fra_temperatur(T_ute, COP_ref, **cop_kwargs), 1e-6)
+    return np.maximum((q_vp * (1.0 / eta_old - 1.0 / cop)).sum(axis=-1), 0.0)
@@ -1,135 +1,155 @@
+from time import perf_counter
+_t_start = perf_counter()
+
 import streamlit as st
+import numpy as np
 import pandas as pd
+import io
+import os
 from datetime import time
 
+from energitiltak import (
+    Kh, HOURS_YEAR, fmt_int, fmt_1, nok_og_co2, payback_years,
+    daily_hours, annual_hours_from_schedule, areal_til_kwp,
+    etterisolering, besparelse_varmegjenvinner, besparelse_sfp, besparelse_varmepumpe,
+    besparelse_tempreduksjon, besparelse_nattsenking,
+    LUMINAIRE_MAP, LUMINAIRE_INDEKS, besparelse_belysning,
+    memo_beregn, upsert_tiltak, oversikt_rader, oversikt_summer,
+)
+from energitiltak.oversikt import stil_oversikt, legg_til_livslop, sats_for, int_space
+from energitiltak.oversikt import TILTAK_NAVN
+from energitiltak.lager import Prosjektlager
+from energitiltak import timesimulering as ts
+from energitiltak import solceller as sc
+from energitiltak import prisserier as ps
+from energitiltak import belysning as bl
+from energitiltak import bygningsmodell as bm
+from energitiltak import rapport
+from energitiltak import maaling
+
 # ===============================
 # Sideoppsett
 # ===============================
 st.set_page_config(page_title="Energisparekalkulator", layout="wide")
 
-# ===============================
-# Konstanter og hjelpefunksjoner
-# ===============================
-RHO = 1.2
-CP_J = 1006.0
-HDD = 4800
-Kh = HDD * 24
-HOURS_YEAR = 8760
-
-def fmt_int(x: float) -> str:
-    try:
-        return f"{int(round(float(x))):,}".replace(",", " ")
-    except Exception:
-        return "–"
-
-def fmt_1(x: float) -> str:
-    try:
-        return f"{float(x):.1f}".replace(".", ",")
-    except Exception:
-        return "–"
-
-def nok_og_co2(kWh: float, pris_kr_per_kWh: float, utslipp_g_per_kWh: float):
-    kr_aar = float(kWh) * float(pris_kr_per_kWh)
-    kg_co2_aar = float(kWh) * (float(utslipp_g_per_kWh) / 1000.0)
-    return kr_aar, kg_co2_aar
-
-def payback_years(invest_kr: float, saving_kr_per_year: float):
-    if saving_kr_per_year <= 0:
-        return None
-    return float(invest_kr) / float(saving_kr_per_year)
-
-# -------------------------------
-# Driftstid-hjelp
-# -------------------------------
-def daily_hours(t_start: time, t_end: time) -> float:
-    start_h = t_start.hour + t_start.minute / 60
-    end_h   = t_end.hour + t_end.minute / 60
-    h = end_h - start_h
-    if h < 0:
-        h += 24
-    return max(min(h, 24.0), 0.0)
-
-def annual_hours_from_schedule(t_start: time, t_end: time, days_per_week: int, weeks_per_year: float = 52.0) -> float:
-    h_day = daily_hours(t_start, t_end)
-    return max(min(h_day * days_per_week * float(weeks_per_year), 8760.0), 0.0)
-
-# -------------------------------
-# Solceller-hjelp
-# -------------------------------
-def areal_til_kwp(areal_m2: float, utnyttelse: float = 0.80, kwp_per_m2: float = 0.20) -> float:
-    return max(float(areal_m2) * float(utnyttelse) * float(kwp_per_m2), 0.0)
-
-# ===============================
-# Tiltaksberegninger (enkle)
-# ===============================
-def etterisolering(A_m2: float, U_old: float, U_new: float) -> float:
-    dU = max(float(U_old) - float(U_new), 0.0)
-    return dU * float(A_m2) * Kh / 1000.0
-
-def besparelse_varmegjenvinner(qv_m3_h: float, eta_old: float, eta_new: float, driftstimer: float) -> float:
-    d_eta = max(float(eta_new) - float(eta_old), 0.0)
-    qv_m3_s = float(qv_m3_h) / 3600.0
-    H_W_per_K = RHO * CP_J * qv_m3_s
-    duty = float(driftstimer) / HOURS_YEAR
-    E_kWh = (H_W_per_K / 1000.0) * d_eta * Kh * duty
-    return max(E_kWh, 0.0)
-
-def besparelse_sfp(qv_m3_h: float, SFP_old: float, SFP_new: float, driftstimer: float) -> float:
-    dSFP = max(float(SFP_old) - float(SFP_new), 0.0)
-    qv_m3_s = float(qv_m3_h) / 3600.0
-    return max(dSFP * qv_m3_s * float(driftstimer), 0.0)
-
-def besparelse_varmepumpe(Q_netto_kWh_year: float, eta_old: float, COP_new: float, dekningsgrad: float) -> float:
-    eta_old = max(float(eta_old), 1e-6)
-    COP_new = max(float(COP_new), 1e-6)
-    dekningsgrad = max(min(float(dekningsgrad), 1.0), 0.0)
-    Q_vp = float(Q_netto_kWh_year) * dekningsgrad
-    return max(Q_vp * (1.0/eta_old - 1.0/COP_new), 0.0)
-
-def besparelse_tempreduksjon(Q_space_kWh_year: float, delta_T_C: float) -> float:
-    return max(float(Q_space_kWh_year) * 0.05 * max(float(delta_T_C), 0.0), 0.0)
-
-def besparelse_nattsenking(Q_space_kWh_year: float, setback_C: float, timer_per_dogn: float) -> float:
-    duty = max(min(float(timer_per_dogn), 24.0), 0.0) / 24.0
-    return max(float(Q_space_kWh_year) * 0.05 * max(float(setback_C), 0.0) * duty, 0.0)
-
-# ===============================
-# Belysning – hjelpetabell
-# ===============================
-LUMINAIRE_MAP = [
-    {"navn": "T8 2×58 W",              "gammel_W": 2*58,  "led_factor": 0.40},
-    {"navn": "T8 4×18 W",              "gammel_W": 4*18,  "led_factor": 0.45},
-    {"navn": "T5 2×49 W",              "gammel_W": 2*49,  "led_factor": 0.50},
-    {"navn": "Downlight halogen 50 W", "gammel_W": 50,    "led_factor": 0.20},
-    {"navn": "Metallhalogen 150 W",    "gammel_W": 150,   "led_factor": 0.40},
-    {"navn": "HQL 125 W",              "gammel_W": 125,   "led_factor": 0.45},
-    {"navn": "Egendefinert",           "gammel_W": None,  "led_factor": 0.40},
-]
-
-def besparelse_belysning(ant_armatur: int, W_gammel: float, W_led: float, timer_per_aar: float) -> float:
-    dW = max(float(W_gammel) - float(W_led), 0.0)
-    return (dW * int(ant_armatur) * float(timer_per_aar)) / 1000.0
+# Tidsmåling per kjøring (utviklermodus): bare med ENERGITILTAK_PROFIL=1 på serveren
+PROFIL = maaling.PROFIL_AKTIV
+maaling.avbryt_kjoring()
+if PROFIL:
+    maaling.start_kjoring("rerun", {"import": perf_counter() - _t_start})
+    maaling.runde("oppsett")
 
 # ===============================
 # Oversikt / pakke
 # ===============================
-def init_overview_state():
-    if "tiltak_liste" not in st.session_state:
-        st.session_state["tiltak_liste"] = []
-
-def add_or_replace_in_overview(tiltak_id: str, navn: str, kwh: float, invest: float):
-    lst = st.session_state["tiltak_liste"]
-    for row in lst:
-        if row.get("ID") == tiltak_id:
-            row.update({"Tiltak": navn, "kWh": float(kwh), "Invest": float(invest)})
-            return
-    lst.append({"ID": tiltak_id, "Tiltak": navn, "kWh": float(kwh), "Invest": float(invest)})
-
-def show_result_and_add(tiltak_id: str, navn: str, pris: float, utslipp_g: float, invest_key: str, add_key: str):
+@st.cache_resource
+def get_lager() -> Prosjektlager:
+    return Prosjektlager()
+
+@maaling.tidta
+def init_overview_state(prosjekt: str, bygg: str):
+    """Laster tiltakslisten for valgt bygg fra lageret (bare når prosjekt/bygg byttes)."""
+    if st.session_state.get("tiltak_kilde") != (prosjekt, bygg):
+        st.session_state["tiltak_liste"] = get_lager().last_bygg(prosjekt, bygg)
+        st.session_state["tiltak_kilde"] = (prosjekt, bygg)
+        st.session_state.pop("opt_resultat", None)
+
+def get_pakke():
+    """
+    Pakken med samspill for bygget som vises, synket mot tiltakslisten (bare endrede tiltak
+    beregnes). Én pakke per bygg (de 32 sist viste), så bytte av bygg beholder tilstanden.
+    """
+    from energitiltak.cache import LRUCache
+    from energitiltak.pakke import Pakke
+
+    if "pakker" not in st.session_state:
+        st.session_state["pakker"] = LRUCache(maxsize=32)
+    pakker = st.session_state["pakker"]
+    kilde = st.session_state["tiltak_kilde"]
+    pakke = pakker.get(kilde)
+    if pakke is None:
+        pakke = Pakke()
+        pakker.put(kilde, pakke)
+    return pakke.synk(st.session_state["tiltak_liste"])
+
+def get_portefolje(prosjekt: str):
+    """Porteføljen (alle bygg i prosjektet) lastes én gang per prosjekt og holdes oppdatert løpende."""
+    from energitiltak.portefolje import Portefolje
+
+    if st.session_state.get("portefolje_kilde") != prosjekt:
+        st.session_state["portefolje"] = Portefolje.fra_lager(get_lager(), prosjekt)
+        st.session_state["portefolje_kilde"] = prosjekt
+    return st.session_state["portefolje"]
+
+def _portefolje_lastet(prosjekt: str):
+    """Porteføljen hvis den allerede er lastet for prosjektet (ellers lastes den først når fanen vises)."""
+    if st.session_state.get("portefolje_kilde") == prosjekt:
+        return st.session_state["portefolje"]
+    return None
+
+@st.cache_data(show_spinner=False)
+def load_temperaturserie(data: bytes):
+    return ts.last_temperaturserie(io.BytesIO(data))
+
+@st.cache_data(show_spinner=False)
+def load_innstraling(data: bytes):
+    return sc.last_innstraling(io.BytesIO(data))
+
+@st.cache_resource(max_entries=8, show_spinner="Leser pris-/utslippsserier …")
+def load_prisserier(kilde_id: str, _kilde, navn: str):
+    """Parset og minnekartlagt én gang per fil; bytte av sone/år gjenbruker samme objekt."""
+    return ps.last_prisserier(_kilde, navn)
+
+@st.cache_data(max_entries=4, show_spinner="Beregner inventar …")
+@maaling.tidta
+def load_led_inventar(inventar_id: str, _inventar: bytes, inventar_navn: str,
+                      katalog_id, _katalog, katalog_navn, timer: float):
+    """Inventar og katalog leses og beregnes én gang per opplastet fil (nøkkel: fil-ID)."""
+    katalog = bl.STANDARD_KATALOG
+    if _katalog is not None:
+        katalog = bl.last_katalog(_navngitt(_katalog, katalog_navn))
+    return bl.beregn_inventar(bl.last_inventar(_navngitt(_inventar, inventar_navn)), katalog, timer)
+
+# Standard U-verdi etter etterisolering per bygningsdel (omtrent TEK17)
+ISO_U_NY = {"vegg": 0.18, "tak": 0.13, "gulv": 0.10, "vindu": 0.80}
+
+def modell_besparelse(modell: dict, endring: dict) -> float:
+    """Redusert varmebehov (kWh/år) i bygningsmodellen når parametrene i `endring` settes inn."""
+    return float(memo_beregn(bm.besparelse, modell["bygg"], endring, modell["T_ute"], modell["drift"]))
+
+def _navngitt(data: bytes, navn: str) -> io.BytesIO:
+    f = io.BytesIO(data)
+    f.name = navn
+    return f
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+@maaling.tidta
+def overview_table(rows: tuple):
+    """
+    Bygger DataFrame + Styler for oversikten. Nøkkel er radene selv, så en rerun uten
+    endringer i oversikten (eller pris/utslipp) gjenbruker tabellen fra forrige gang.
+    """
+    return stil_oversikt([dict(r) for r in rows])
+
+@maaling.tidta
+def add_or_replace_in_overview(tiltak_id: str, navn: str, kwh: float, invest: float, input: dict = None,
+                               eksport: float = 0.0, eksportpris: float = 0.0):
+    rad = upsert_tiltak(st.session_state["tiltak_liste"], tiltak_id, navn, kwh, invest, input, eksport, eksportpris)
+    prosjekt, bygg = st.session_state["tiltak_kilde"]
+    get_lager().lagre(prosjekt, bygg, rad)
+    portefolje = _portefolje_lastet(prosjekt)
+    if portefolje is not None:
+        portefolje.oppdater(bygg, rad)
+
+@maaling.tidta
+def show_result_and_add(tiltak_id: str, navn: str, pris, utslipp_g, invest_key: str, add_key: str):
     """
     Viser sist-beregnet resultat for tiltak (hvis finnes i session_state),
     og lar deg legge til/oppdatere oversikten uten å måtte trykke 'Beregn' på nytt.
+    `pris`/`utslipp_g` er tall eller dict ID -> timesvektet sats.
     """
+    pris = sats_for(pris, tiltak_id)
+    utslipp_g = sats_for(utslipp_g, tiltak_id)
     key_calc = f"calc_{tiltak_id}"
     if key_calc not in st.session_state:
         return
@@ -137,7 +157,12 @@ def show_result_and_add(tiltak_id: str, navn: str, pris: float, utslipp_g: float
     kwh = float(st.session_state[key_calc]["kWh"])
     default_inv = float(st.session_state[key_calc].get("default_invest", 0.0))
 
+    # Eksportert strøm (solceller) selges til eksportprisen; regnes med gjeldende pris
+    eksport = float(st.session_state[key_calc].get("eksport", 0.0))
+    eksportpris = float(st.session_state[key_calc].get("eksportpris", 0.0))
+
     kr_aar, co2_kg = nok_og_co2(kwh, pris, utslipp_g)
+    kr_aar += eksport * (eksportpris - pris)
 
     st.success(f"Energi: **{fmt_int(kwh)} kWh/år**")
     st.info(f"Kostnad: **{fmt_int(kr_aar)} kr/år**  |  CO₂: **{fmt_int(co2_kg)} kg/år**")
@@ -157,24 +182,82 @@ def show_result_and_add(tiltak_id: str, navn: str, pris: float, utslipp_g: float
     st.caption("Tilbakebetaling (enkel): " + ("–" if pb is None else f"**{pb:.1f} år**"))
 
     if st.button("Legg til / oppdater i oversikt", key=add_key):
-        add_or_replace_in_overview(tiltak_id, navn, kwh, invest)
+        add_or_replace_in_overview(tiltak_id, navn, kwh, invest, st.session_state[key_calc].get("input"),
+                                   eksport, eksportpris)
         st.success("Lagt til/oppdatert i oversikt ✅")
 
+@st.fragment(run_every=0.25)
+def _vent_paa_rapport(nokkel: str):
+    """Spør bakgrunnsjobben om status; når den er ferdig kjøres hele appen på nytt og viser nedlastingen."""
+    jobb = st.session_state.get(nokkel)
+    if jobb is None or jobb["future"].done():
+        st.rerun()
+    ferdig, antall = jobb["fremdrift"]
+    if antall:
+        st.progress(ferdig / antall, text=f"Lager rapporter … {fmt_int(ferdig)} av {fmt_int(antall)} bygg")
+    else:
+        st.caption("Lager rapport …")
+
+def start_rapport(nokkel: str, fil: str, fmt: str, fn, *args, **kwargs):
+    """Starter en rapportjobb i bakgrunnen; status og nedlasting vises med vis_rapport(nokkel)."""
+    fremdrift = [0, 0]
+    if fn is rapport.bulk:
+        kwargs["fremdrift"] = lambda ferdig, antall: fremdrift.__setitem__(slice(None), [ferdig, antall])
+    st.session_state[nokkel] = {"fil": fil, "fmt": fmt, "fremdrift": fremdrift,
+                                "future": rapport.start(fn, *args, **kwargs)}
+
+def vis_rapport(nokkel: str):
+    jobb = st.session_state.get(nokkel)
+    if jobb is None:
+        return
+    if not jobb["future"].done():
+        _vent_paa_rapport(nokkel)
+        return
+    try:
+        innhold = jobb["future"].result()
+    except Exception as e:
+        # Også BrokenProcessPool o.l. fra bulkjobben: vis feilen én gang og glem jobben
+        st.session_state.pop(nokkel, None)
+        st.error(f"Kunne ikke lage rapporten: {e or type(e).__name__}")
+        return
+    st.download_button(f"Last ned {jobb['fil']}", innhold, file_name=jobb["fil"], mime=rapport.MIME[jobb["fmt"]],
+                       key=f"{nokkel}_last_ned", on_click="ignore")
+
 # ===============================
 # UI
 # ===============================
+maaling.runde("faner")
 st.title("Energisparekalkulator")
-init_overview_state()
 
 tabs = st.tabs([
     "Etterisolering", "Varmegjenvinner", "SFP (vifter)", "Varmepumpe",
-    "Temperaturreduksjon", "Nattsenking", "Belysning (LED)", "Solceller", "Oversikt"
+    "Temperaturreduksjon", "Nattsenking", "Belysning (LED)", "Solceller", "Oversikt", "Portefølje", "Sensitivitet"
 ])
 
 # -------------------------------
 # Sidebar
 # -------------------------------
+maaling.runde("sidepanel")
 with st.sidebar:
+    st.header("Prosjekt og bygg")
+    prosjekt = st.text_input("Prosjekt", value="Mitt prosjekt", key="prosjekt").strip() or "Mitt prosjekt"
+    kjente_bygg = get_lager().bygg(prosjekt)
+    NYTT_BYGG = "➕ Nytt bygg"
+    bygg_valg = st.selectbox("Bygg", kjente_bygg + [NYTT_BYGG], key="bygg_valg")
+    if bygg_valg == NYTT_BYGG:
+        bygg = st.text_input("Navn på bygg", value=f"Bygg {len(kjente_bygg) + 1}", key="bygg_nytt").strip() or "Bygg 1"
+    else:
+        bygg = bygg_valg
+    init_overview_state(prosjekt, bygg)
+    region_lagret = get_lager().regioner(prosjekt).get(bygg, "")
+    region = st.text_input("Region", value=region_lagret, key=f"bygg_region:{prosjekt}:{bygg}").strip()
+    if region != region_lagret:
+        get_lager().sett_region(prosjekt, bygg, region)
+        if _portefolje_lastet(prosjekt) is not None:
+            _portefolje_lastet(prosjekt).sett_region(bygg, region)
+    st.caption(f"Lagres i {get_lager().sti} – {len(kjente_bygg)} bygg i prosjektet.")
+
+    st.divider()
     st.header("Økonomi og CO₂")
     pris = st.number_input("Strøm-/energipris (kr/kWh)", min_value=0.0, max_value=20.0, value=1.25, step=0.05)
     utslipp_g = st.number_input("Utslippsfaktor (g CO₂/kWh)", min_value=0.0, max_value=2000.0, value=20.0, step=1.0)
@@ -204,51 +287,197 @@ with st.sidebar:
     st.caption(f"**Utenfor driftstid/år:** {int(round(utenfor))} h")
     st.caption(f"**I drift per dag:** {h_per_day:.1f} h  |  **Utenfor per dag:** {24 - h_per_day:.1f} h")
 
+    st.divider()
+    st.header("Klimadata (timesimulering)")
+    klimafil = st.file_uploader("Utetemperatur, 8760 timesverdier (CSV)", type=["csv", "txt"], key="klima_fil")
+
+    T_ute = None
+    drift_maske = None
+    if klimafil is not None:
+        try:
+            T_ute = load_temperaturserie(klimafil.getvalue())
+        except ValueError as e:
+            st.error(f"Kunne ikke lese klimadata: {e}")
+    if T_ute is not None:
+        drift_maske = memo_beregn(ts.driftsmaske, t_start, t_end, days_per_week, weeks_per_year)
+        st.caption(f"**Graddagstimer (basis {ts.T_BASIS:.0f} °C):** {fmt_int(ts.graddagstimer(T_ute).sum())} °Ch/år "
+                   f"(enkel modell: {fmt_int(Kh)})")
+
+    st.divider()
+    st.header("Bygningsmodell (varmebehov)")
+    modell = None
+    if st.checkbox("Beregn varmebehov fra bygningsdata", key="bm_aktiv",
+                   help="Varmetiltakene (etterisolering, varmegjenvinner, varmepumpe, temperaturreduksjon og "
+                        "nattsenking) bruker da varmebehov og klimaskjerm fra modellen."):
+        b1, b2 = st.columns(2)
+        with b1:
+            bm_bra = st.number_input("BRA (m²)", min_value=50.0, max_value=500_000.0, value=2000.0, step=100.0, key="bm_bra")
+            bm_etasjer = st.number_input("Etasjer", min_value=1, max_value=60, value=2, step=1, key="bm_etasjer")
+        with b2:
+            bm_aar = st.number_input("Byggeår", min_value=1800, max_value=2100, value=1990, step=1, key="bm_aar")
+            bm_kategori = st.selectbox("Kategori", list(bm.KATEGORIER), key="bm_kategori")
+        utledet = {k: float(v) for k, v in bm.bygg_fra_energimerke(bm_bra, bm_aar, bm_etasjer, bm_kategori).items()}
+        # Nøkkel med energiattestdataene: endres de, fylles detaljene inn på nytt
+        bm_id = f"{bm_bra}:{bm_aar}:{bm_etasjer}:{bm_kategori}"
+        with st.expander("Klimaskjerm, ventilasjon og internlast"):
+            skjerm = st.data_editor(
+                pd.DataFrame({"Komponent": list(bm.KOMPONENTER),
+                              "Areal (m²)": [utledet[f"A_{k}"] for k in bm.KOMPONENTER],
+                              "U (W/m²K)": [utledet[f"U_{k}"] for k in bm.KOMPONENTER]}),
+                disabled=["Komponent"], hide_index=True, key=f"bm_skjerm:{bm_id}")
+            v1, v2 = st.columns(2)
+            with v1:
+                bm_qv = st.number_input("Luftmengde (m³/h)", 0.0, 1_000_000.0, utledet["qv_m3_h"], 500.0, key=f"bm_qv:{bm_id}")
+                bm_n50 = st.number_input("Lekkasjetall n50 (1/h)", 0.0, 20.0, utledet["n50"], 0.1, key=f"bm_n50:{bm_id}")
+                bm_T = st.number_input("Innetemperatur (°C)", 10.0, 30.0, 21.0, 0.5, key="bm_T_inne")
+            with v2:
+                bm_eta = st.number_input("Varmegjenvinning η", 0.0, 0.95, utledet["eta_vgv"], 0.01, key=f"bm_eta:{bm_id}")
+                bm_last = st.number_input("Internlast i driftstid (W/m²)", 0.0, 100.0, utledet["internlast_drift"], 1.0,
+                                          key=f"bm_last:{bm_id}")
+                bm_tv = st.number_input("Tappevann (kWh/m² år)", 0.0, 100.0, bm.STANDARD["tappevann"], 1.0, key="bm_tappevann")
+            st.caption("Varmebehovet beregnes time for time med driftstiden over (ventilasjon og internlast i "
+                       "driftstiden, bare infiltrasjon utenfor). Uten klimafil brukes et syntetisk normalår.")
+        bygg_param = dict(utledet)
+        bygg_param.update({f"A_{k}": float(a) for k, a in zip(skjerm["Komponent"], skjerm["Areal (m²)"])})
+        bygg_param.update({f"U_{k}": float(u) for k, u in zip(skjerm["Komponent"], skjerm["U (W/m²K)"])})
+        bygg_param.update({"qv_m3_h": bm_qv, "n50": bm_n50, "eta_vgv": bm_eta, "internlast_drift": bm_last,
+                           "T_inne": bm_T, "T_natt": bm_T, "tappevann": bm_tv})
+        bm_drift = drift_maske if drift_maske is not None else memo_beregn(ts.driftsmaske, t_start, t_end, days_per_week, weeks_per_year)
+        bm_res = memo_beregn(bm.varmebehov, bygg_param, T_ute, bm_drift)
+        modell = {"bygg": bygg_param, "T_ute": T_ute, "drift": bm_drift,
+                  "Q_rom": float(bm_res["Q_rom"]), "Q_netto": float(bm_res["Q_netto"])}
+        st.caption(f"**Romoppvarming:** {fmt_int(modell['Q_rom'])} kWh/år · **Netto varmebehov:** "
+                   f"{fmt_int(modell['Q_netto'])} kWh/år ({fmt_int(float(bm_res['spesifikt']))} kWh/m²)")
+
+    st.divider()
+    st.header("Timespriser og utslipp")
+    prisfil = st.file_uploader("Spotpris/utslipp per time (CSV eller Parquet)", type=["csv", "txt", "parquet"], key="pris_fil")
+    prissti = st.text_input("… eller filsti (store flerårige serier)", value="", key="pris_sti").strip()
+
+    # Standard: samme pris/utslipp for alle tiltak; med timesserier en timesvektet sats per tiltak
+    pris_tiltak = pris
+    utslipp_tiltak = utslipp_g
+    serier = prisserie = utslippserie = None
+    try:
+        if prisfil is not None:
+            serier = load_prisserier(f"opplasting:{prisfil.file_id}", prisfil.getvalue(), prisfil.name)
+        elif prissti:
+            serier = load_prisserier(f"sti:{prissti}:{os.path.getmtime(prissti)}", prissti, prissti)
+    except (OSError, ValueError) as e:
+        st.error(f"Kunne ikke lese pris-/utslippsserier: {e}")
+    if serier is not None and serier.aar():
+        sone = st.selectbox("Prisområde", serier.soner, key="pris_sone")
+        aar = st.selectbox("År", serier.aar()[::-1], key="pris_aar")
+        ider = list(TILTAK_NAVN)
+        maske = drift_maske if drift_maske is not None else memo_beregn(ts.driftsmaske, t_start, t_end, days_per_week, weeks_per_year)
+        # Hvert tiltak vektes med sine egne timer: driftstimene og senketiden i fanene (leses fra
+        # session_state, fanene tegnes etter sidepanelet) og egenforbruket fra siste solcelleberegning
+        ss = st.session_state
+        led_timer = (ss["calc_led"]["input"]["timer_per_aar"] if ss.get("led_modus", "Enkel") != "Enkel" and "calc_led" in ss
+                     else ss.get("lights_hours", 3000))
+        profilinput = {
+            "hrv": {"drift": maske if modell is not None or (T_ute is not None and ss.get("hrv_timesim"))
+                    else memo_beregn(ts.timemaske, t_start, ss.get("hrv_hours", 3000), days_per_week, weeks_per_year)},
+            "sfp": {"drift": maske if T_ute is not None and ss.get("sfp_timesim")
+                    else memo_beregn(ts.timemaske, t_start, ss.get("sfp_hours", 3000), days_per_week, weeks_per_year)},
+            "night": {"senking": memo_beregn(ts.senkemaske, t_start, ss.get("night_hours", 8))},
+            "led": {"drift": memo_beregn(ts.timemaske, t_start, led_timer, days_per_week, weeks_per_year)},
+            "pv": {"sol": ss.get("calc_pv", {}).get("solceller", {}).get("egenforbruk_time")},
+        }
+        profiler = np.array([ps.spareprofil(tid, T_ute=T_ute, **profilinput.get(tid, {"drift": maske})) for tid in ider])
+        prisserie = serier.aarsserie("pris", sone, aar) if serier.har_pris else None
+        utslippserie = serier.aarsserie("utslipp", sone, aar) if serier.har_utslipp else None
+        p_eff, u_eff = ps.effektive_satser(profiler, prisserie, utslippserie)
+        if p_eff is not None:
+            pris_tiltak = dict(zip(ider, p_eff))
+        if u_eff is not None:
+            utslipp_tiltak = dict(zip(ider, u_eff))
+        if isinstance(pris_tiltak, dict):
+            st.caption(f"**Timesvektet pris per tiltak:** {min(pris_tiltak.values()):.2f}–{max(pris_tiltak.values()):.2f} kr/kWh "
+                       f"(snitt {sone} {aar}: {serier.aarsserie('pris', sone, aar).mean():.2f} kr/kWh)".replace(".", ","),
+                       help="Varmetiltakene vektes med graddagstimene, varmegjenvinner, vifter og belysning med "
+                            "driftstimene i fanene, nattsenking med senketimene og solceller med egenforbruket "
+                            "fra siste beregning.")
+        if isinstance(utslipp_tiltak, dict):
+            st.caption(f"**Timesvektet utslipp:** {min(utslipp_tiltak.values()):.0f}–{max(utslipp_tiltak.values()):.0f} g CO₂/kWh")
+    elif serier is not None:
+        st.warning("Seriene dekker ikke et helt kalenderår.")
+
 # ===============================
 # Tab 0: Etterisolering
 # ===============================
+maaling.runde("fane: Etterisolering")
 with tabs[0]:
     st.subheader("Etterisolering")
 
-    A = st.number_input("Areal (m²)", min_value=0.0, max_value=1_000_000.0, value=1800.0, step=10.0, key="iso_area")
-    col1, col2 = st.columns(2)
-    with col1:
-        U_old = st.number_input("U-verdi før (W/m²K)", min_value=0.05, max_value=6.0, value=0.30, step=0.05, format="%.2f", key="iso_u_old")
-    with col2:
-        U_new = st.number_input("U-verdi etter (W/m²K)", min_value=0.05, max_value=6.0, value=0.18, step=0.05, format="%.2f", key="iso_u_new")
+    if modell is not None:
+        komponent = st.selectbox("Bygningsdel (fra bygningsmodellen)", list(bm.KOMPONENTER), key="iso_komponent")
+        A = modell["bygg"][f"A_{komponent}"]
+        U_old = modell["bygg"][f"U_{komponent}"]
+        st.caption(f"**Areal:** {fmt_int(A)} m²  |  **U-verdi før:** {U_old:.2f} W/m²K".replace(".", ","))
+        U_new = st.number_input("U-verdi etter (W/m²K)", min_value=0.05, max_value=6.0, value=min(ISO_U_NY[komponent], U_old),
+                                step=0.05, format="%.2f", key=f"iso_u_new_{komponent}")
+    else:
+        A = st.number_input("Areal (m²)", min_value=0.0, max_value=1_000_000.0, value=1800.0, step=10.0, key="iso_area")
+        col1, col2 = st.columns(2)
+        with col1:
+            U_old = st.number_input("U-verdi før (W/m²K)", min_value=0.05, max_value=6.0, value=0.30, step=0.05, format="%.2f", key="iso_u_old")
+        with col2:
+            U_new = st.number_input("U-verdi etter (W/m²K)", min_value=0.05, max_value=6.0, value=0.18, step=0.05, format="%.2f", key="iso_u_new")
 
     kr_per_m2 = st.number_input("Standard invest (kr/m²) – grovt", 0.0, 10000.0, 2800.0, 100.0, key="iso_kr_m2")
 
     if st.button("Beregn", key="btn_iso"):
-        kWh = etterisolering(A, U_old, U_new)
+        if modell is not None:
+            kWh = modell_besparelse(modell, {f"U_{komponent}": U_new})
+        else:
+            kWh = memo_beregn(etterisolering, A, U_old, U_new)
         default_inv = float(kr_per_m2) * float(A)
-        st.session_state["calc_iso"] = {"kWh": kWh, "default_invest": default_inv}
+        st.session_state["calc_iso"] = {"kWh": kWh, "default_invest": default_inv,
+                                        "input": {"A_m2": A, "U_old": U_old, "U_new": U_new}}
 
-    show_result_and_add("iso", "Etterisolering", pris, utslipp_g, "inv_iso", "add_iso")
+    show_result_and_add("iso", "Etterisolering", pris_tiltak, utslipp_tiltak, "inv_iso", "add_iso")
 
 # ===============================
 # Tab 1: Varmegjenvinner
 # ===============================
+maaling.runde("fane: Varmegjenvinner")
 with tabs[1]:
     st.subheader("Varmegjenvinner")
 
-    qv = st.number_input("Luftmengde (m³/h)", min_value=1000, max_value=1_000_000, value=60_000, step=1_000, key="hrv_qv")
-    eta_old = st.slider("Virkningsgrad før (%)", 50, 90, 80, key="hrv_eta_old") / 100
-    eta_new = st.slider("Virkningsgrad etter (%)", 60, 95, 88, key="hrv_eta_new") / 100
-    driftstimer = st.number_input("Driftstimer/år", min_value=100, max_value=HOURS_YEAR, value=3000, step=100, key="hrv_hours")
+    if modell is not None:
+        qv = modell["bygg"]["qv_m3_h"]
+        eta_old = modell["bygg"]["eta_vgv"]
+        driftstimer = driftstimer_calc
+        st.caption(f"**Fra bygningsmodellen:** {fmt_int(qv)} m³/h, virkningsgrad før {eta_old * 100:.0f} %, "
+                   f"driftstid fra sidepanelet ({fmt_int(driftstimer)} h/år)")
+        eta_new = st.slider("Virkningsgrad etter (%)", 60, 95, max(88, int(round(eta_old * 100))), key="hrv_eta_new") / 100
+    else:
+        qv = st.number_input("Luftmengde (m³/h)", min_value=1000, max_value=1_000_000, value=60_000, step=1_000, key="hrv_qv")
+        eta_old = st.slider("Virkningsgrad før (%)", 50, 90, 80, key="hrv_eta_old") / 100
+        eta_new = st.slider("Virkningsgrad etter (%)", 60, 95, 88, key="hrv_eta_new") / 100
+        driftstimer = st.number_input("Driftstimer/år", min_value=100, max_value=HOURS_YEAR, value=3000, step=100, key="hrv_hours")
 
     kr_per_m3h = st.number_input("Standard invest (kr per m³/h) – grovt", 0.0, 200.0, 35.0, 1.0, key="hrv_kr_m3h")
+    timesim_hrv = modell is None and T_ute is not None and st.checkbox("Timesimulering (8760 h, driftstid fra sidepanelet)", key="hrv_timesim")
 
     if st.button("Beregn", key="btn_hrv"):
-        kWh = besparelse_varmegjenvinner(qv, eta_old, eta_new, driftstimer)
+        if modell is not None:
+            kWh = modell_besparelse(modell, {"eta_vgv": eta_new})
+        elif timesim_hrv:
+            kWh = float(memo_beregn(ts.varmegjenvinner_time, qv, eta_old, eta_new, T_ute, drift_maske))
+        else:
+            kWh = memo_beregn(besparelse_varmegjenvinner, qv, eta_old, eta_new, driftstimer)
         default_inv = float(kr_per_m3h) * float(qv)
-        st.session_state["calc_hrv"] = {"kWh": kWh, "default_invest": default_inv}
+        st.session_state["calc_hrv"] = {"kWh": kWh, "default_invest": default_inv,
+                                        "input": {"qv_m3_h": qv, "eta_old": eta_old, "eta_new": eta_new, "driftstimer": driftstimer}}
 
-    show_result_and_add("hrv", "Oppgradering varmegjenvinner", pris, utslipp_g, "inv_hrv", "add_hrv")
+    show_result_and_add("hrv", "Oppgradering varmegjenvinner", pris_tiltak, utslipp_tiltak, "inv_hrv", "add_hrv")
 
 # ===============================
 # Tab 2: SFP
 # ===============================
+maaling.runde("fane: SFP (vifter)")
 with tabs[2]:
     st.subheader("SFP (vifter)")
 
@@ -258,20 +487,30 @@ with tabs[2]:
     drift = st.number_input("Driftstimer/år", min_value=100, max_value=HOURS_YEAR, value=3000, step=100, key="sfp_hours")
 
     default_inv_in = st.number_input("Standard invest (kr per aggregat) – grovt", 0.0, 10_000_000.0, 400_000.0, 10_000.0, key="sfp_inv_default")
+    timesim_sfp = T_ute is not None and st.checkbox("Timesimulering (8760 h, driftstid fra sidepanelet)", key="sfp_timesim")
 
     if st.button("Beregn", key="btn_sfp"):
-        kWh = besparelse_sfp(qv_sfp, SFP_old, SFP_new, drift)
-        st.session_state["calc_sfp"] = {"kWh": kWh, "default_invest": float(default_inv_in)}
+        if timesim_sfp:
+            kWh = float(memo_beregn(ts.sfp_time, qv_sfp, SFP_old, SFP_new, drift_maske))
+        else:
+            kWh = memo_beregn(besparelse_sfp, qv_sfp, SFP_old, SFP_new, drift)
+        st.session_state["calc_sfp"] = {"kWh": kWh, "default_invest": float(default_inv_in),
+                                        "input": {"qv_m3_h": qv_sfp, "SFP_old": SFP_old, "SFP_new": SFP_new, "driftstimer": drift}}
 
-    show_result_and_add("sfp", "SFP-tiltak / vifteoppgradering", pris, utslipp_g, "inv_sfp", "add_sfp")
+    show_result_and_add("sfp", "SFP-tiltak / vifteoppgradering", pris_tiltak, utslipp_tiltak, "inv_sfp", "add_sfp")
 
 # ===============================
 # Tab 3: Varmepumpe (B: kW via fullasttimer)
 # ===============================
+maaling.runde("fane: Varmepumpe")
 with tabs[3]:
     st.subheader("Varmepumpe")
 
-    Q_netto = st.number_input("Årlig netto varmebehov (kWh/år)", min_value=1000, max_value=50_000_000, value=600_000, step=10_000, key="vp_Q")
+    if modell is not None:
+        Q_netto = modell["Q_netto"]
+        st.caption(f"**Netto varmebehov fra bygningsmodellen:** {fmt_int(Q_netto)} kWh/år")
+    else:
+        Q_netto = st.number_input("Årlig netto varmebehov (kWh/år)", min_value=1000, max_value=50_000_000, value=600_000, step=10_000, key="vp_Q")
     eta_old = st.slider("Virkningsgrad gammel kjel", 0.5, 1.0, 0.95, 0.01, key="vp_eta")
     COP = st.slider("Varmepumpe COP (årsmiddel/SCOP)", 1.5, 8.0, 3.2, 0.1, key="vp_cop")
     dekn = st.slider("Dekningsgrad varmepumpe (%)", 0, 100, 85, 1, key="vp_dekn") / 100.0
@@ -281,211 +520,614 @@ with tabs[3]:
 
     kr_per_kw = st.number_input("Kostnad (kr/kW) luft/vann (inkl. montasje)", min_value=1000.0, max_value=50_000.0, value=16_000.0, step=500.0, key="vp_kr_per_kw")
     fullasttimer = st.slider("Antatt fullasttimer (timer/år)", 1000, 3500, 2000, 100, key="vp_fullast")
+    timesim_vp = T_ute is not None and st.checkbox("Timesimulering (8760 h, COP varierer med utetemperatur)", key="vp_timesim")
+    if timesim_vp:
+        st.caption("COP over brukes som COP ved +7 °C ute, og endres med 0,08 per °C.")
 
     if st.button("Beregn", key="btn_vp"):
-        kWh = besparelse_varmepumpe(Q_netto, eta_old, COP, dekn)
+        if timesim_vp:
+            kWh = float(memo_beregn(ts.varmepumpe_time, Q_netto, eta_old, COP, dekn, T_ute))
+        else:
+            kWh = memo_beregn(besparelse_varmepumpe, Q_netto, eta_old, COP, dekn)
 
         Q_vp = float(Q_netto) * float(dekn)
         vp_kw = Q_vp / max(float(fullasttimer), 1.0)
         default_inv = vp_kw * float(kr_per_kw)
 
-        st.session_state["calc_vp"] = {"kWh": kWh, "default_invest": default_inv}
+        st.session_state["calc_vp"] = {"kWh": kWh, "default_invest": default_inv,
+                                       "input": {"Q_netto_kWh_year": Q_netto, "eta_old": eta_old, "COP_new": COP, "dekningsgrad": dekn}}
 
         st.caption(f"Estimert VP-effekt: **{fmt_1(vp_kw)} kW** (≈ {fmt_int(Q_vp)} kWh/år / {fullasttimer} h)")
         st.caption(f"Estimert investering: **{fmt_int(default_inv)} kr**")
 
-    show_result_and_add("vp", "Varmepumpe (luft–vann)", pris, utslipp_g, "inv_vp", "add_vp")
+    show_result_and_add("vp", "Varmepumpe (luft–vann)", pris_tiltak, utslipp_tiltak, "inv_vp", "add_vp")
 
 # ===============================
 # Tab 4: Temperaturreduksjon
 # ===============================
+maaling.runde("fane: Temperaturreduksjon")
 with tabs[4]:
     st.subheader("Temperaturreduksjon")
 
-    Q_space = st.number_input("Årlig netto romoppvarming (kWh/år)", min_value=1000, max_value=50_000_000, value=600_000, step=10_000, key="temp_Q")
+    if modell is not None:
+        Q_space = modell["Q_rom"]
+        st.caption(f"**Romoppvarming fra bygningsmodellen:** {fmt_int(Q_space)} kWh/år")
+    else:
+        Q_space = st.number_input("Årlig netto romoppvarming (kWh/år)", min_value=1000, max_value=50_000_000, value=600_000, step=10_000, key="temp_Q")
     deltaT = st.slider("Reduksjon i settpunkt (°C)", 0.0, 5.0, 1.0, 0.5, key="temp_delta")
     default_inv_in = st.number_input("Standard invest (kr) – grovt", 0.0, 2_000_000.0, 50_000.0, 10_000.0, key="temp_inv_default")
 
     if st.button("Beregn", key="btn_temp"):
-        kWh = besparelse_tempreduksjon(Q_space, deltaT)
-        st.session_state["calc_temp"] = {"kWh": kWh, "default_invest": float(default_inv_in)}
+        kWh = memo_beregn(besparelse_tempreduksjon, Q_space, deltaT)
+        st.session_state["calc_temp"] = {"kWh": kWh, "default_invest": float(default_inv_in),
+                                         "input": {"Q_space_kWh_year": Q_space, "delta_T_C": deltaT}}
 
-    show_result_and_add("temp", "Temperaturreduksjon", pris, utslipp_g, "inv_temp", "add_temp")
+    show_result_and_add("temp", "Temperaturreduksjon", pris_tiltak, utslipp_tiltak, "inv_temp", "add_temp")
 
 # ===============================
 # Tab 5: Nattsenking
 # ===============================
+maaling.runde("fane: Nattsenking")
 with tabs[5]:
     st.subheader("Nattsenking")
 
-    Q_space_n = st.number_input("Årlig netto romoppvarming (kWh/år)", min_value=1000, max_value=50_000_000, value=600_000, step=10_000, key="night_Q")
+    if modell is not None:
+        Q_space_n = modell["Q_rom"]
+        st.caption(f"**Romoppvarming fra bygningsmodellen:** {fmt_int(Q_space_n)} kWh/år")
+    else:
+        Q_space_n = st.number_input("Årlig netto romoppvarming (kWh/år)", min_value=1000, max_value=50_000_000, value=600_000, step=10_000, key="night_Q")
     setback = st.slider("Senking (°C) i senketid", 0.0, 6.0, 2.0, 0.5, key="night_setback")
     hours = st.slider("Timer per døgn med senking", 0, 24, 8, 1, key="night_hours")
     default_inv_in = st.number_input("Standard invest (kr) – grovt", 0.0, 2_000_000.0, 75_000.0, 10_000.0, key="night_inv_default")
+    timesim_night = T_ute is not None and st.checkbox("Timesimulering (8760 h, senking frem til driftsstart)", key="night_timesim")
 
     if st.button("Beregn", key="btn_night"):
-        kWh = besparelse_nattsenking(Q_space_n, setback, hours)
-        st.session_state["calc_night"] = {"kWh": kWh, "default_invest": float(default_inv_in)}
+        if timesim_night:
+            kWh = float(memo_beregn(ts.nattsenking_time, Q_space_n, setback, T_ute, memo_beregn(ts.senkemaske, t_start, hours)))
+        else:
+            kWh = memo_beregn(besparelse_nattsenking, Q_space_n, setback, hours)
+        st.session_state["calc_night"] = {"kWh": kWh, "default_invest": float(default_inv_in),
+                                          "input": {"Q_space_kWh_year": Q_space_n, "setback_C": setback, "timer_per_dogn": hours}}
 
-    show_result_and_add("night", "Nattsenking", pris, utslipp_g, "inv_night", "add_night")
+    show_result_and_add("night", "Nattsenking", pris_tiltak, utslipp_tiltak, "inv_night", "add_night")
 
 # ===============================
 # Tab 6: LED
 # ===============================
+maaling.runde("fane: Belysning (LED)")
 with tabs[6]:
     st.subheader("Belysning (LED)")
 
-    navn_liste = [d["navn"] for d in LUMINAIRE_MAP]
-    valg = st.selectbox("Velg eksisterende armaturtype", navn_liste, index=0, key="lights_type")
-    data = next(d for d in LUMINAIRE_MAP if d["navn"] == valg)
-    gammel_W = data["gammel_W"]
-    led_factor = data["led_factor"]
-
-    if "lights_prev_type" not in st.session_state:
-        st.session_state["lights_prev_type"] = valg
-        if gammel_W is None:
-            st.session_state["lights_W_old"] = 200
-            st.session_state["lights_W_led"] = int(round(200 * led_factor))
-        else:
-            st.session_state["lights_W_old"] = int(gammel_W)
-            st.session_state["lights_W_led"] = int(round(gammel_W * led_factor))
-
-    if valg != st.session_state["lights_prev_type"]:
-        if gammel_W is None:
-            st.session_state["lights_W_old"] = 200
-            st.session_state["lights_W_led"] = int(round(200 * led_factor))
-        else:
-            st.session_state["lights_W_old"] = int(gammel_W)
-            st.session_state["lights_W_led"] = int(round(gammel_W * led_factor))
-        st.session_state["lights_prev_type"] = valg
+    led_modus = st.radio("Modus", ["Enkel", "Inventarliste (rom/armaturer)"], horizontal=True, key="led_modus")
+
+    if led_modus == "Enkel":
+        navn_liste = [d["navn"] for d in LUMINAIRE_MAP]
+        valg = st.selectbox("Velg eksisterende armaturtype", navn_liste, index=0, key="lights_type")
+        data = LUMINAIRE_INDEKS[valg]
+        gammel_W = data["gammel_W"]
+        led_factor = data["led_factor"]
+
+        if "lights_prev_type" not in st.session_state:
+            st.session_state["lights_prev_type"] = valg
+            if gammel_W is None:
+                st.session_state["lights_W_old"] = 200
+                st.session_state["lights_W_led"] = int(round(200 * led_factor))
+            else:
+                st.session_state["lights_W_old"] = int(gammel_W)
+                st.session_state["lights_W_led"] = int(round(gammel_W * led_factor))
+
+        if valg != st.session_state["lights_prev_type"]:
+            if gammel_W is None:
+                st.session_state["lights_W_old"] = 200
+                st.session_state["lights_W_led"] = int(round(200 * led_factor))
+            else:
+                st.session_state["lights_W_old"] = int(gammel_W)
+                st.session_state["lights_W_led"] = int(round(gammel_W * led_factor))
+            st.session_state["lights_prev_type"] = valg
+
+        colA, colB = st.columns(2)
+        with colA:
+            ant = st.number_input("Antall armaturer (stk)", min_value=0, max_value=1_000_000, value=200, step=10, key="lights_count")
+        with colB:
+            timer = st.number_input("Driftstimer/år", min_value=100, max_value=HOURS_YEAR, value=3000, step=100, key="lights_hours")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            W_old = st.number_input("Effekt pr gammel armatur (W)", min_value=1, max_value=2000,
+                                    value=int(st.session_state.get("lights_W_old", 200)), step=1, key="lights_W_old")
+        with col2:
+            auto_led = int(round(float(W_old) * float(led_factor)))
+            W_led = st.number_input("Effekt pr LED-armatur (W)", min_value=1, max_value=2000,
+                                    value=int(st.session_state.get("lights_W_led", auto_led)), step=1, key="lights_W_led")
+
+        kr_per_arm = st.number_input("Standard invest (kr per armatur) – grovt", 0.0, 50_000.0, 3000.0, 100.0, key="led_kr_arm")
+
+        if st.button("Beregn", key="btn_lights"):
+            kWh = memo_beregn(besparelse_belysning, ant, st.session_state["lights_W_old"], st.session_state["lights_W_led"], timer)
+            default_inv = float(kr_per_arm) * float(ant)
+            st.session_state["calc_led"] = {"kWh": kWh, "default_invest": default_inv,
+                                            "input": {"ant_armatur": ant, "W_gammel": st.session_state["lights_W_old"],
+                                                      "W_led": st.session_state["lights_W_led"], "timer_per_aar": timer}}
 
-    colA, colB = st.columns(2)
-    with colA:
-        ant = st.number_input("Antall armaturer (stk)", min_value=0, max_value=1_000_000, value=200, step=10, key="lights_count")
-    with colB:
-        timer = st.number_input("Driftstimer/år", min_value=100, max_value=HOURS_YEAR, value=3000, step=100, key="lights_hours")
-
-    col1, col2 = st.columns(2)
-    with col1:
-        W_old = st.number_input("Effekt pr gammel armatur (W)", min_value=1, max_value=2000,
-                                value=int(st.session_state.get("lights_W_old", 200)), step=1, key="lights_W_old")
-    with col2:
-        auto_led = int(round(float(W_old) * float(led_factor)))
-        W_led = st.number_input("Effekt pr LED-armatur (W)", min_value=1, max_value=2000,
-                                value=int(st.session_state.get("lights_W_led", auto_led)), step=1, key="lights_W_led")
-
-    kr_per_arm = st.number_input("Standard invest (kr per armatur) – grovt", 0.0, 50_000.0, 3000.0, 100.0, key="led_kr_arm")
-
-    if st.button("Beregn", key="btn_lights"):
-        kWh = besparelse_belysning(ant, st.session_state["lights_W_old"], st.session_state["lights_W_led"], timer)
-        default_inv = float(kr_per_arm) * float(ant)
-        st.session_state["calc_led"] = {"kWh": kWh, "default_invest": default_inv}
-
-    show_result_and_add("led", "LED-ombygging", pris, utslipp_g, "inv_led", "add_led")
+    else:
+        st.caption("Inventarliste med én rad per rom/armaturtype: kolonnene **armatur** og **antall**, valgfritt "
+                   "**rom**, **etasje**, **timer** (brukstid/år), **sensor** og **dagslys** (ja/nei, andel eller prosent "
+                   f"reduksjon; ja = {bl.SENSOR_REDUKSJON:.0%} / {bl.DAGSLYS_REDUKSJON:.0%}) og **W_gammel**/**W_led** for egendefinerte typer.")
+        colA, colB = st.columns(2)
+        with colA:
+            inventarfil = st.file_uploader("Inventarliste (CSV eller Parquet)", type=["csv", "txt", "parquet"], key="led_inventar")
+        with colB:
+            katalogfil = st.file_uploader("Egen armaturkatalog (valgfritt)", type=["csv", "txt", "parquet"], key="led_katalog")
+        timer_std = st.number_input("Brukstid når 'timer' mangler (h/år)", min_value=0, max_value=HOURS_YEAR,
+                                    value=int(round(driftstimer_calc)), step=100, key="led_inv_timer")
+
+        if inventarfil is None:
+            st.info("Last opp en inventarliste for å beregne hele bygget.")
+        elif st.button("Beregn", key="btn_led_inventar"):
+            try:
+                resultat = load_led_inventar(inventarfil.file_id, inventarfil.getvalue(), inventarfil.name,
+                                             None if katalogfil is None else katalogfil.file_id,
+                                             None if katalogfil is None else katalogfil.getvalue(),
+                                             None if katalogfil is None else katalogfil.name,
+                                             float(timer_std))
+            except (KeyError, ValueError) as e:
+                st.error(f"Kunne ikke beregne inventaret: {e}")
+            else:
+                ekv = bl.som_enkelttiltak(resultat)
+                st.session_state["led_inventar_resultat"] = resultat
+                st.session_state["calc_led"] = {"kWh": float(resultat["kWh_spart"].sum()),
+                                                "default_invest": float(resultat["invest"].sum()), "input": ekv}
+
+        resultat = st.session_state.get("led_inventar_resultat")
+        if resultat is not None:
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Armaturer", fmt_int(resultat[bl.KOL_ANTALL].sum()) + " stk")
+            m2.metric("Forbruk før", fmt_int(resultat["kWh_for"].sum()) + " kWh/år")
+            m3.metric("Forbruk etter", fmt_int(resultat["kWh_etter"].sum()) + " kWh/år")
+            grupperinger = [k for k in (bl.KOL_ROM, bl.KOL_TYPE, bl.KOL_ETASJE) if k in resultat.columns]
+            for fane, kol in zip(st.tabs([f"Per {k}" for k in grupperinger]), grupperinger):
+                with fane:
+                    g = bl.grupper(resultat, kol)
+                    if len(g) > 1000:
+                        st.caption(f"Viser de 1000 med størst besparelse av {fmt_int(len(g))}.")
+                    st.dataframe(g.head(1000).style.format(int_space), use_container_width=True)
+
+    show_result_and_add("led", "LED-ombygging", pris_tiltak, utslipp_tiltak, "inv_led", "add_led")
 
 # ===============================
 # Tab 7: Solceller
 # ===============================
+maaling.runde("fane: Solceller")
 with tabs[7]:
     st.subheader("Solceller")
 
+    st.caption("Timesmodell (8760 h): innstrålingen legges på hvert takfelt etter helning og retning, "
+               "og produksjonen matches time for time mot byggets forbruk. Egenforbruk sparer innkjøpt strøm, "
+               "overskuddet selges til eksportprisen.")
+
     colA, colB, colC = st.columns(3)
     with colA:
-        areal = st.number_input("Tilgjengelig takareal (m²)", min_value=10.0, max_value=200_000.0, value=1000.0, step=50.0, key="pv_areal")
+        breddegrad = st.number_input("Breddegrad (°N)", min_value=57.0, max_value=71.5, value=sc.STED_STANDARD[0], step=0.1, key="pv_bredde")
     with colB:
-        utnyttelse = st.slider("Utnyttelsesgrad tak (%)", 50, 100, 80, 5, key="pv_utnytt") / 100.0
+        lengdegrad = st.number_input("Lengdegrad (°Ø)", min_value=4.0, max_value=31.5, value=sc.STED_STANDARD[1], step=0.1, key="pv_lengde")
     with colC:
-        kwp_per_m2 = st.number_input("kWp per m² modulflate", min_value=0.10, max_value=0.30, value=0.20, step=0.01, key="pv_kwp_m2")
+        innstralingsfil = st.file_uploader("Innstråling, 8760 timesverdier GHI/DHI (CSV)", type=["csv", "txt"], key="pv_innstraling")
 
-    spes_prod = st.selectbox("Forventet årsproduksjon (kWh/kWp)", [700, 750, 800, 850, 900, 950], index=1, key="pv_spes")
+    st.markdown("**Takfelt** (asimut: 180° = sør, 90° = øst, 270° = vest)")
+    takfelt = st.data_editor(
+        {"Takfelt": ["Tak 1"], "Areal (m²)": [1000.0], "Helning (°)": [35.0], "Asimut (°)": [180.0]},
+        num_rows="dynamic", use_container_width=True, key="pv_takfelt",
+    )
+    felt_areal = np.array([max(float(x or 0.0), 0.0) for x in takfelt["Areal (m²)"]])
+    felt_helning = np.array([float(x or 0.0) for x in takfelt["Helning (°)"]])
+    felt_asimut = np.array([float(x or 0.0) for x in takfelt["Asimut (°)"]])
+    areal = float(felt_areal.sum())
 
-    st.markdown("""
-**Veiledende nivåer for årsproduksjon (kWh/kWp):**
+    colA, colB = st.columns(2)
+    with colA:
+        utnyttelse = st.slider("Utnyttelsesgrad tak (%)", 50, 100, 80, 5, key="pv_utnytt") / 100.0
+    with colB:
+        kwp_per_m2 = st.number_input("kWp per m² modulflate", min_value=0.10, max_value=0.30, value=0.20, step=0.01, key="pv_kwp_m2")
 
-| kWh/kWp | Typisk situasjon |
-|--------:|-----------------|
-| 700 | Nord-Norge / ugunstige forhold |
-| 750 | Øst/vest-tak, lav vinkel (~10°), evt. noe skygge |
-| 800 | Typiske forhold i Midt-Norge |
-| 850 | Gode forhold, lite skygge |
-| 900 | Sør-Norge eller svært gode solforhold |
-| 950 | Optimale forhold (sørvendt, 25–35°, lite skygge) |
-""")
+    colA, colB = st.columns(2)
+    with colA:
+        forbruk_el = st.number_input("Byggets årlige strømforbruk (kWh/år)", min_value=0.0, max_value=100_000_000.0,
+                                     value=500_000.0, step=10_000.0, key="pv_forbruk",
+                                     help="Fordeles med 40 % grunnlast og resten i driftstiden fra sidepanelet.")
+    with colB:
+        eksportpris = st.number_input("Eksportpris (kr/kWh)", min_value=0.0, max_value=20.0, value=0.50, step=0.05, key="pv_eksportpris")
 
+    felt_kwp = felt_areal * utnyttelse * kwp_per_m2
     kWp = areal_til_kwp(areal, utnyttelse, kwp_per_m2)
     st.caption(f"Estimert installert effekt: **{kWp:.1f} kWp**")
 
     kr_per_kwp = st.number_input("Standard invest (kr/kWp) – grovt", 0.0, 50_000.0, 10_500.0, 250.0, key="pv_kr_kwp")
 
     if st.button("Beregn", key="btn_pv"):
-        kWh = float(kWp) * float(spes_prod)
-        default_inv = float(kr_per_kwp) * float(kWp)
-        st.session_state["calc_pv"] = {"kWh": kWh, "default_invest": default_inv}
-
-    show_result_and_add("pv", "Solceller", pris, utslipp_g, "inv_pv", "add_pv")
+        ghi = dhi = None
+        if innstralingsfil is not None:
+            try:
+                ghi, dhi = load_innstraling(innstralingsfil.getvalue())
+            except ValueError as e:
+                st.error(f"Kunne ikke lese innstråling: {e}")
+        last = memo_beregn(sc.lastprofil, forbruk_el, memo_beregn(ts.driftsmaske, t_start, t_end, days_per_week, weeks_per_year))
+        pris_pv = sats_for(pris_tiltak, "pv")
+        res = memo_beregn(sc.solceller_time, felt_kwp, felt_helning, felt_asimut, last, pris_pv, eksportpris,
+                          ghi, dhi, breddegrad, lengdegrad)
+        produsert = float(res["produsert"])
+        if prisserie is not None or utslippserie is not None:
+            # Sidepanelet vektet solcellene med forrige beregning; nytt egenforbruk gir nye satser
+            p_eff, u_eff = ps.effektive_satser(ps.spareprofil("pv", sol=res["egenforbruk_time"]), prisserie, utslippserie)
+            if p_eff is not None:
+                pris_tiltak["pv"] = float(p_eff[0])
+            if u_eff is not None:
+                utslipp_tiltak["pv"] = float(u_eff[0])
+        # Oversikten regner kWh · pris; eksporten lagres i kWh og prises med eksportprisen ved visning
+        st.session_state["calc_pv"] = {"kWh": produsert, "default_invest": float(kr_per_kwp) * float(kWp),
+                                       "eksport": float(res["eksport"]), "eksportpris": float(eksportpris),
+                                       "solceller": res, "klarvaer": ghi is None,
+                                       "input": {"areal_m2": areal, "utnyttelse": utnyttelse, "kwp_per_m2": kwp_per_m2,
+                                                 "spes_prod": produsert / kWp if kWp > 0 else 0.0}}
+
+    calc_pv = st.session_state.get("calc_pv", {})
+    if "solceller" in calc_pv:
+        calc_pv["eksportpris"] = float(eksportpris)   # eksporten følger eksportprisen uten ny beregning
+        res = calc_pv["solceller"]
+        if calc_pv["klarvaer"]:
+            st.caption("Uten innstrålingsfil brukes en klarværsmodell skalert til typisk norsk solinnstråling.")
+        p1, p2, p3, p4 = st.columns(4)
+        p1.metric("Produksjon", fmt_int(res["produsert"]) + " kWh/år")
+        p2.metric("Spesifikk produksjon", fmt_int(res["produsert"] / kWp if kWp > 0 else 0.0) + " kWh/kWp")
+        p3.metric("Egenforbruk", fmt_int(res["egenforbruk"]) + " kWh/år", f"{res['egenandel'] * 100:.0f} %".replace(".", ","), delta_color="off")
+        p4.metric("Eksport", fmt_int(res["eksport"]) + " kWh/år", fmt_int(res["eksport"] * eksportpris) + " kr/år", delta_color="off")
+
+    show_result_and_add("pv", "Solceller", pris_tiltak, utslipp_tiltak, "inv_pv", "add_pv")
 
 # ===============================
 # === Oversikt ===
+maaling.runde("fane: Oversikt")
 with tabs[8]:
     st.subheader("Oversikt tiltak (pakken)")
 
     if len(st.session_state["tiltak_liste"]) == 0:
         st.info("Ingen tiltak lagt til enda. Gå til et tiltak, beregn, og trykk 'Legg til / oppdater i oversikt'.")
     else:
-        rows = []
-        for r in st.session_state["tiltak_liste"]:
-            kWh = float(r["kWh"])
-            inv = float(r["Invest"])
-            kr_aar, co2_kg = nok_og_co2(kWh, pris, utslipp_g)
-            pb = payback_years(inv, kr_aar)
-            rows.append({
-                "Tiltak": r["Tiltak"],
-                "Energisparing (kWh/år)": kWh,
-                "Kostnadsbesparelse (kr/år)": kr_aar,
-                "CO₂-reduksjon (kg/år)": co2_kg,
-                "Investering (kr)": inv,
-                "Tilbakebetaling (år)": (None if pb is None else pb)
-            })
-
-        df = pd.DataFrame(rows)
-
-        # --- Formatering: heltall + tusenskille (mellomrom) ---
-        def int_space(x):
-            return f"{int(round(x)):,}".replace(",", " ")
-
-        def years_1(x):
-            if pd.isna(x):
-                return "–"
-            return f"{x:.1f}".replace(".", ",")
-
-        styler = df.style.format({
-            "Energisparing (kWh/år)": int_space,
-            "Kostnadsbesparelse (kr/år)": int_space,
-            "CO₂-reduksjon (kg/år)": int_space,
-            "Investering (kr)": int_space,
-            "Tilbakebetaling (år)": years_1
-        })
-
+        rows = oversikt_rader(st.session_state["tiltak_liste"], pris_tiltak, utslipp_tiltak)
+
+        with st.expander("Livsløpsforutsetninger"):
+            l1, l2, l3 = st.columns(3)
+            with l1:
+                lcc_rente = st.slider("Kalkulasjonsrente (%)", 0.0, 10.0, 4.0, 0.5, key="lcc_rente") / 100.0
+            with l2:
+                lcc_horisont = st.slider("Analyseperiode (år)", 15, 30, 30, 1, key="lcc_horisont")
+            with l3:
+                lcc_prisvekst = st.slider("Årlig prisvekst energi (%)", 0.0, 5.0, 2.0, 0.5, key="lcc_prisvekst") / 100.0
+            st.caption("Tiltak med kortere levetid enn analyseperioden reinvesteres, og restverdien godskrives "
+                       "lineært ved periodens slutt. Solcelleproduksjonen degraderes 0,5 %/år.")
+        livslop_sum = legg_til_livslop(rows, st.session_state["tiltak_liste"], pris_tiltak,
+                                       lcc_rente, lcc_horisont, lcc_prisvekst)
+
+        styler = overview_table(tuple(tuple(r.items()) for r in rows))
         st.dataframe(styler, use_container_width=True)
 
         # Summer (samme som før)
-        sum_kwh = df["Energisparing (kWh/år)"].sum()
-        sum_kr = df["Kostnadsbesparelse (kr/år)"].sum()
-        sum_co2 = df["CO₂-reduksjon (kg/år)"].sum()
-        sum_inv = df["Investering (kr)"].sum()
+        summer = oversikt_summer(rows)
+        sum_kwh = summer["kWh"]
+        sum_kr = summer["kr"]
+        sum_co2 = summer["co2"]
+        sum_inv = summer["invest"]
+        pb_tot = summer["payback"]
 
         st.divider()
         c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Sum energisparing", f"{int(round(sum_kwh)):,}".replace(",", " ") + " kWh/år")
-        c2.metric("Sum besparelse", f"{int(round(sum_kr)):,}".replace(",", " ") + " kr/år")
-        c3.metric("Sum CO₂-reduksjon", f"{int(round(sum_co2)):,}".replace(",", " ") + " kg/år")
-        c4.metric("Sum investering", f"{int(round(sum_inv)):,}".replace(",", " ") + " kr")
+        c1.metric("Sum energisparing", fmt_int(sum_kwh) + " kWh/år")
+        c2.metric("Sum besparelse", fmt_int(sum_kr) + " kr/år")
+        c3.metric("Sum CO₂-reduksjon", fmt_int(sum_co2) + " kg/år")
+        c4.metric("Sum investering", fmt_int(sum_inv) + " kr")
 
         st.caption(
             "**Samlet tilbakebetaling (enkel):** "
-            + ("–" if sum_kr <= 0 else f"**{(sum_inv / sum_kr):.1f} år**".replace(".", ","))
+            + ("–" if pb_tot is None else f"**{pb_tot:.1f} år**".replace(".", ","))
+            + " · **Sum nåverdi:** " + fmt_int(livslop_sum["npv"]) + " kr"
+            + " · **Internrente pakke:** "
+            + ("–" if livslop_sum["irr"] is None else f"{livslop_sum['irr'] * 100:.1f} %".replace(".", ","))
         )
 
+        with st.expander("Samspill i pakken"):
+            from energitiltak import pakke as pk
+
+            st.caption("Summen over regner hvert tiltak mot det opprinnelige varmebehovet. Her legges tiltakene på "
+                       "en felles varmebalanse i levert energi: varmetiltakene reduserer varmebehovet med sin andel, "
+                       "og varmepumpa dekker det som er igjen. Samlet besparelse er den samme i alle rekkefølger. "
+                       "Elektriske tiltak og solceller påvirkes ikke.")
+            pakke = get_pakke()
+            if pakke.Q_varme is None:
+                st.info("Varmebehovet er ukjent – beregn varmepumpe, temperaturreduksjon eller nattsenking for å få "
+                        "med samspillet. Til da summeres tiltakene.")
+            utelatt = st.multiselect("Utelat fra pakken", pakke.ider, format_func=dict(zip(pakke.ider, pakke.navn)).get,
+                                     key=f"samspill_utelatt:{prosjekt}:{bygg}", placeholder="Ingen")
+            for tid in pakke.ider:
+                pakke.sett_aktiv(tid, tid not in utelatt)
+
+            s1, s2, s3 = st.columns(3)
+            s1.metric("Hver for seg", fmt_int(pakke.kWh_alene) + " kWh/år")
+            s2.metric("Med samspill", fmt_int(pakke.kWh) + " kWh/år")
+            s3.metric("Dobbelttelling", fmt_int(pakke.kWh_alene - pakke.kWh) + " kWh/år")
+
+            aktive = [i for i, a in enumerate(pakke.aktiv) if a]
+            rangert = None
+            if 0 < len(aktive) <= pk.MAKS_REKKEFOLGE:
+                rangert = memo_beregn(pk.alle_rekkefolger, [pakke.ider[i] for i in aktive],
+                                      [pakke.kwh[i] for i in aktive], pakke.Q_varme, [pakke.input[i] for i in aktive])
+            shapley = rangert["shapley"] if rangert is not None else {}
+            tall = st.column_config.NumberColumn(format="localized")
+            st.dataframe(pd.DataFrame({
+                "Tiltak": pakke.navn,
+                "Alene (kWh/år)": np.round(pakke.alene()),
+                "I pakken (kWh/år)": np.round(pakke.marg),
+                "Snitt over rekkefølger (kWh/år)": [round(shapley[t]) if t in shapley else None for t in pakke.ider],
+            }), hide_index=True, use_container_width=True,
+                column_config={k: tall for k in ("Alene (kWh/år)", "I pakken (kWh/år)", "Snitt over rekkefølger (kWh/år)")})
+            st.caption("«Alene» er tiltaket alene på varmebalansen, i levert energi med virkningsgraden til den gamle "
+                       "varmekilden. «I pakken» er tiltakets marginale bidrag i standardrekkefølgen, og «Snitt over "
+                       "rekkefølger» bidraget i snitt over alle rekkefølgene tiltakene kan gjennomføres i.")
+
+            if rangert is not None and len(aktive) > 1:
+                navn = dict(zip(pakke.ider, pakke.navn))
+                topp = min(5, len(rangert["rekkefolger"]))
+                st.markdown("**Gjennomføring trinn for trinn** – rekkefølgene som gir mest besparelse tidligst")
+                st.dataframe(pd.DataFrame({
+                    "Rekkefølge": [" → ".join(navn[rangert["ider"][i]] for i in seq) for seq in rangert["rekkefolger"][:topp]],
+                    "Etter første tiltak (kWh/år)": np.round(rangert["kumulativ"][:topp, 0]),
+                    "Etter to tiltak (kWh/år)": np.round(rangert["kumulativ"][:topp, 1]),
+                }), hide_index=True, use_container_width=True,
+                    column_config={k: tall for k in ("Etter første tiltak (kWh/år)", "Etter to tiltak (kWh/år)")})
+
+        with st.expander("Optimal pakke innenfor budsjett"):
+            from energitiltak.optimering import optimer
+
+            st.caption("Velger den kombinasjonen av tiltakene over som gir mest energisparing eller høyest nåverdi "
+                       "innenfor budsjettet. Samspill tas med: etterisolering, varmegjenvinning og driftstiltak "
+                       "reduserer varmebehovet som varmepumpa sparer på.")
+            o1, o2, o3 = st.columns(3)
+            with o1:
+                budsjett = st.number_input("Budsjett (kr)", min_value=0.0, value=float(sum_inv), step=100_000.0, key="opt_budsjett")
+            with o2:
+                maal = st.radio("Maksimer", ["kWh", "NPV"], horizontal=True, key="opt_maal")
+            with o3:
+                rente = st.slider("Kalkulasjonsrente (%)", 0.0, 10.0, 4.0, 0.5, key="opt_rente") / 100.0
+
+            if st.button("Finn optimal pakke", key="btn_opt"):
+                st.session_state["opt_resultat"] = optimer(list(st.session_state["tiltak_liste"].values()), budsjett, maal, pris_tiltak, rente)
+
+            opt = st.session_state.get("opt_resultat")
+            if opt is not None:
+                valgt_id = {tid for _, tid in opt["valgt"]}
+                navn_valgt = [r["Tiltak"] for r in st.session_state["tiltak_liste"].values() if r["ID"] in valgt_id]
+                st.success("Valgt: " + (", ".join(navn_valgt) if navn_valgt else "ingen tiltak"))
+                m1, m2, m3 = st.columns(3)
+                m1.metric("Energisparing (med samspill)", fmt_int(opt["kWh"]) + " kWh/år")
+                m2.metric("Investering", fmt_int(opt["invest"]) + " kr")
+                if opt["maal"] == "NPV":
+                    m3.metric("Nåverdi", fmt_int(opt["verdi"]) + " kr")
+
+        with st.expander("Rapport (Excel/PDF)"):
+            st.caption("Oversikten med summer, livsløpstall, forutsetninger og diagrammer for energisparing og "
+                       "tilbakebetaling. Rapporten lages i bakgrunnen, så appen kan brukes imens.")
+            r1, r2 = st.columns(2)
+            for kol, fmt, tekst in ((r1, "xlsx", "Lag Excel-rapport"), (r2, "pdf", "Lag PDF-rapport")):
+                if kol.button(tekst, key=f"btn_rapport_{fmt}"):
+                    data = rapport.rapportdata(st.session_state["tiltak_liste"], pris_tiltak, utslipp_tiltak, prosjekt,
+                                               bygg, {"rente": lcc_rente, "horisont": lcc_horisont,
+                                                      "prisvekst": lcc_prisvekst})
+                    start_rapport("rapport_jobb", rapport.filnavn(f"Tiltaksrapport {prosjekt} {bygg}", fmt), fmt,
+                                  rapport.lag, data, fmt)
+            vis_rapport("rapport_jobb")
+
     if st.button("Tøm oversikt", key="clear_overview"):
-        st.session_state["tiltak_liste"] = []
+        st.session_state["tiltak_liste"] = {}
+        get_lager().slett(prosjekt, bygg)
+        if _portefolje_lastet(prosjekt) is not None:
+            _portefolje_lastet(prosjekt).fjern(bygg)
         st.success("Oversikten er tømt.")
+
+# ===============================
+# Tab 9: Portefølje
+# ===============================
+maaling.runde("fane: Portefølje")
+with tabs[9]:
+    from energitiltak import portefolje as pf
+
+    st.subheader(f"Portefølje – {prosjekt}")
+    st.caption("Alle bygg i prosjektet. Summene oppdateres løpende når tiltak legges til eller endres, og "
+               "tabellene vises side for side, så også store porteføljer er raske å bla i.")
+
+    with st.expander("Importer portefølje (CSV/Parquet)"):
+        st.caption("Kolonner: bygg, tiltak (ID, f.eks. iso/led/vp), kWh, invest og valgfritt region og navn. "
+                   "Resultatfilen fra `python -m energitiltak` kan brukes direkte. Eksisterende tiltak med samme "
+                   "bygg og ID overskrives.")
+        pf_fil = st.file_uploader("Porteføljefil", type=["csv", "txt", "parquet"], key="pf_fil")
+        if pf_fil is not None and st.button("Importer", key="btn_pf_import"):
+            try:
+                pf_rader, pf_regioner = pf.les_portefolje(_navngitt(pf_fil.getvalue(), pf_fil.name))
+            except (ValueError, KeyError) as e:
+                st.error(f"Kunne ikke lese porteføljen: {e}")
+            else:
+                get_lager().lagre_mange(prosjekt, pf_rader)
+                get_lager().sett_regioner(prosjekt, pf_regioner)
+                st.session_state.pop("portefolje_kilde", None)
+                # Importen kan ha endret bygget som vises: last tiltakslisten på nytt fra lageret
+                st.session_state.pop("tiltak_kilde", None)
+                init_overview_state(prosjekt, bygg)
+                st.success(f"Importerte {fmt_int(len(pf_rader))} tiltak i {fmt_int(len({b for b, _ in pf_rader}))} bygg.")
+
+    with st.expander("Rapporter for alle bygg (zip)"):
+        st.caption("Én rapport per bygg i prosjektet, med pris og utslipp fra sidepanelet. Store porteføljer "
+                   "fordeles på flere prosesser, og jobben går i bakgrunnen.")
+        b1, b2 = st.columns(2)
+        with b1:
+            bulk_formater = st.multiselect("Format", list(rapport.FORMATER), default=["pdf"], key="bulk_format",
+                                           format_func=lambda f: {"pdf": "PDF", "xlsx": "Excel"}[f])
+        with b2:
+            bulk_livslop = st.checkbox("Med nåverdi, internrente og LCOE", value=True, key="bulk_livslop")
+        if st.button("Lag rapporter", key="btn_bulk_rapport", disabled=not bulk_formater):
+            livslop = ({"rente": st.session_state.get("lcc_rente", 4.0) / 100.0,
+                        "horisont": st.session_state.get("lcc_horisont", 30),
+                        "prisvekst": st.session_state.get("lcc_prisvekst", 2.0) / 100.0} if bulk_livslop else None)
+            start_rapport("bulk_jobb", rapport.filnavn(f"Tiltaksrapporter {prosjekt}", "zip"), "zip", rapport.bulk,
+                          get_lager(), prosjekt, pris_tiltak, utslipp_tiltak, tuple(bulk_formater), livslop)
+        vis_rapport("bulk_jobb")
+
+    portefolje = get_portefolje(prosjekt)
+    portefolje.sett_satser(pris_tiltak, utslipp_tiltak)
+    if len(portefolje) == 0:
+        st.info("Ingen tiltak i prosjektet enda.")
+    else:
+        f1, f2, f3, f4 = st.columns(4)
+        with f1:
+            pf_tiltak = st.multiselect("Tiltak", portefolje.navn("tiltak"), format_func=lambda t: TILTAK_NAVN.get(t, t),
+                                       key="pf_tiltak", placeholder="Alle")
+        with f2:
+            pf_regioner = st.multiselect("Region", portefolje.navn("region"), key="pf_region", placeholder="Alle")
+        with f3:
+            pf_pb = st.number_input("Maks tilbakebetaling (år, 0 = alle)", min_value=0.0, value=0.0, step=1.0, key="pf_pb")
+        with f4:
+            pf_co2 = st.number_input("Min. CO₂-reduksjon (kg/år)", min_value=0.0, value=0.0, step=100.0, key="pf_co2")
+        filtrert = bool(pf_tiltak or pf_regioner or pf_pb or pf_co2)
+        maske = portefolje.maske(pf_tiltak or None, pf_regioner or None, None, pf_pb or None, pf_co2 or None) if filtrert else None
+
+        sum_pf = portefolje.summer(maske)
+        c1, c2, c3, c4, c5 = st.columns(5)
+        c1.metric("Tiltak", fmt_int(sum_pf["antall"]))
+        c2.metric("Energisparing", fmt_int(sum_pf["kWh"]) + " kWh/år")
+        c3.metric("Besparelse", fmt_int(sum_pf["kr"]) + " kr/år")
+        c4.metric("CO₂-reduksjon", fmt_int(sum_pf["co2"]) + " kg/år")
+        c5.metric("Tilbakebetaling", "–" if sum_pf["payback"] is None else f"{sum_pf['payback']:.1f} år".replace(".", ","))
+
+        tall = st.column_config.NumberColumn(format="localized")
+        aar = st.column_config.NumberColumn(format="%.1f")
+
+        def sidevalg(antall: int, key: str) -> tuple:
+            """Sidestørrelse og side for en tabell med `antall` rader."""
+            s1, s2 = st.columns([1, 3])
+            with s1:
+                per_side = st.selectbox("Rader per side", [25, 50, 100, 250], index=1, key=f"{key}_per_side")
+            sider = max((antall + per_side - 1) // per_side, 1)
+            with s2:
+                side = st.number_input(f"Side (av {sider})", min_value=1, max_value=sider, value=1, key=f"{key}_side")
+            return int(side) - 1, per_side
+
+        grupper_etter = {"Bygg": "bygg", "Tiltak": "tiltak", "Region": "region"}
+        g_valg = st.radio("Grupper etter", list(grupper_etter), horizontal=True, key="pf_grupper")
+        g = portefolje.grupper(grupper_etter[g_valg], maske)
+        g_side, g_per_side = sidevalg(len(g), "pf_g")
+        g = g.iloc[g_side * g_per_side:(g_side + 1) * g_per_side]
+        if g_valg == "Tiltak":
+            g.index = [TILTAK_NAVN.get(t, t) for t in g.index]
+        g = g.rename(columns={"kWh": "kWh/år", "kr": "kr/år", "co2": "kg CO₂/år", "invest": "Investering (kr)",
+                              "antall": "Tiltak", "payback": "Tilbakebetaling (år)"})
+        g[g.columns[:4]] = g[g.columns[:4]].round(0)
+        st.dataframe(g, use_container_width=True,
+                     column_config={k: (aar if k == "Tilbakebetaling (år)" else tall) for k in g.columns})
+
+        st.markdown("**Tiltak**")
+        r1, r2 = st.columns([1, 3])
+        with r1:
+            sorter = st.selectbox("Sorter etter", list(pf.SORTERING), key="pf_sorter",
+                                  format_func=lambda k: pf.SORTERING[k])
+        with r2:
+            synkende = st.toggle("Synkende", value=sorter != "payback", key="pf_synkende")
+        antall = sum_pf["antall"]
+        r_side, r_per_side = sidevalg(antall, "pf_r")
+        side_df, _ = portefolje.side(maske, sorter, synkende, r_side, r_per_side)
+        st.dataframe(side_df, use_container_width=True, hide_index=True,
+                     column_config={k: (aar if k == pf.KOL_PB else tall) for k in side_df.columns[3:]})
+
+# ===============================
+# Tab 10: Sensitivitet
+# ===============================
+maaling.runde("fane: Sensitivitet")
+with tabs[10]:
+    st.subheader("Sensitivitet og scenarier")
+
+    beregnet = [tid for tid in TILTAK_NAVN if "input" in st.session_state.get(f"calc_{tid}", {})]
+    if not beregnet:
+        st.info("Beregn minst ett tiltak først – analysen tar utgangspunkt i input fra fanen.")
+    else:
+        from energitiltak import sensitivitet as sens
+
+        tid = st.selectbox("Tiltak", beregnet, format_func=lambda t: TILTAK_NAVN[t], key="sens_tiltak")
+        calc = st.session_state[f"calc_{tid}"]
+        basis = dict(calc["input"])
+        basis.update({"pris": sats_for(pris_tiltak, tid), "utslipp_g": sats_for(utslipp_tiltak, tid),
+                      "invest": float(st.session_state.get(f"inv_{tid}", calc.get("default_invest", 0.0)))})
+        st.caption("Analysen bruker den enkle modellen (graddagstall) med input fra fanen, pris/utslipp fra sidepanelet "
+                   "og investeringen som står i fanen.")
+
+        valgte = st.multiselect("Input som varieres", list(basis), default=["pris", "invest"], key="sens_params")
+        fordelingstype = st.radio("Fordeling", ["Triangulær", "Uniform"], horizontal=True, key="sens_fordeling")
+        fordelinger = {}
+        cols = st.columns(3)
+        for i, navn in enumerate(valgte):
+            with cols[i % 3]:
+                pst = st.slider(f"{navn} ± %", 0, 100, 20, 5, key=f"sens_pst_{navn}") / 100.0
+            b = float(basis[navn])
+            lav, hoy = b * (1.0 - pst), b * (1.0 + pst)
+            fordelinger[navn] = ("triang", lav, b, hoy) if fordelingstype == "Triangulær" else ("uniform", lav, hoy)
+
+        n = st.select_slider("Antall prøver (Monte Carlo)", [10_000, 100_000, 1_000_000, 4_000_000], value=100_000,
+                             format_func=fmt_int, key="sens_n")
+
+        if st.button("Kjør analyse", key="btn_sens") and fordelinger:
+            mc = sens.monte_carlo(tid, basis, fordelinger, n=n, seed=0)
+            st.session_state["sens_resultat"] = {
+                "tiltak": tid,
+                "persentiler": sens.persentiler(mc["payback"]),
+                "andel_lonnsom": float((mc["payback"] <= 15).mean()),
+                "histogram": np.histogram(mc["payback"][np.isfinite(mc["payback"])], bins=40),
+                "tornado": sens.tornado(tid, basis, fordelinger),
+            }
+
+        res = st.session_state.get("sens_resultat")
+        if res is not None and res["tiltak"] == tid:
+            def aar(x):
+                return "–" if not np.isfinite(x) else f"{x:.1f} år".replace(".", ",")
+
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("P10 tilbakebetaling", aar(res["persentiler"]["P10"]))
+            c2.metric("P50 tilbakebetaling", aar(res["persentiler"]["P50"]))
+            c3.metric("P90 tilbakebetaling", aar(res["persentiler"]["P90"]))
+            c4.metric("Andel ≤ 15 år", f"{res['andel_lonnsom'] * 100:.0f} %")
+
+            import altair as alt
+
+            tor = res["tornado"].copy()
+            tor["fra"] = tor[["utfall_lav", "utfall_høy"]].min(axis=1)
+            tor["til"] = tor[["utfall_lav", "utfall_høy"]].max(axis=1)
+            st.markdown("**Tornado – tilbakebetaling (år) ved lav/høy verdi (P10/P90)**")
+            tornado_chart = alt.Chart(tor).mark_bar().encode(
+                y=alt.Y("parameter:N", sort=list(tor["parameter"]), title=None),
+                x=alt.X("fra:Q", title="Tilbakebetaling (år)"),
+                x2="til:Q",
+                tooltip=["parameter", "lav", "høy", "utfall_lav", "utfall_høy"],
+            )
+            basis_linje = alt.Chart(tor.head(1)).mark_rule(color="black").encode(x="basis:Q")
+            st.altair_chart(tornado_chart + basis_linje, use_container_width=True)
+
+            tellinger, kanter = res["histogram"]
+            st.markdown("**Fordeling av tilbakebetalingstid**")
+            st.bar_chart(pd.DataFrame({"Antall": tellinger}, index=np.round((kanter[:-1] + kanter[1:]) / 2, 1)))
+
+# ===============================
+# Utviklerpanel: tidsbruk for denne kjøringen
+# ===============================
+if PROFIL:
+    maaling.runde(None)
+    with st.sidebar.expander("⏱ Tidsbruk (utvikler)", expanded=False):
+        post = maaling.avslutt_kjoring()
+        if maaling.PROFIL_LOGG:
+            st.caption(f"Logges til {maaling.PROFIL_LOGG} (ENERGITILTAK_PROFIL_LOGG)")
+        st.metric("Skriptet totalt", f"{post['total_ms']:.0f} ms")
+        st.dataframe(pd.DataFrame(maaling.sammendrag(post), columns=["Type", "Navn", "Antall", "ms"])
+                     .style.format({"ms": lambda x: "–" if x != x else f"{x:.1f}", "Antall": lambda x: "" if x != x else f"{x:.0f}"}),
+                     use_container_width=True, hide_index=True)